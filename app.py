@@ -5,20 +5,40 @@ Replicates the n8n workflow logic for CPU anomaly detection + news correlation.
 
 import streamlit as st
 import pandas as pd
-import requests
-import feedparser
-import json
-import math
-import re
-from datetime import datetime
-from io import StringIO
-
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import partial
 
+import numpy as np
 import plotly.graph_objects as go
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from madison import MetricSeries, sources
+from madison.anomaly_analysis import AnomalyAnalysis, severity_for
+from madison.artifacts import REPORT_FORMATS, default_report_store
+from madison.batch import NAB_REAL_KNOWN_CAUSE, parse_manifest, scan_fleet
+from madison.correlate import DEFAULT_WINDOW_HOURS, NewsIndex, correlated_news_context, related_news_column
+from madison.dedup import DedupResult, collapse_duplicates
+from madison.files import LOCAL_ROOT_ENV, confined_local_path, parse_time_range
+from madison.flight import completion_flights, default_llm_gate, fetch_flights
+from madison.llm import call_anomaly_detector, call_insights_narrator, make_client, offline_analysis, stream_insights_narrator
+from madison.llm_cache import default_response_cache
+from madison.pipeline import (
+    AI_TIMEOUT_S,
+    SOURCE_LABELS,
+    SOURCE_TIMEOUT_S,
+    MetricsAnalysis,
+    PipelineConfig,
+    PipelineResult,
+    analyze_metrics,
+)
+from madison.prompt_budget import listable_episodes
+from madison.refresh import RefreshWorker, StoredResult, default_result_store
+from madison.runner import SourceRunner
+from madison.stages import StageCache, StageResult, stage_key
+from madison.telemetry import RunTrace, record
+from madison.sampling import DetailLevels, SamplingPolicy
 
 # ──────────────────────────────────────────────
 # Page Config
@@ -95,359 +115,208 @@ def get_secret(key: str, default: str = "") -> str:
 # ──────────────────────────────────────────────
 
 @st.cache_data(ttl=600, show_spinner=False)
-def fetch_nab_csv(url: str, sample_step: int = 200) -> list[dict]:
+def fetch_nab_csv(url: str, sample_step: int = 1, _on_progress=None, time_range=None) -> MetricSeries:
     """
-    Download NAB CPU CSV and sample every Nth record into unified schema.
-    Mirrors: HTTP Request -> Code in JavaScript node.
+    Session-level cache over madison.sources.fetch_nab_csv.
+    _on_progress must not touch Streamlit elements because this may run on a worker thread.
     """
-    try:
-        resp = requests.get(url, timeout=30)
-        resp.raise_for_status()
-        csv_text = resp.text
-        lines = csv_text.strip().split("\n")
-        headers = lines[0].split(",")
-
-        records = []
-        errors = []
-        idx = 0
-        for i in range(1, len(lines), sample_step):
-            line = lines[i].strip()
-            if not line:
-                continue
-            parts = line.split(",")
-            try:
-                timestamp = parts[0]
-                value = float(parts[1])
-                records.append({
-                    "record_id": f"nab_cpu_{idx + 1}",
-                    "source": "kaggle",
-                    "source_name": "NAB - Numenta Anomaly Benchmark",
-                    "record_type": "metric",
-                    "timestamp": timestamp,
-                    "metric_name": "cpu_utilization",
-                    "metric_value": value,
-                    "description": "AWS CPU utilization metric",
-                    "category": "infrastructure",
-                })
-                idx += 1
-            except (IndexError, ValueError) as e:
-                errors.append(f"Row {i}: {e}")
-        return records
-    except Exception as e:
-        st.error(f"Error fetching NAB CSV: {e}")
-        return []
+    return sources.fetch_nab_csv(url, sample_step, _on_progress, time_range)
 
 
-@st.cache_data(ttl=600, show_spinner=False)
-def fetch_rss(feed_url: str, source_name: str, prefix: str) -> list[dict]:
+def load_metrics(url: str, time_range=None, local_root: str = "", _on_progress=None) -> MetricSeries:
     """
-    Parse an RSS feed and return unified-schema news records.
-    Mirrors: RSS Read -> Code in JavaScript1 / Code in JavaScript3 nodes.
+    Local files are only read from under local_root ($MADISON_LOCAL_DATA_ROOT; none when unset).
+    They are memory-mapped on every run, so edits to them show up at once and the arrays
+    are not copied into st.cache_data; URLs go through the session cache.
     """
-    try:
-        feed = feedparser.parse(feed_url)
-        records = []
-        for idx, entry in enumerate(feed.entries):
-            title = getattr(entry, "title", None)
-            link = getattr(entry, "link", None)
-            if not title or not link:
-                continue
-            pub = getattr(entry, "published", getattr(entry, "updated", ""))
-            try:
-                iso_ts = datetime.strptime(pub[:25], "%a, %d %b %Y %H:%M:%S").isoformat() + "Z"
-            except Exception:
-                iso_ts = pub
-            snippet = getattr(entry, "summary", "")[:200]
-            records.append({
-                "record_id": f"{prefix}_{idx + 1}",
-                "source": "rss",
-                "source_name": source_name,
-                "record_type": "news",
-                "timestamp": iso_ts,
-                "title": title,
-                "description": snippet,
-                "url": link,
-                "category": "tech_news",
-            })
-        return records
-    except Exception as e:
-        st.error(f"Error fetching RSS ({source_name}): {e}")
-        return []
+    path = confined_local_path(url, local_root)
+    if path is not None:
+        return sources.fetch_nab_csv(str(path), 1, _on_progress, time_range)
+    return fetch_nab_csv(url, 1, _on_progress, time_range)
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_rss(feed_url: str, source_name: str, prefix: str) -> list[dict]:
+    """Session-level cache over madison.sources.fetch_rss."""
+    return sources.fetch_rss(feed_url, source_name, prefix)
 
 
 @st.cache_data(ttl=600, show_spinner=False)
 def fetch_newsapi(query: str, api_key: str) -> list[dict]:
-    """
-    Call NewsAPI and return unified-schema news records.
-    Mirrors: HTTP Request1 -> Code in JavaScript2 node.
-    """
-    if not api_key:
-        return []
-    try:
-        url = "https://newsapi.org/v2/everything"
-        params = {
-            "q": query,
-            "language": "en",
-            "sortBy": "publishedAt",
-            "pageSize": 30,
-            "apiKey": api_key,
-        }
-        resp = requests.get(url, params=params, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        if data.get("status") != "ok":
-            st.warning(f"NewsAPI returned status: {data.get('status')} — {data.get('message', '')}")
-            return []
-
-        records = []
-        for idx, art in enumerate(data.get("articles", [])[:30]):
-            title = art.get("title", "")
-            link = art.get("url", "")
-            if not title or not link or title == "[Removed]":
-                continue
-            pub = art.get("publishedAt", "")
-            records.append({
-                "record_id": f"newsapi_{idx + 1}",
-                "source": "newsapi",
-                "source_name": art.get("source", {}).get("name", "Unknown"),
-                "record_type": "news",
-                "timestamp": pub,
-                "title": title,
-                "description": (art.get("description") or "")[:200],
-                "url": link,
-                "category": "business_tech",
-            })
-        return records
-    except Exception as e:
-        st.error(f"Error fetching NewsAPI: {e}")
-        return []
+    """Session-level cache over madison.sources.fetch_newsapi."""
+    return sources.fetch_newsapi(query, api_key)
 
 
 # ──────────────────────────────────────────────
-# Statistics / Anomaly Detection (mirrors Prepare AI Input node)
+# Pipeline Stages (recomputed only when their inputs change)
 # ──────────────────────────────────────────────
 
-def compute_statistics(metrics: list[dict], sigma_multiplier: float = 1.5) -> dict:
-    """
-    Compute avg, min, max, std dev, anomaly threshold.
-    Mirrors: Prepare AI Input node.
-    """
-    values = [m["metric_value"] for m in metrics]
-    n = len(values)
-    if n == 0:
-        return {}
-    avg = sum(values) / n
-    min_v = min(values)
-    max_v = max(values)
-    sq_diffs = [(v - avg) ** 2 for v in values]
-    std_dev = math.sqrt(sum(sq_diffs) / n)
-    threshold = avg + (sigma_multiplier * std_dev)
-
-    anomalies = [m for m in metrics if m["metric_value"] > threshold]
+def pipeline_stages() -> StageCache:
+    """This session's stage results; widget changes re-render from them without refetching or re-prompting."""
+    return st.session_state.setdefault("pipeline_stages", StageCache())
+
 
+def series_params(url: str, series: MetricSeries, time_range=None) -> dict:
+    """Identity of a fetched series: an unchanged download keeps every downstream key valid."""
     return {
-        "total_records": n,
-        "metric_name": metrics[0].get("metric_name", "cpu_utilization"),
-        "average": round(avg, 2),
-        "min": round(min_v, 2),
-        "max": round(max_v, 2),
-        "std_dev": round(std_dev, 2),
-        "anomaly_threshold": round(threshold, 2),
-        "potential_anomalies_count": len(anomalies),
-        "potential_anomalies": anomalies[:10],
+        "url": url,
+        "time_range": list(time_range) if time_range else None,
+        "records": len(series),
+        "last": str(series.timestamps[-1]) if len(series) else "",
+        "checksum": float(series.values.sum()),
     }
 
 
-# ──────────────────────────────────────────────
-# AI Calls (mirrors AI Anomaly Detector & AI Insights Narrator nodes)
-# ──────────────────────────────────────────────
+def stats_params(sigma_mult: float, sampling: SamplingPolicy, online_params: dict | None) -> dict:
+    return {
+        "sigma": sigma_mult,
+        "online": online_params,
+        "max_anomalies": sampling.llm_max_anomalies,
+        "selection": sampling.llm_anomaly_selection,
+    }
 
-def call_anomaly_detector(client, metrics_summary: dict) -> str:
-    """
-    Send metrics summary to GPT-4o-mini for anomaly classification.
-    Uses the EXACT same prompt from the n8n AI Anomaly Detector node.
-    """
-    anomalies_json = json.dumps(metrics_summary.get("potential_anomalies", []), indent=2, default=str)
-
-    prompt = f"""You are a KPI Anomaly Detection Agent for the Madison Transparency system. Analyze the following CPU utilization metrics and identify anomalies.
-
-## Metrics Summary:
-- Total Records: {metrics_summary['total_records']}
-- Metric: {metrics_summary['metric_name']}
-- Average: {metrics_summary['average']}%
-- Min: {metrics_summary['min']}%
-- Max: {metrics_summary['max']}%
-- Std Deviation: {metrics_summary['std_dev']}
-- Anomaly Threshold (1.5 σ): {metrics_summary['anomaly_threshold']}%
-- Potential Anomalies Found: {metrics_summary['potential_anomalies_count']}
-
-## Potential Anomaly Records:
-{anomalies_json}
-
-## Your Task:
-1. Analyze the metrics and confirm which are true anomalies
-2. Classify each anomaly severity: CRITICAL (>80%), HIGH (60-80%), MEDIUM (40-60%)
-3. Identify any patterns (time-based, consecutive spikes, etc.)
-
-Respond in this JSON format:
-{{
-  "analysis_summary": "Brief overview of findings",
-  "confirmed_anomalies": [
-    {{
-      "record_id": "xxx",
-      "timestamp": "xxx",
-      "value": xxx,
-      "severity": "CRITICAL/HIGH/MEDIUM",
-      "reason": "Why this is anomalous"
-    }}
-  ],
-  "patterns_detected": ["pattern1", "pattern2"],
-  "risk_level": "HIGH/MEDIUM/LOW",
-  "recommended_actions": ["action1", "action2"]
-}}"""
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return json.dumps({"error": str(e), "analysis_summary": "AI analysis unavailable"})
+def news_params(dedup: DedupResult) -> dict:
+    return {"stories": [n.get("url") or n["title"] for n in dedup.stories]}
 
 
-def call_insights_narrator(client, anomaly_text: str, news_context: list[dict]) -> str:
+def stats_stage(stages: StageCache, series_stage: StageResult, sigma_mult: float, sampling: SamplingPolicy,
+                online_params: dict | None) -> StageResult:
     """
-    Generate executive summary from anomaly results + news context.
-    Uses the EXACT same prompt from the n8n AI Insights Narrator node.
+    Statistics, anomaly mask and episodes for the stored series. Online detector
+    state persists per CSV, so only points newer than the last run are scored.
     """
-    news_json = json.dumps(news_context[:10], indent=2, default=str)
-
-    prompt = f"""You are the Insight Narrator for the Madison Transparency Agent. Your job is to generate clear, business-friendly explanations of KPI anomalies.
+    series = series_stage.value
+    params = stats_params(sigma_mult, sampling, online_params)
 
-## Anomaly Analysis Results:
-{anomaly_text}
+    def compute() -> MetricsAnalysis:
+        state_key = f"online_detector::{series_stage.params['url']}"
+        analysis = analyze_metrics(series, sigma_mult, sampling, online_params, st.session_state.get(state_key))
+        if analysis.online_scores is not None:
+            st.session_state[state_key] = (analysis.detector_state, analysis.online_scores)
+        record(records=len(series))
+        return analysis
 
-## Recent News Context:
-{news_json}
+    return stages.compute("stats", params, (series_stage.key,), compute)
 
-## Your Task:
-Generate a professional executive summary that:
-1. Summarizes the key findings in plain English (no technical jargon)
-2. Correlates anomalies with any relevant news if applicable
-3. Provides actionable recommendations for stakeholders
-4. Rates overall system health: HEALTHY / WARNING / CRITICAL
 
-Respond in this format:
-
-# Madison Transparency Agent - Executive Summary
-
-## Overall System Health: [HEALTHY/WARNING/CRITICAL]
+def seed_stages(stages: StageCache, stored: StoredResult) -> None:
+    """
+    Load a precomputed run from the shared result store into this session's stages,
+    keyed exactly as the dashboard keys its own runs so matching settings are cache hits.
+    """
+    result, config = stored.result, stored.config
+    series_stage = stages.put("series", result.series, series_params(config.csv_url, result.series, config.time_range))
+    analysis_stage = stages.put("stats", result.analysis, stats_params(config.sigma_multiplier, config.sampling, config.online_params),
+                                (series_stage.key,))
+    counts = result.source_counts
+    dedup = DedupResult(result.news, counts.get("news_articles", len(result.news)), counts.get("news_provenance", {}))
+    news_stage = stages.put("news", dedup, news_params(dedup))
+    stages.put("sources", counts, counts)
+    if stored.with_ai:
+        detector_stage = stages.put("detector", result.anomaly_analysis, {"token_budget": config.sampling.llm_token_budget},
+                                    (analysis_stage.key,))
+        stages.put("narrator", result.executive_summary, {"window_hours": float(config.news_window_hours)},
+                   (detector_stage.key, analysis_stage.key, news_stage.key))
+    else:
+        stages.invalidate("detector", "narrator")
 
-## Key Findings
-[2-3 bullet points summarizing the most important discoveries]
 
-## Anomaly Details
-[Brief description of each critical/high anomaly in business terms]
+@st.cache_resource(show_spinner=False)
+def refresh_worker() -> RefreshWorker | None:
+    """
+    Process-wide background refresher shared by every session. Off unless
+    MADISON_REFRESH_INTERVAL_S is set to a positive number of seconds: each refresh
+    spends OpenAI and NewsAPI quota whether or not anyone is watching. It only keeps
+    the default configuration fresh; visitors' own configurations are never scheduled.
+    """
+    interval = float(get_secret("MADISON_REFRESH_INTERVAL_S", "0"))
+    if interval <= 0 or get_script_run_ctx() is None:
+        return None  # disabled, or a process-pool worker re-importing this script
+    worker = RefreshWorker(default_result_store(), interval)
+    worker.watch(PipelineConfig(openai_api_key=get_secret("OPENAI_API_KEY"), newsapi_key=get_secret("NEWSAPI_KEY")))
+    return worker.start()
 
-## Potential Business Context
-[Any correlations with news or market events]
 
-## Recommended Actions
-[3-5 specific, actionable recommendations]
+# ──────────────────────────────────────────────
+# Metric Chart
+# ──────────────────────────────────────────────
 
-## Next Steps
-[What should stakeholders do immediately]"""
+@st.fragment
+def render_metric_chart(series, levels, anomaly_mask, peaks, stats, online_scores, detection_label, method_label) -> int:
+    """
+    WebGL line chart of the series with a zoom range. Only this fragment reruns when the
+    range changes; line points come from the precomputed detail levels, while anomaly
+    markers and episode peaks are always drawn at full fidelity. Returns the points drawn.
+    """
+    lo, hi = 0, len(series)
+    if len(series) > levels.max_points:
+        first, last = series.timestamps[0].astype("datetime64[s]").item(), series.timestamps[-1].astype("datetime64[s]").item()
+        step = max(timedelta(seconds=int(np.median(np.diff(series.timestamps[:1000])) // np.timedelta64(1, "s"))), timedelta(minutes=1))
+        zoom = st.slider("Time range", min_value=first, max_value=last, value=(first, last), step=step,
+                         format="YYYY-MM-DD HH:mm", help="Zoom in to see more detail; the line is re-drawn from a denser level.")
+        start, end = np.array(zoom, dtype="datetime64[ns]")
+        lo, hi = int(np.searchsorted(series.timestamps, start, "left")), int(np.searchsorted(series.timestamps, end, "right"))
+    anomaly_idx = np.flatnonzero(anomaly_mask)
+    anomaly_idx = anomaly_idx[np.searchsorted(anomaly_idx, lo):np.searchsorted(anomaly_idx, hi)]
+    line_idx = levels.window(lo, hi)
+    # Keep every episode peak on the line so spikes are never flattened by sampling.
+    line_idx = np.union1d(line_idx, peaks[(peaks >= lo) & (peaks < hi)])
+    if len(line_idx) < hi - lo:
+        st.caption(f"Showing {len(line_idx):,} of {hi - lo:,} points ({method_label.lower()}); every anomaly is plotted.")
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.4,
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(
+        x=series.timestamps[line_idx],
+        y=series.values[line_idx],
+        mode="lines",
+        name="CPU Utilization",
+        line=dict(color="#1E3A5F", width=2),
+    ))
+    if online_scores is None:
+        fig.add_hline(
+            y=stats["anomaly_threshold"],
+            line_dash="dash",
+            line_color="red",
+            annotation_text=f"Threshold ({stats['anomaly_threshold']}%)",
+            annotation_position="top right",
         )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"# Error\n\nInsight generation failed: {e}"
-
-
-# ──────────────────────────────────────────────
-# Report Generation (mirrors Format final output node)
-# ──────────────────────────────────────────────
+    else:
+        fig.add_trace(go.Scattergl(
+            x=series.timestamps[line_idx],
+            y=online_scores.thresholds[line_idx],
+            mode="lines",
+            name=f"Adaptive threshold ({detection_label})",
+            line=dict(color="red", width=1, dash="dash"),
+        ))
+    fig.add_hline(
+        y=stats["average"],
+        line_dash="dot",
+        line_color="green",
+        annotation_text=f"Average ({stats['average']}%)",
+        annotation_position="bottom right",
+    )
 
-def generate_html_report(metrics_summary: dict, executive_summary: str, anomaly_analysis: str, report_date: str) -> str:
-    """Generate a styled HTML report matching the n8n workflow output."""
-    health = "WARNING"
-    health_color = "#FFC107"
-    if metrics_summary.get("potential_anomalies_count", 0) == 0:
-        health = "HEALTHY"
-        health_color = "#28a745"
-    elif metrics_summary.get("potential_anomalies_count", 0) > 5:
-        health = "CRITICAL"
-        health_color = "#dc3545"
-
-    return f"""<!DOCTYPE html>
-<html>
-<head>
-<title>Madison Transparency Agent Report</title>
-<style>
-body{{font-family:Arial,sans-serif;max-width:800px;margin:0 auto;padding:20px;background:#f5f5f5}}
-.container{{background:white;padding:30px;border-radius:8px;box-shadow:0 2px 8px rgba(0,0,0,0.1)}}
-h1{{color:#1E3A5F;border-bottom:2px solid #1E3A5F;padding-bottom:10px}}
-h2{{color:#2E5A8F}}
-.health{{background-color:{health_color}22;padding:15px;border-radius:5px;border-left:4px solid {health_color};margin:15px 0}}
-.stat{{background:#E8F4FD;padding:10px;margin:5px 0;border-radius:4px}}
-.action{{background:#E8F5E9;padding:10px;margin:5px 0;border-radius:4px}}
-pre{{background:#f4f4f4;padding:12px;border-radius:6px;overflow-x:auto;font-size:0.85em}}
-</style>
-</head>
-<body>
-<div class="container">
-<h1>Madison Transparency Agent</h1>
-<p>Report Generated: {report_date}</p>
-<div class="health"><strong>System Health: {health}</strong><br>{metrics_summary.get('potential_anomalies_count',0)} anomalies detected in {metrics_summary.get('total_records',0)} records</div>
-
-<h2>Key Metrics</h2>
-<div class="stat">Records Analyzed: {metrics_summary.get('total_records',0)}</div>
-<div class="stat">Average CPU: {metrics_summary.get('average',0)}%</div>
-<div class="stat">Min CPU: {metrics_summary.get('min',0)}% | Max CPU: {metrics_summary.get('max',0)}%</div>
-<div class="stat">Std Deviation: {metrics_summary.get('std_dev',0)}</div>
-<div class="stat">Anomaly Threshold: {metrics_summary.get('anomaly_threshold',0)}%</div>
-<div class="stat">Anomalies Found: {metrics_summary.get('potential_anomalies_count',0)}</div>
-
-<h2>Executive Summary</h2>
-<pre>{executive_summary}</pre>
-
-<h2>Anomaly Analysis</h2>
-<pre>{anomaly_analysis}</pre>
-
-<p><em>Powered by Madison Transparency Agent + OpenAI GPT-4o-mini</em></p>
-</div>
-</body>
-</html>"""
-
-
-def generate_json_report(metrics_summary: dict, executive_summary: str, anomaly_analysis: str, source_counts: dict) -> dict:
-    """Generate JSON report matching the n8n workflow output."""
-    parsed_anomalies = {}
-    try:
-        match = re.search(r"\{[\s\S]*\}", anomaly_analysis)
-        if match:
-            parsed_anomalies = json.loads(match.group(0))
-    except Exception:
-        parsed_anomalies = {"raw_analysis": anomaly_analysis}
+    # Highlight anomaly points
+    if len(anomaly_idx):
+        fig.add_trace(go.Scattergl(
+            x=series.timestamps[anomaly_idx],
+            y=series.values[anomaly_idx],
+            mode="markers",
+            name="Anomaly",
+            marker=dict(color="red", size=10, symbol="diamond"),
+        ))
 
-    return {
-        "report_metadata": {
-            "generated_at": datetime.utcnow().isoformat() + "Z",
-            "agent_name": "Madison Transparency Agent",
-            "ai_model": "GPT-4o-mini",
-        },
-        "executive_summary": executive_summary,
-        "anomaly_analysis": parsed_anomalies,
-        "metrics_summary": metrics_summary,
-        "data_sources": source_counts,
-    }
+    fig.update_layout(
+        xaxis_title="Timestamp",
+        yaxis_title="CPU Utilization (%)",
+        template="plotly_white",
+        height=420,
+        margin=dict(l=40, r=40, t=30, b=40),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    return len(line_idx) + len(anomaly_idx)
 
 
 # ──────────────────────────────────────────────
@@ -498,16 +367,64 @@ with st.expander("Configuration", expanded=True):
 
     with col_right:
         st.subheader("Parameters")
+        detection_modes = {
+            "Global σ threshold": "global",
+            "EWMA z-score (online)": "ewma",
+            "Rolling z-score (online)": "rolling",
+            "Seasonal baseline": "seasonal",
+        }
+        detection_label = st.radio(
+            "Detection Mode",
+            list(detection_modes),
+            horizontal=True,
+            help="Global compares every point with mean + kσ of the whole series. "
+                 "The online modes score each point against a running EWMA or rolling-window estimate "
+                 "and only process new points on later runs. Seasonal compares each point with the median "
+                 "and MAD of its hour of the day or week, so regular daily peaks are not flagged."
+        )
+        detection_mode = detection_modes[detection_label]
         sigma_mult = st.slider(
             "Anomaly Threshold Multiplier (σ)",
             min_value=1.0, max_value=3.0, value=1.5, step=0.1,
             help="Number of standard deviations above the mean to flag an anomaly. Default 1.5σ matches the n8n workflow."
         )
+        online_params = None
+        if detection_mode == "ewma":
+            ewma_alpha = st.slider(
+                "EWMA Smoothing (α)",
+                min_value=0.005, max_value=0.2, value=0.02, step=0.005, format="%.3f",
+                help="Weight of each new point in the running mean and variance. Smaller adapts more slowly."
+            )
+            online_params = {"mode": "ewma", "k": sigma_mult, "alpha": ewma_alpha}
+        elif detection_mode == "rolling":
+            rolling_window = st.number_input(
+                "Rolling Window (points)",
+                min_value=12, max_value=20000, value=288, step=12,
+                help="Number of trailing points in the baseline. 288 five-minute points = 1 day."
+            )
+            online_params = {"mode": "rolling", "k": sigma_mult, "window": int(rolling_window)}
+        elif detection_mode == "seasonal":
+            seasonal_periods = {"Hour of week": "week", "Hour of day": "day"}
+            seasonal_period = st.selectbox(
+                "Seasonal Slots",
+                list(seasonal_periods),
+                help="Hour of week keeps 168 baselines (weekday/weekend aware); hour of day keeps 24 "
+                     "and needs less history."
+            )
+            online_params = {"mode": "seasonal", "k": sigma_mult, "period": seasonal_periods[seasonal_period]}
         csv_url = st.text_input(
-            "NAB CSV URL",
-            value="https://raw.githubusercontent.com/numenta/NAB/master/data/realKnownCause/cpu_utilization_asg_misconfiguration.csv",
+            "NAB CSV URL or Local File",
+            value=sources.DEFAULT_NAB_URL,
             placeholder="https://raw.githubusercontent.com/numenta/NAB/master/data/...",
-            help="URL of a CSV with timestamp,value columns"
+            help="URL of a CSV with timestamp,value columns. If the server allows a local data directory, "
+                 "a path or file:// URI of a CSV, Parquet or Arrow file inside it also works."
+        )
+        time_range_text = st.text_input(
+            "Time Range (optional)",
+            value="",
+            placeholder="2014-04-01..2014-04-15",
+            help="Only analyze records between two times (either side may be left empty). "
+                 "Parquet and Arrow files skip data outside the range without reading it."
         )
         news_query = st.text_input(
             "NewsAPI Search Query",
@@ -515,17 +432,152 @@ with st.expander("Configuration", expanded=True):
             placeholder="e.g. AI analytics metrics",
             help="Search query for NewsAPI articles"
         )
+        news_window_hours = st.slider(
+            "News Correlation Window (hours)",
+            min_value=1, max_value=168, value=int(DEFAULT_WINDOW_HOURS), step=1,
+            help="Articles published this close to an anomaly episode are treated as related news "
+                 "and given to the executive summary first."
+        )
         email_field = st.text_input(
             "Email (optional)",
             value="",
             placeholder="your@email.com",
             help="Enter email to receive the report (future feature)"
         )
+        use_ai_cache = st.toggle(
+            "Reuse cached AI responses",
+            value=True,
+            help="Answer identical GPT-4o-mini requests (same model, temperature and prompt) from the local "
+                 "response cache. Turn off to force fresh completions."
+        )
+
+    st.subheader("Sampling Policy")
+    st.caption("Anomaly detection always runs on every data point. Sampling only thins the chart and the AI prompt.")
+    col_chart, col_llm = st.columns(2)
+    chart_methods = {
+        "Min/max preserving": "minmax",
+        "Largest triangle (LTTB)": "lttb",
+        "Every Nth point": "stride",
+        "Full resolution": "none",
+    }
+    anomaly_selections = {"Largest peaks": "peaks", "Earliest": "first"}
+
+    with col_chart:
+        chart_method = st.selectbox(
+            "Chart sampling",
+            list(chart_methods),
+            help="Min/max preserving keeps the lowest and highest point of every bucket, so short spikes stay visible. "
+                 "LTTB keeps the point that best preserves the line's shape."
+        )
+        chart_max_points = st.number_input(
+            "Max chart points",
+            min_value=500, max_value=50000, value=2000, step=500,
+            help="Upper bound on line points sent to the browser. Anomaly markers are always drawn in full."
+        )
+
+    with col_llm:
+        llm_max_anomalies = st.slider(
+            "Anomaly records listed",
+            min_value=5, max_value=50, value=10, step=5,
+            help="How many individual anomaly records appear in the anomaly table and reports."
+        )
+        llm_anomaly_selection = st.selectbox(
+            "AI anomaly selection",
+            list(anomaly_selections),
+            help="Which anomalies are listed when there are more than the limit."
+        )
+        llm_token_budget = st.number_input(
+            "AI prompt token budget",
+            min_value=500, max_value=16000, value=1500, step=250,
+            help="Size of the anomaly-detection prompt. Every anomaly episode is covered: the highest peaks "
+                 "get a line each, the rest are summarized per day."
+        )
+
+    sampling = SamplingPolicy(
+        chart_method=chart_methods[chart_method],
+        chart_max_points=int(chart_max_points),
+        llm_max_anomalies=llm_max_anomalies,
+        llm_anomaly_selection=anomaly_selections[llm_anomaly_selection],
+        llm_token_budget=int(llm_token_budget),
+    )
 
 # Validation
 sources_selected = any([enable_nab, enable_techcrunch, enable_venturebeat, enable_newsapi])
 if not sources_selected:
     st.warning("Please select at least one data source.")
+local_data_root = get_secret(LOCAL_ROOT_ENV)
+try:
+    time_range = parse_time_range(time_range_text)
+except ValueError as e:
+    st.warning(f"Ignoring the time range: {e}")
+    time_range = None
+
+# ──────────────────────────────────────────────
+# Fleet Batch Scan
+# ──────────────────────────────────────────────
+
+with st.expander("Fleet Batch Scan", expanded=False):
+    st.caption(
+        "Screen many CSV series at once: sources are fetched and parsed in a process pool, statistics run in "
+        "one batched pass, and GPT-4o-mini only analyzes the most anomalous series."
+    )
+    fleet_manifest = st.text_area(
+        "Series manifest (one CSV URL per line)",
+        value="\n".join(NAB_REAL_KNOWN_CAUSE),
+        height=160,
+        help="Defaults to every file in NAB's realKnownCause directory. Lines starting with # are ignored."
+    )
+    fleet_top_n = st.slider("Top-N series for AI analysis", min_value=0, max_value=10, value=3,
+                            help="Only the N highest-ranked series are sent to GPT-4o-mini.")
+    fleet_btn = st.button("Scan Fleet", use_container_width=True)
+
+    if fleet_btn:
+        fleet_sources, rejected = [], []
+        for source in parse_manifest(fleet_manifest):
+            try:
+                path = confined_local_path(source, local_data_root)
+            except (PermissionError, ValueError) as e:
+                rejected.append(f"{source}: {e}")
+                continue
+            fleet_sources.append(source if path is None else str(path))
+        if rejected:
+            st.warning("Skipped manifest lines:\n\n" + "\n\n".join(rejected))
+        if not fleet_sources:
+            st.warning("The manifest does not list any sources.")
+        else:
+            fleet_bar = st.progress(0.0, text=f"Loading {len(fleet_sources)} series...")
+            fleet_loaded = {"count": 0}
+
+            def on_fleet_loaded(source: str, error: str | None) -> None:
+                fleet_loaded["count"] += 1
+                done = fleet_loaded["count"]
+                fleet_bar.progress(done / len(fleet_sources), text=f"Loaded {done}/{len(fleet_sources)} series")
+
+            fleet_started = time.perf_counter()
+            fleet = scan_fleet(fleet_sources, sigma_mult, on_loaded=on_fleet_loaded)
+            fleet_bar.progress(1.0, text=f"Scanned {len(fleet)} series in {time.perf_counter() - fleet_started:.1f}s")
+
+            fleet_insights = {}
+            openai_key = get_secret("OPENAI_API_KEY")
+            # Failed and empty series carry an error and are listed, not analyzed: they have no stats to send.
+            top = [e for e in fleet if e.error is None and e.stats][:fleet_top_n]
+            client = make_client(openai_key) if top else None
+            if client:
+                with st.status(f"Running AI analysis for the top {len(top)} series...", expanded=False) as fleet_status:
+                    for entry in top:
+                        st.write(f"GPT-4o-mini: {entry.name}")
+                        entry_anomalies = call_anomaly_detector(client, entry.stats, bypass_cache=not use_ai_cache)
+                        fleet_insights[entry.source] = call_insights_narrator(client, entry_anomalies, [], bypass_cache=not use_ai_cache)
+                    fleet_status.update(label=f"AI analysis complete for {len(top)} series", state="complete")
+            st.session_state["fleet_results"] = ([e.row() for e in fleet], [(e.name, fleet_insights.get(e.source)) for e in top])
+
+    if "fleet_results" in st.session_state:
+        fleet_rows, fleet_top = st.session_state["fleet_results"]
+        st.markdown("**Ranked fleet view** (most anomalous first)")
+        st.dataframe(pd.DataFrame(fleet_rows), use_container_width=True, hide_index=True)
+        for name, insight in fleet_top:
+            st.markdown(f"**{name}**")
+            st.markdown(insight or "_AI analysis unavailable — no API key configured._")
 
 # ──────────────────────────────────────────────
 # Run Analysis
@@ -533,105 +585,233 @@ if not sources_selected:
 
 run_btn = st.button("Run Analysis", type="primary", disabled=not sources_selected, use_container_width=True)
 
+# Each stage below is keyed by its inputs (see madison.stages): Run Analysis refetches the
+# sources, while any other widget change recomputes only the stages whose inputs it touches.
+stages = pipeline_stages()
+trace = RunTrace()
+openai_key = get_secret("OPENAI_API_KEY")
+with trace.span("setup.ai_client"):
+    client = make_client(openai_key)
+ai_cache = default_response_cache()
+detector_params = {"token_budget": sampling.llm_token_budget}
+detector_ran = False
+
+# Precomputed runs are shared across sessions; on-demand runs override them for this session.
+dashboard_config = PipelineConfig(
+    csv_url=csv_url,
+    time_range=time_range,
+    news_query=news_query,
+    news_window_hours=news_window_hours,
+    sigma_multiplier=sigma_mult,
+    enable_nab=enable_nab,
+    enable_techcrunch=enable_techcrunch,
+    enable_venturebeat=enable_venturebeat,
+    enable_newsapi=enable_newsapi,
+    online_params=online_params,
+    sampling=sampling,
+    openai_api_key=openai_key,
+    newsapi_key=get_secret("NEWSAPI_KEY"),
+    use_ai_cache=use_ai_cache,
+)
+refresh_worker()  # started once per process, and only when enabled
+result_store = default_result_store()
+try:
+    # A stored CLI run of a local file must not be shown for a path this server may not read.
+    confined_local_path(csv_url, local_data_root)
+    source_allowed = True
+except (PermissionError, ValueError):
+    source_allowed = False
+shared = None if run_btn or not source_allowed else result_store.latest(dashboard_config)
+seeded = st.session_state.get("shared_result")
+loaded = stages.get("series")
+if shared is not None and (loaded is None or loaded.params["url"] != csv_url
+                           or loaded.params.get("time_range") != (list(time_range) if time_range else None)
+                           or (seeded is not None and seeded != (shared.key, shared.finished_at))):
+    with trace.span("load.shared_result") as load_span:
+        seed_stages(stages, shared)
+        load_span.record(records=len(shared.result.series), origin=shared.origin)
+    seeded = st.session_state["shared_result"] = (shared.key, shared.finished_at)
+
 if run_btn:
     # ---- Phase 1: Data Fetching ----
     all_records: list[dict] = []
+    series: MetricSeries | None = None
     source_counts: dict = {}
 
+    nab_progress = {"received": 0, "total": 0, "records": 0}
+
+    def on_nab_progress(received: int, total: int, records: int) -> None:
+        # Runs on the worker thread: only record numbers, the main thread renders them.
+        nab_progress.update(received=received, total=total, records=records)
+
+    ctx = get_script_run_ctx()
+    fetch_started = time.perf_counter()
+    runner = SourceRunner(timeout=SOURCE_TIMEOUT_S, initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx))
+
     with st.status("Fetching data sources...", expanded=True) as status:
 
         if enable_nab:
-            st.write("Downloading NAB CPU utilization CSV...")
-            nab_records = fetch_nab_csv(csv_url)
-            all_records.extend(nab_records)
-            source_counts["kaggle_nab"] = len(nab_records)
-            st.write(f"  -> {len(nab_records)} metric records loaded")
-
+            runner.submit("kaggle_nab", trace.wrap("fetch.kaggle_nab", load_metrics), csv_url, time_range, local_data_root,
+                          _on_progress=on_nab_progress)
         if enable_techcrunch:
-            st.write("Fetching TechCrunch RSS feed...")
-            tc_records = fetch_rss("https://techcrunch.com/feed/", "TechCrunch", "rss_techcrunch")
-            all_records.extend(tc_records)
-            source_counts["techcrunch_rss"] = len(tc_records)
-            st.write(f"  -> {len(tc_records)} news articles loaded")
-
+            runner.submit("techcrunch_rss", trace.wrap("fetch.techcrunch_rss", fetch_rss), sources.TECHCRUNCH_FEED_URL, "TechCrunch", "rss_techcrunch")
         if enable_venturebeat:
-            st.write("Fetching VentureBeat AI RSS feed...")
-            vb_records = fetch_rss("https://venturebeat.com/category/ai/feed/", "VentureBeat AI", "rss_venturebeat")
-            all_records.extend(vb_records)
-            source_counts["venturebeat_rss"] = len(vb_records)
-            st.write(f"  -> {len(vb_records)} news articles loaded")
-
+            runner.submit("venturebeat_rss", trace.wrap("fetch.venturebeat_rss", fetch_rss), sources.VENTUREBEAT_FEED_URL, "VentureBeat AI", "rss_venturebeat")
         if enable_newsapi:
             newsapi_key = get_secret("NEWSAPI_KEY")
             if newsapi_key:
-                st.write("Fetching NewsAPI articles...")
-                news_records = fetch_newsapi(news_query, newsapi_key)
-                all_records.extend(news_records)
-                source_counts["newsapi"] = len(news_records)
-                st.write(f"  -> {len(news_records)} news articles loaded")
+                runner.submit("newsapi", trace.wrap("fetch.newsapi", fetch_newsapi), news_query, newsapi_key)
             else:
                 st.write("NewsAPI key not configured — skipping.")
                 source_counts["newsapi"] = 0
 
-        source_counts["total"] = len(all_records)
-        status.update(label=f"Data fetching complete — {len(all_records)} total records", state="complete")
-
-    # Separate metrics and news
-    metrics = [r for r in all_records if r.get("record_type") == "metric"]
-    news = [r for r in all_records if r.get("record_type") == "news"]
-
-    if not metrics:
+        fetch_names = runner.pending
+        st.write(f"Fetching {len(fetch_names)} sources in parallel: {', '.join(SOURCE_LABELS[n] for n in fetch_names)}")
+        nab_bar = st.progress(0.0, text="Streaming NAB CSV...") if "kaggle_nab" in fetch_names else None
+
+        while any(name in runner.pending for name in fetch_names):
+            for result in runner.poll(interval=0.1):
+                if result.name not in SOURCE_LABELS:
+                    continue  # the anomaly detector finishing early; collected in Phase 3
+                label = SOURCE_LABELS[result.name]
+                if not result.ok:
+                    st.write(f"  -> {label}: failed after {result.elapsed:.2f}s — {result.error}")
+                elif result.name == "kaggle_nab":
+                    series = result.value
+                    source_counts["kaggle_nab"] = len(series)
+                    st.write(f"  -> {label}: {len(series)} metric records loaded in {result.elapsed:.2f}s")
+                    if len(series):
+                        # ---- Phase 2: Compute Statistics (as soon as metrics are ready) ----
+                        st.write("Computing statistics and detecting anomalies...")
+                        series_stage = stages.put("series", series, series_params(csv_url, series, time_range))
+                        with trace.span("stats"):
+                            analysis_stage = stats_stage(stages, series_stage, sigma_mult, sampling, online_params)
+                        previous = stages.lookup("detector", stage_key("detector", detector_params, (analysis_stage.key,)))
+                        if client and (previous is None or previous.value.error or not use_ai_cache):
+                            # The detector only needs the metrics, so it runs while news sources are still loading.
+                            analysis = analysis_stage.value
+                            listed, unlisted = analysis.episodes.prompt_records(series, listable_episodes(sampling.llm_token_budget))
+                            runner.submit("ai_detector", trace.wrap("ai.detector", call_anomaly_detector), client, analysis.stats,
+                                          timeout=AI_TIMEOUT_S, bypass_cache=not use_ai_cache,
+                                          episodes=listed, unlisted_episodes=unlisted,
+                                          token_budget=sampling.llm_token_budget)
+                            detector_ran = True
+                            st.write("GPT-4o-mini: anomaly classification started")
+                        elif client:
+                            st.write("GPT-4o-mini: metrics and settings unchanged — reusing the last anomaly classification")
+                else:
+                    all_records.extend(result.value)
+                    source_counts[result.name] = len(result.value)
+                    st.write(f"  -> {label}: {len(result.value)} news articles loaded in {result.elapsed:.2f}s")
+            if nab_bar is not None:
+                if "kaggle_nab" in runner.pending:
+                    received, total = nab_progress["received"], nab_progress["total"]
+                    fraction = min(received / total, 1.0) if total else 0.0
+                    nab_bar.progress(fraction, text=f"Streaming NAB CSV... {received / 1e6:.1f} MB, {nab_progress['records']} records parsed")
+                else:
+                    nab_bar.empty()
+                    nab_bar = None
+
+        failed = [SOURCE_LABELS[name] for name in fetch_names if not runner.results[name].ok]
+        source_counts["total"] = len(all_records) + source_counts.get("kaggle_nab", 0)
+        fetch_label = f"Data fetching complete — {source_counts['total']} total records in {time.perf_counter() - fetch_started:.1f}s"
+        if failed:
+            status.update(label=f"{fetch_label} ({len(failed)} source(s) failed: {', '.join(failed)})", state="error")
+        else:
+            status.update(label=fetch_label, state="complete")
+
+    if series is None or not len(series):
+        runner.shutdown()
         st.error("No metric records were loaded. Enable the NAB CSV source and try again.")
         st.stop()
 
-    # ---- Phase 2: Compute Statistics ----
-    with st.spinner("Computing statistics and detecting anomalies..."):
-        stats = compute_statistics(metrics, sigma_mult)
+    with trace.span("dedup") as dedup_span:
+        dedup = collapse_duplicates([r for r in all_records if r.get("record_type") == "news"])
+        dedup_span.record(records=dedup.articles)
+    source_counts.update(dedup.counts())
+    stages.put("news", dedup, news_params(dedup))
+    stages.put("sources", source_counts, source_counts)
 
     # ---- Phase 3: AI Analysis ----
-    openai_key = get_secret("OPENAI_API_KEY")
-    anomaly_text = ""
-    executive_summary = ""
-
-    if openai_key and OpenAI:
-        client = OpenAI(api_key=openai_key)
+    if detector_ran:
         with st.status("Running AI analysis...", expanded=True) as ai_status:
             st.write("GPT-4o-mini: Classifying anomalies...")
-            anomaly_text = call_anomaly_detector(client, stats)
-            st.write("GPT-4o-mini: Generating executive summary...")
-            news_context = [{"source": n["source_name"], "title": n["title"], "date": n["timestamp"]} for n in news[:10]]
-            executive_summary = call_insights_narrator(client, anomaly_text, news_context)
-            ai_status.update(label="AI analysis complete", state="complete")
-    else:
+            while "ai_detector" in runner.pending:
+                runner.poll(interval=0.1)
+            detector_result = runner.results["ai_detector"]
+            if detector_result.ok:
+                stages.put("detector", detector_result.value, detector_params, (analysis_stage.key,))
+            else:
+                stages.put("detector", AnomalyAnalysis.unavailable(detector_result.error), detector_params, (analysis_stage.key,))
+            st.write(f"  -> classification ready {detector_result.elapsed:.2f}s after metrics were loaded")
+            ai_status.update(label="AI analysis complete — streaming executive summary", state="complete")
+    runner.shutdown()
+    st.session_state["shared_result"] = None
+    if not client:
         st.info("OpenAI API key not configured. Showing statistical analysis only (no AI narrative).")
-        anomaly_text = json.dumps({
-            "analysis_summary": "AI analysis unavailable — no API key configured.",
-            "confirmed_anomalies": [
-                {
-                    "record_id": a["record_id"],
-                    "timestamp": a["timestamp"],
-                    "value": a["metric_value"],
-                    "severity": "CRITICAL" if a["metric_value"] > 80 else ("HIGH" if a["metric_value"] > 60 else "MEDIUM"),
-                    "reason": f"Value {a['metric_value']}% exceeds threshold {stats['anomaly_threshold']}%"
-                }
-                for a in stats.get("potential_anomalies", [])
-            ],
-            "risk_level": "HIGH" if stats.get("potential_anomalies_count", 0) > 3 else "MEDIUM",
-        }, indent=2)
-        executive_summary = f"""# Madison Transparency Agent - Executive Summary
-
-## Overall System Health: {"CRITICAL" if stats.get("potential_anomalies_count", 0) > 5 else "WARNING" if stats.get("potential_anomalies_count", 0) > 0 else "HEALTHY"}
-
-## Key Findings
-- Analyzed {stats['total_records']} CPU utilization records from the NAB benchmark dataset.
-- Detected {stats['potential_anomalies_count']} potential anomalies above the {stats['anomaly_threshold']}% threshold ({sigma_mult}σ).
-- CPU utilization ranged from {stats['min']}% to {stats['max']}% with an average of {stats['average']}%.
-
-## Recommended Actions
-1. Investigate timestamps where CPU exceeded {stats['anomaly_threshold']}%.
-2. Set up real-time alerting for values above {round(stats['anomaly_threshold'] * 0.9, 1)}%.
-3. Review workload scaling policies.
-"""
+
+elif "series" in stages:
+    if seeded is not None:
+        finished = datetime.fromtimestamp(seeded[1]).strftime("%H:%M")
+        st.info(f"Showing the latest precomputed analysis (finished at {finished}, refreshed in the background) "
+                "with the current settings applied. Click **Run Analysis** for an on-demand run.")
+    else:
+        st.info("Showing results from the last analysis with the current settings applied. "
+                "Click **Run Analysis** to refresh the data sources and the AI analysis.")
+    series_stage = stages.get("series")
+    with trace.span("stats"):
+        analysis_stage = stats_stage(stages, series_stage, sigma_mult, sampling, online_params)
+
+# The dashboard: drawn after a run and, from the stored stages, on every later rerun.
+if "series" in stages:
+    # ──────────────────────────────────────────────
+    # Derived Stages
+    # ──────────────────────────────────────────────
+
+    series = series_stage.value
+    analysis = analysis_stage.value
+    stats, anomaly_mask, online_scores, episodes = analysis.stats, analysis.anomaly_mask, analysis.online_scores, analysis.episodes
+    news_stage = stages.get("news")
+    dedup = news_stage.value
+    news = dedup.stories
+    source_counts = stages.get("sources").value
+
+    news_window_s = news_window_hours * 3600
+    with trace.span("correlate") as correlate_span:
+        news_index = stages.compute("correlate", None, (news_stage.key,), lambda: NewsIndex(news)).value
+        correlate_span.record(records=len(news))
+
+    # AI results are only requested by Run Analysis; other reruns show the last ones and say when they are stale.
+    narrator_params = {"window_hours": float(news_window_hours)}
+    narrator_stream = None
+    ai_current = True
+    detector_stage = stages.get("detector")
+    if client and detector_stage is not None and not detector_stage.params.get("offline"):
+        anomaly_analysis = detector_stage.value
+        narrator_upstream = (detector_stage.key, analysis_stage.key, news_stage.key)
+        narrator_stage = stages.lookup("narrator", stage_key("narrator", narrator_params, narrator_upstream))
+        if run_btn and (narrator_stage is None or detector_ran or not use_ai_cache):
+            narrator_stream = trace.wrap_stream(
+                "ai.narrator",
+                stream_insights_narrator(
+                    client,
+                    anomaly_analysis,
+                    correlated_news_context(news_index, series, episodes, news_window_s),
+                    bypass_cache=not use_ai_cache,
+                ),
+            )
+            executive_summary = ""
+        else:
+            ai_current = narrator_stage is not None and detector_stage.key == stage_key("detector", detector_params, (analysis_stage.key,))
+            narrator_stage = narrator_stage or stages.get("narrator")
+            executive_summary = narrator_stage.value if narrator_stage is not None else ""
+    else:
+        with trace.span("ai.offline"):
+            detector_stage = stages.compute("detector", {"offline": True}, (analysis_stage.key,),
+                                            lambda: offline_analysis(stats, sigma_mult)[0])
+            anomaly_analysis = detector_stage.value
+            executive_summary = stages.compute("narrator", {"offline": True}, (detector_stage.key,),
+                                               lambda: offline_analysis(stats, sigma_mult)[1]).value
 
     # ──────────────────────────────────────────────
     # Output Dashboard
@@ -666,134 +846,146 @@ if run_btn:
     # --- CPU Utilization Chart ---
     st.subheader("CPU Utilization Over Time")
 
-    df_metrics = pd.DataFrame(metrics)
-    df_metrics["timestamp"] = pd.to_datetime(df_metrics["timestamp"], errors="coerce")
-    df_metrics = df_metrics.sort_values("timestamp")
-
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=df_metrics["timestamp"],
-        y=df_metrics["metric_value"],
-        mode="lines+markers",
-        name="CPU Utilization",
-        line=dict(color="#1E3A5F", width=2),
-        marker=dict(size=5),
-    ))
-    fig.add_hline(
-        y=stats["anomaly_threshold"],
-        line_dash="dash",
-        line_color="red",
-        annotation_text=f"Threshold ({stats['anomaly_threshold']}%)",
-        annotation_position="top right",
-    )
-    fig.add_hline(
-        y=stats["average"],
-        line_dash="dot",
-        line_color="green",
-        annotation_text=f"Average ({stats['average']}%)",
-        annotation_position="bottom right",
-    )
-
-    # Highlight anomaly points
-    anomaly_df = df_metrics[df_metrics["metric_value"] > stats["anomaly_threshold"]]
-    if not anomaly_df.empty:
-        fig.add_trace(go.Scatter(
-            x=anomaly_df["timestamp"],
-            y=anomaly_df["metric_value"],
-            mode="markers",
-            name="Anomaly",
-            marker=dict(color="red", size=10, symbol="diamond"),
+    with trace.span("render.chart") as chart_span:
+        # Zoom levels depend only on the series and the chart sampling, never on the detector settings.
+        levels = stages.compute(
+            "chart_levels",
+            {"method": sampling.chart_method, "max_points": sampling.chart_max_points},
+            (series_stage.key,),
+            lambda: DetailLevels.build(series.values, sampling.chart_max_points, sampling.chart_method),
+        ).value
+        chart_span.record(records=render_metric_chart(
+            series, levels, anomaly_mask, episodes.peaks, stats, online_scores, detection_label, chart_method,
         ))
 
-    fig.update_layout(
-        xaxis_title="Timestamp",
-        yaxis_title="CPU Utilization (%)",
-        template="plotly_white",
-        height=420,
-        margin=dict(l=40, r=40, t=30, b=40),
-        legend=dict(orientation="h", yanchor="bottom", y=1.02),
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
     # --- Anomaly Table ---
     if stats.get("potential_anomalies"):
         st.subheader("Detected Anomalies")
-        anom_data = []
-        for a in stats["potential_anomalies"]:
-            severity = "CRITICAL" if a["metric_value"] > 80 else ("HIGH" if a["metric_value"] > 60 else "MEDIUM")
-            anom_data.append({
-                "Record ID": a["record_id"],
-                "Timestamp": a["timestamp"],
-                "CPU (%)": round(a["metric_value"], 2),
-                "Severity": severity,
-            })
-        df_anom = pd.DataFrame(anom_data)
-
-        def color_severity(val):
-            colors = {"CRITICAL": "background-color: #f8d7da", "HIGH": "background-color: #fff3cd", "MEDIUM": "background-color: #d1ecf1"}
-            return colors.get(val, "")
+        with trace.span("render.table"):
+            anom_data = []
+            related = related_news_column(news_index, stats["potential_anomalies"], news_window_s)
+            confirmed = anomaly_analysis.by_record_id()
+            for a, related_news in zip(stats["potential_anomalies"], related):
+                verdict = confirmed.get(a["record_id"])
+                anom_data.append({
+                    "Record ID": a["record_id"],
+                    "Timestamp": a["timestamp"],
+                    "CPU (%)": round(a["metric_value"], 2),
+                    "Severity": verdict.severity if verdict else severity_for(a["metric_value"]),
+                    "AI Assessment": verdict.reason if verdict else "—",
+                    "Related News": related_news or "—",
+                })
+            df_anom = pd.DataFrame(anom_data)
 
-        st.dataframe(
-            df_anom.style.applymap(color_severity, subset=["Severity"]),
-            use_container_width=True,
-            hide_index=True,
-        )
+            def color_severity(val):
+                colors = {"CRITICAL": "background-color: #f8d7da", "HIGH": "background-color: #fff3cd", "MEDIUM": "background-color: #d1ecf1"}
+                return colors.get(val, "")
+
+            st.dataframe(
+                df_anom.style.map(color_severity, subset=["Severity"]),
+                use_container_width=True,
+                hide_index=True,
+            )
 
     # --- Executive Summary ---
     st.subheader("Executive Summary")
-    st.markdown(executive_summary)
+    if narrator_stream is not None:
+        executive_summary = st.write_stream(narrator_stream)
+        stages.put("narrator", executive_summary, narrator_params, narrator_upstream)
+        cache_stats = ai_cache.stats()
+        # Count this run's own AI calls from its trace: the cache's counters are shared by every session.
+        ai_spans = [span for span in trace.spans if span.name in ("ai.detector", "ai.narrator")]
+        st.caption(
+            f"Response cache: {sum(span.cache_hits for span in ai_spans)} of {len(ai_spans)} "
+            f"call{'s' if len(ai_spans) != 1 else ''} this run served from cache "
+            f"({cache_stats['hits']} hits / {cache_stats['misses']} misses since server start, "
+            f"{cache_stats['entries']} entries, {cache_stats['bytes'] / 1024:.0f} KB)"
+        )
+    else:
+        st.markdown(executive_summary)
+        if not ai_current:
+            st.caption("AI classification and summary are from the last run; the analysis settings have changed since. "
+                       "Click **Run Analysis** to refresh them.")
 
     # --- News Context ---
     if news:
-        with st.expander(f"News Context ({len(news)} articles)", expanded=False):
+        news_label = f"{len(news)} stories"
+        if dedup.collapsed:
+            news_label += f" from {dedup.articles} articles, {dedup.collapsed} duplicates collapsed"
+        with st.expander(f"News Context ({news_label})", expanded=False):
             for n in news[:15]:
                 st.markdown(f"""
-<div class="news-card">
-    <strong>{n['title']}</strong><br>
-    <small>{n['source_name']} &mdash; {n['timestamp'][:10] if n.get('timestamp') else 'N/A'}</small><br>
-    <span style="color:#555">{n.get('description','')[:150]}</span>
-    {"<br><a href='" + n['url'] + "' target='_blank'>Read more</a>" if n.get('url') else ""}
-</div>
+    <div class="news-card">
+        <strong>{n['title']}</strong><br>
+        <small>{" · ".join(n['reported_by'])} &mdash; {n['timestamp'][:10] if n.get('timestamp') else 'N/A'}</small><br>
+        <span style="color:#555">{n.get('description','')[:150]}</span>
+        {"<br><a href='" + n['url'] + "' target='_blank'>Read more</a>" if n.get('url') else ""}
+    </div>
                 """, unsafe_allow_html=True)
 
-    # --- Downloads ---
-    st.subheader("Download Reports")
-    d1, d2, d3 = st.columns(3)
-
-    html_report = generate_html_report(stats, executive_summary, anomaly_text, report_date)
-    json_report = generate_json_report(stats, executive_summary, anomaly_text, source_counts)
-    md_report = executive_summary
-
-    with d1:
-        st.download_button(
-            label="Download HTML Report",
-            data=html_report,
-            file_name="madison_report.html",
-            mime="text/html",
+    # --- Performance ---
+    performance = trace.to_dict()
+    with st.expander(f"Performance ({performance['total_wall_s']:.2f}s, run {trace.run_id})", expanded=False):
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "Stage": stage["name"],
+                    "Start (s)": stage["start_s"],
+                    "Wall (ms)": round(stage["wall_s"] * 1e3, 1),
+                    "Bytes": stage["bytes"],
+                    "Records": stage["records"],
+                    "Prompt tokens": stage["prompt_tokens"],
+                    "Completion tokens": stage["completion_tokens"],
+                    "Cache hits": stage["cache_hits"],
+                    "Details": ", ".join(f"{k}={v}" for k, v in stage["attrs"].items()),
+                }
+                for stage in performance["stages"]
+            ]),
             use_container_width=True,
+            hide_index=True,
         )
-    with d2:
-        st.download_button(
-            label="Download JSON Data",
-            data=json.dumps(json_report, indent=2, default=str),
-            file_name="madison_report.json",
-            mime="application/json",
-            use_container_width=True,
+        totals = performance["totals"]
+        gate = default_llm_gate().stats()
+        st.caption(
+            f"OpenAI calls (all sessions in this server): {gate['in_flight']} of {gate['max_concurrent']} slots busy, "
+            f"{gate['queue_depth']} queued; wait mean {gate['mean_wait_s'] * 1e3:.0f} ms, "
+            f"p95 {gate['p95_wait_s'] * 1e3:.0f} ms, max {gate['max_wait_s'] * 1e3:.0f} ms over {gate['calls']} calls. "
+            f"{fetch_flights.shared + completion_flights.shared} requests were shared with identical in-flight ones."
         )
-    with d3:
-        st.download_button(
-            label="Download Markdown Report",
-            data=md_report,
-            file_name="madison_report.md",
-            mime="text/markdown",
-            use_container_width=True,
+        st.caption(
+            f"{totals['bytes'] / 1e6:.2f} MB downloaded, {totals['prompt_tokens']} prompt + "
+            f"{totals['completion_tokens']} completion tokens, {totals['cache_hits']} AI cache hits. "
+            "Log line (also written to the madison.performance logger):"
         )
+        st.code(trace.emit(), language="json")
 
-    # Store in session state for persistence
-    st.session_state["last_stats"] = stats
-    st.session_state["last_executive_summary"] = executive_summary
-    st.session_state["last_anomaly_text"] = anomaly_text
+    # --- Downloads ---
+    st.subheader("Download Reports")
+    d1, d2, d3 = st.columns(3)
+
+    # Reports are rendered on the first download click and then served from the store. Their performance
+    # section comes from this script run's trace, so its run id is part of the key along with the content
+    # and a report never carries another run's timings.
+    report_key = stage_key(
+        "report",
+        {"date": report_date, "summary": executive_summary, "verdict": anomaly_analysis.to_json(indent=None),
+         "run_id": trace.run_id},
+        (analysis_stage.key, news_stage.key),
+    )
+    run_result = PipelineResult(stats, anomaly_analysis, executive_summary, source_counts, news, series, analysis, trace=trace)
+    if run_btn:
+        # Publish the on-demand run for every other session; it is not scheduled for refresh.
+        result_store.save(dashboard_config, run_result, origin="on_demand")
+    report_store = default_report_store()
+    downloads = (("html", "Download HTML Report"), ("json", "Download JSON Data"), ("md", "Download Markdown Report"))
+    for column, (fmt, label) in zip((d1, d2, d3), downloads):
+        file_name, mime = REPORT_FORMATS[fmt]
+        with column:
+            st.download_button(
+                label=label,
+                data=report_store.loader(report_key, fmt, partial(run_result.write_report, fmt, report_date=report_date)),
+                file_name=file_name,
+                mime=mime,
+                use_container_width=True,
+            )
 
-# Show previous results if available
-elif "last_stats" in st.session_state:
-    st.info("Showing results from last analysis. Click **Run Analysis** to refresh.")
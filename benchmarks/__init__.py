@@ -0,0 +1 @@
+"""Offline benchmarks for the Madison pipeline. Run modules with ``python -m benchmarks.<name>``."""
@@ -0,0 +1,107 @@
+"""
+Benchmark: pure-Python compute_statistics vs the vectorized batch engine.
+
+    python -m benchmarks.bench_statistics [--points 1000000] [--series 1000] [--series-len 2000]
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from madison.series import MetricSeries
+from madison.stats import batch_statistics, compute_statistics, compute_statistics_batch
+
+
+def legacy_compute_statistics(metrics: list[dict], sigma_multiplier: float = 1.5) -> dict:
+    """The original list-of-dicts implementation, kept verbatim as the baseline."""
+    values = [m["metric_value"] for m in metrics]
+    n = len(values)
+    if n == 0:
+        return {}
+    avg = sum(values) / n
+    min_v = min(values)
+    max_v = max(values)
+    sq_diffs = [(v - avg) ** 2 for v in values]
+    std_dev = math.sqrt(sum(sq_diffs) / n)
+    threshold = avg + (sigma_multiplier * std_dev)
+
+    anomalies = [m for m in metrics if m["metric_value"] > threshold]
+
+    return {
+        "total_records": n,
+        "metric_name": metrics[0].get("metric_name", "cpu_utilization"),
+        "average": round(avg, 2),
+        "min": round(min_v, 2),
+        "max": round(max_v, 2),
+        "std_dev": round(std_dev, 2),
+        "anomaly_threshold": round(threshold, 2),
+        "potential_anomalies_count": len(anomalies),
+        "potential_anomalies": anomalies[:10],
+    }
+
+
+def synthetic_series(n: int, rng: np.random.Generator) -> MetricSeries:
+    start = np.datetime64("2014-01-01T00:00:00", "ns")
+    timestamps = start + np.arange(n, dtype=np.int64) * np.int64(300_000_000_000)
+    values = np.clip(rng.normal(40, 8, n), 0, 100)
+    return MetricSeries(timestamps=timestamps, values=values)
+
+
+def best_of(fn, repeat: int) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def check_same(legacy: dict, fast: dict) -> None:
+    for key in ("total_records", "average", "min", "max", "std_dev", "anomaly_threshold", "potential_anomalies_count"):
+        if legacy[key] != fast[key]:
+            raise AssertionError(f"{key}: legacy={legacy[key]} vectorized={fast[key]}")
+    legacy_ids = [a["record_id"] for a in legacy["potential_anomalies"]]
+    fast_ids = [a["record_id"] for a in fast["potential_anomalies"]]
+    if legacy_ids != fast_ids:
+        raise AssertionError("potential_anomalies differ")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=1_000_000, help="points in the single-series case")
+    parser.add_argument("--series", type=int, default=1_000, help="number of series in the fleet case")
+    parser.add_argument("--series-len", type=int, default=2_000, help="points per series in the fleet case")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    rng = np.random.default_rng(42)
+
+    # Single series: the legacy path also pays for the per-record dicts it consumes.
+    series = synthetic_series(args.points, rng)
+    records = series.records()
+    legacy_s = best_of(lambda: legacy_compute_statistics(records), args.repeat)
+    fast_s = best_of(lambda: compute_statistics(series), args.repeat)
+    check_same(legacy_compute_statistics(records), compute_statistics(series))
+    print(f"1 series x {args.points:,} points")
+    print(f"  legacy      {legacy_s * 1e3:10.1f} ms")
+    print(f"  vectorized  {fast_s * 1e3:10.1f} ms   ({legacy_s / fast_s:.0f}x)")
+
+    # Fleet: legacy loops series by series; the engine reduces them all at once.
+    fleet = [synthetic_series(args.series_len, rng) for _ in range(args.series)]
+    fleet_records = [s.records() for s in fleet]
+    legacy_f = best_of(lambda: [legacy_compute_statistics(r) for r in fleet_records], args.repeat)
+    loop_f = best_of(lambda: [compute_statistics(s) for s in fleet], args.repeat)
+    batch_f = best_of(lambda: compute_statistics_batch(fleet), args.repeat)
+    engine_f = best_of(lambda: batch_statistics([s.values for s in fleet]), args.repeat)
+    for r, fast in zip(fleet_records, compute_statistics_batch(fleet)):
+        check_same(legacy_compute_statistics(r), fast)
+    print(f"{args.series:,} series x {args.series_len:,} points")
+    print(f"  legacy      {legacy_f * 1e3:10.1f} ms")
+    print(f"  per-series  {loop_f * 1e3:10.1f} ms   ({legacy_f / loop_f:.0f}x)")
+    print(f"  batched     {batch_f * 1e3:10.1f} ms   ({legacy_f / batch_f:.0f}x)")
+    print(f"  engine only {engine_f * 1e3:10.1f} ms   ({legacy_f / engine_f:.0f}x, excludes building anomaly record dicts)")
+
+
+if __name__ == "__main__":
+    main()
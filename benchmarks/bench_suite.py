@@ -0,0 +1,263 @@
+"""
+Offline benchmark suite: ingestion, statistics, report generation and the
+end-to-end pipeline, with stored baselines and regression flags.
+
+    python -m benchmarks.bench_suite                          # compare with benchmarks/baselines.json
+    python -m benchmarks.bench_suite --sizes 10k,100k         # quicker subset
+    python -m benchmarks.bench_suite --save-baseline          # record the current numbers
+    python -m benchmarks.bench_suite --only ingest,stats --json results.json
+
+Every network dependency (NAB CSV, RSS, NewsAPI, OpenAI) is served by the local
+stand-ins in benchmarks.standins, and the HTTP and response caches point at a
+temporary directory, so every fetch is a cold miss. Throughput is the best of
+--repeat untraced samples (fast cases are looped so a sample lasts at least
+50 ms); peak memory is measured on one extra run under tracemalloc.
+The exit status is 1 when any case regresses beyond the tolerances.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.standins import StandInServer, write_nab_csv
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+DATA_DIR = Path(os.environ.get("MADISON_BENCH_DIR") or Path.home() / ".cache" / "madison" / "bench")
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+GROUPS = ("ingest", "fetch", "stats", "reports", "news", "pipeline")
+READ_CHUNK_BYTES = 1 << 16
+MIN_SAMPLE_S = 0.05
+
+
+@dataclass
+class CaseResult:
+    name: str
+    seconds: float
+    throughput: float
+    unit: str
+    peak_mb: float
+
+
+@dataclass
+class Case:
+    name: str
+    group: str
+    fn: Callable[[], object]
+    work: float  # units of work per call: rows, bytes or operations
+    unit: str
+    repeat: int
+
+
+def measure(case: Case) -> CaseResult:
+    # Calibrate: fast cases are looped so each timed sample lasts at least MIN_SAMPLE_S.
+    t0 = time.perf_counter()
+    case.fn()
+    first = time.perf_counter() - t0
+    loops = max(1, math.ceil(MIN_SAMPLE_S / max(first, 1e-9)))
+    # A slow case's calibration run already is a full sample.
+    best, samples = (first, case.repeat - 1) if loops == 1 else (math.inf, case.repeat)
+    for _ in range(samples):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            case.fn()
+        best = min(best, (time.perf_counter() - t0) / loops)
+    tracemalloc.start()
+    try:
+        case.fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return CaseResult(case.name, best, case.work / best, case.unit, peak / 2**20)
+
+
+def compare(result: CaseResult, baseline: dict | None, throughput_tol: float, memory_tol: float) -> list[str]:
+    """Regression messages for one case; empty when it is within tolerance or has no baseline."""
+    if not baseline:
+        return []
+    flags = []
+    if result.throughput < baseline["throughput"] * (1 - throughput_tol):
+        flags.append(f"throughput {result.throughput / baseline['throughput'] - 1:+.0%}")
+    # Ignore sub-megabyte noise on cases that barely allocate.
+    if result.peak_mb > baseline["peak_mb"] * (1 + memory_tol) and result.peak_mb - baseline["peak_mb"] > 1.0:
+        flags.append(f"peak memory {result.peak_mb / baseline['peak_mb'] - 1:+.0%}")
+    return flags
+
+
+def nab_file(rows: int) -> Path:
+    """The synthetic CSV for a size, generated once and reused across runs."""
+    path = DATA_DIR / f"nab_{rows}.csv"
+    if not path.exists():
+        print(f"generating {path} ({rows:,} rows)...", file=sys.stderr)
+        write_nab_csv(path, rows)
+    return path
+
+
+def columnar_file(series, rows: int, fmt: str) -> Path | None:
+    """The synthetic series as an uncompressed Parquet or Arrow IPC file, or None without pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    path = DATA_DIR / f"nab_{rows}.{fmt}"
+    if not path.exists():
+        table = pa.table({"timestamp": series.timestamps, "value": series.values})
+        if fmt == "parquet":
+            pyarrow.parquet.write_table(table, path, compression="none")
+        else:
+            pyarrow.feather.write_feather(table, path, compression="uncompressed")
+    return path
+
+
+def build_cases(sizes: list[str], server: StandInServer, repeat: int, cache_dir: Path) -> list[Case]:
+    # Imported here so the cache environment variables set in main() are in place first.
+    from madison.files import read_local_series
+    from madison.ingest import parse_nab_chunks
+    from madison.llm import offline_analysis
+    from madison.pipeline import PipelineConfig, run_pipeline
+    from madison.reports import generate_html_report, generate_json_report
+    from madison.sources import fetch_nab_csv, fetch_newsapi, fetch_rss
+    from madison.stats import compute_statistics
+
+    cases = []
+    counter = iter(range(1_000_000_000))
+
+    def cold(url: str) -> str:
+        # A distinct query string per call makes every fetch a cache miss; earlier
+        # entries are dropped first so 10M-row bodies do not pile up on disk.
+        for entry in cache_dir.glob("*"):
+            entry.unlink(missing_ok=True)
+        return f"{url}?run={next(counter)}"
+
+    def pipeline(url: str) -> None:
+        result = run_pipeline(PipelineConfig(
+            csv_url=cold(url),
+            techcrunch_feed_url=cold(server.url("/rss/techcrunch.xml")),
+            venturebeat_feed_url=cold(server.url("/rss/venturebeat.xml")),
+            newsapi_url=cold(server.url("/newsapi")),
+            newsapi_key="standin",
+            openai_api_key="standin",
+            use_ai_cache=False,
+            source_timeout=3600,  # tracemalloc slows 10M-row ingestion well past the app's budget
+        ))
+        if result.errors:
+            raise RuntimeError(f"stand-in source failed: {result.errors}")
+
+    def read_chunks(path: Path):
+        with open(path, "rb") as f:
+            while chunk := f.read(READ_CHUNK_BYTES):
+                yield chunk
+
+    stats = None
+    for label in sizes:
+        rows = SIZES[label]
+        path = nab_file(rows)
+        url = server.url(f"/nab/{path.name}")
+        n = 1 if rows >= 10_000_000 else repeat
+        series = parse_nab_chunks(read_chunks(path))
+        stats = compute_statistics(series)
+        cases += [
+            Case(f"ingest.parse[{label}]", "ingest", lambda p=path: parse_nab_chunks(read_chunks(p)), rows, "rows/s", n),
+            Case(f"ingest.local_csv[{label}]", "ingest", lambda p=path: read_local_series(p), rows, "rows/s", n),
+            Case(f"fetch.nab_csv[{label}]", "fetch", lambda u=url: fetch_nab_csv(cold(u)), rows, "rows/s", n),
+            Case(f"stats.compute[{label}]", "stats", lambda s=series: compute_statistics(s), rows, "rows/s", n),
+            Case(f"pipeline.end_to_end[{label}]", "pipeline", lambda u=url: pipeline(u), rows, "rows/s", n),
+        ]
+        for fmt in ("parquet", "arrow"):
+            columnar = columnar_file(series, rows, fmt)
+            if columnar is not None:
+                cases.append(Case(f"ingest.{fmt}[{label}]", "ingest", lambda p=columnar: read_local_series(p), rows, "rows/s", n))
+        del series
+
+    summary = "# Executive Summary\n\n" + "- finding\n" * 20
+    anomaly_analysis, _ = offline_analysis(stats, 1.5)
+    source_counts = {"kaggle_nab": stats["total_records"], "total": stats["total_records"]}
+    report_date = datetime(2024, 1, 1).strftime("%A, %B %d, %Y")
+    cases += [
+        Case("reports.html", "reports", lambda: generate_html_report(stats, summary, anomaly_analysis, report_date),
+             1, "reports/s", repeat),
+        Case("reports.json", "reports",
+             lambda: json.dumps(generate_json_report(stats, summary, anomaly_analysis, source_counts), default=str),
+             1, "reports/s", repeat),
+        Case("news.rss", "news",
+             lambda: fetch_rss(cold(server.url("/rss/techcrunch.xml")), "TechCrunch", "rss_techcrunch"),
+             1, "fetches/s", repeat),
+        Case("news.newsapi", "news",
+             lambda: fetch_newsapi("AI", "standin", cold(server.url("/newsapi"))),
+             1, "fetches/s", repeat),
+    ]
+    return cases
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k,100k,1m,10m", help=f"comma-separated subset of {','.join(SIZES)}")
+    parser.add_argument("--only", default="", help=f"comma-separated subset of {','.join(GROUPS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (10M-row cases run once)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with this run's numbers")
+    parser.add_argument("--throughput-tol", type=float, default=0.25, help="allowed fractional throughput drop")
+    parser.add_argument("--memory-tol", type=float, default=0.10, help="allowed fractional peak-memory growth")
+    parser.add_argument("--json", type=Path, help="also write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    sizes = [s.strip().lower() for s in args.sizes.split(",") if s.strip()]
+    groups = [g.strip() for g in args.only.split(",") if g.strip()] or list(GROUPS)
+    unknown = sorted(set(sizes) - set(SIZES)) + sorted(set(groups) - set(GROUPS))
+    if unknown:
+        parser.error(f"unknown size or group: {', '.join(unknown)}")
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"cases": {}}
+    machine = f"{platform.machine()} {platform.python_implementation()} {platform.python_version()}"
+    if baseline.get("machine") and baseline["machine"] != machine and not args.save_baseline:
+        print(f"note: baseline was recorded on {baseline['machine']}, this is {machine}", file=sys.stderr)
+
+    results: list[CaseResult] = []
+    regressions = 0
+    with tempfile.TemporaryDirectory(prefix="madison-bench-") as tmp:
+        cache_dir = Path(tmp) / "http"
+        os.environ["MADISON_CACHE_DIR"] = str(cache_dir)
+        os.environ["MADISON_LLM_CACHE"] = str(Path(tmp) / "llm.sqlite3")
+        with StandInServer(DATA_DIR) as server:
+            os.environ["OPENAI_BASE_URL"] = server.openai_base_url
+            cases = [c for c in build_cases(sizes, server, args.repeat, cache_dir) if c.group in groups]
+            print(f"{'case':32} {'best':>11} {'throughput':>22} {'peak MB':>9}  vs baseline")
+            for case in cases:
+                result = measure(case)
+                results.append(result)
+                base = baseline["cases"].get(case.name)
+                flags = compare(result, base, args.throughput_tol, args.memory_tol)
+                regressions += bool(flags)
+                delta = f"{result.throughput / base['throughput'] - 1:+.0%}" if base else "no baseline"
+                status = f"REGRESSION ({'; '.join(flags)})" if flags else delta
+                print(f"{case.name:32} {result.seconds * 1e3:9.3f}ms {result.throughput:14,.0f} {result.unit:>7} "
+                      f"{result.peak_mb:9.1f}  {status}")
+
+    current = {r.name: asdict(r) for r in results}
+    if args.json:
+        args.json.write_text(json.dumps({"machine": machine, "cases": current}, indent=2))
+    if args.save_baseline:
+        baseline["cases"].update(current)
+        baseline["machine"] = machine
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"{regressions} case(s) regressed beyond the tolerances", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
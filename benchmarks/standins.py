@@ -0,0 +1,232 @@
+"""
+Local stand-ins for every network dependency, so benchmarks and tests run offline.
+
+One threaded HTTP server on 127.0.0.1 serves:
+
+    /nab/<file>.csv        synthetic NAB-shaped CSVs from the data directory
+    /rss/<source>.xml      a synthetic RSS 2.0 feed
+    /newsapi               a NewsAPI /v2/everything response
+    /v1/chat/completions   an OpenAI chat-completions endpoint (plain and SSE streaming)
+
+Responses are deterministic, so report and prompt sizes are identical between runs.
+"""
+
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+NAB_START = np.datetime64("2014-01-01T00:00:00")
+NAB_STEP = np.timedelta64(300, "s")  # NAB series are sampled every five minutes
+COPY_CHUNK_BYTES = 1 << 20
+
+DETECTOR_RESPONSE = {
+    "analysis_summary": "CPU utilization shows sustained spikes well above the baseline.",
+    "confirmed_anomalies": [
+        {
+            "record_id": "nab_cpu_1",
+            "timestamp": "2014-01-01 00:00:00",
+            "value": 91.0,
+            "severity": "CRITICAL",
+            "reason": "Sustained spike above the threshold",
+        }
+    ],
+    "patterns_detected": ["recurring spikes"],
+    "risk_level": "HIGH",
+    "recommended_actions": ["Review autoscaling policy"],
+}
+NARRATOR_RESPONSE = (
+    "# Madison Transparency Agent - Executive Summary\n\n"
+    "## Overall System Health: WARNING\n\n"
+    "## Key Findings\n"
+    + "- CPU utilization spiked above the anomaly threshold during peak hours.\n" * 3
+    + "\n## Recommended Actions\n"
+    + "1. Review workload scaling policies.\n" * 3
+)
+
+
+def write_nab_csv(path: Path, rows: int, seed: int = 42, block_rows: int = 1_000_000) -> Path:
+    """
+    Write a NAB-shaped timestamp,value CSV: a daily cycle plus noise around 40%
+    with rare spikes, so every run flags a realistic share of anomalies.
+    Written in blocks, so 10M rows never need more than one block in memory.
+    """
+    rng = np.random.default_rng(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="ascii") as f:
+        f.write("timestamp,value\n")
+        for start in range(0, rows, block_rows):
+            n = min(block_rows, rows - start)
+            idx = np.arange(start, start + n)
+            values = 40 + 10 * np.sin(idx * (2 * np.pi / 288)) + rng.normal(0, 4, n)
+            spikes = rng.random(n) < 0.002
+            values[spikes] += rng.uniform(30, 50, spikes.sum())
+            values = np.clip(values, 0, 100)
+            stamps = np.datetime_as_string(NAB_START + idx * NAB_STEP, unit="s")
+            lines = np.char.add(np.char.add(np.char.replace(stamps, "T", " "), ","), np.char.mod("%.3f", values))
+            f.write("\n".join(lines.tolist()))
+            f.write("\n")
+    tmp.replace(path)
+    return path
+
+
+def rss_document(source: str, items: int = 30) -> bytes:
+    entries = "".join(
+        f"""
+    <item>
+      <title>{source} headline {i}: cloud infrastructure costs and AI workloads</title>
+      <link>https://example.com/{source}/{i}</link>
+      <description>Synthetic article {i} about data centers, GPUs and capacity planning.</description>
+      <pubDate>{formatdate(1_700_000_000 - i * 3600, usegmt=True)}</pubDate>
+    </item>"""
+        for i in range(items)
+    )
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0">
+  <channel>
+    <title>{source}</title>
+    <link>https://example.com/{source}</link>
+    <description>Synthetic feed</description>{entries}
+  </channel>
+</rss>
+""".encode()
+
+
+def newsapi_document(articles: int = 30) -> bytes:
+    return json.dumps({
+        "status": "ok",
+        "totalResults": articles,
+        "articles": [
+            {
+                "source": {"id": None, "name": "Example News"},
+                "title": f"Analytics headline {i}: metrics platforms add AI features",
+                "description": f"Synthetic NewsAPI article {i}.",
+                "url": f"https://example.com/newsapi/{i}",
+                "publishedAt": f"2024-01-{1 + i % 28:02d}T12:00:00Z",
+            }
+            for i in range(articles)
+        ],
+    }).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "StandInServer"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send(self, body: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        with self.server.lock:
+            self.server.requests.append((path, self.headers.get("If-None-Match")))
+            failing = self.server.fail_next > 0
+            self.server.fail_next -= failing
+        if failing:
+            self.send_error(503)
+            return
+        if path.startswith("/nab/"):
+            file = self.server.data_dir / Path(path).name
+            if not file.is_file():
+                self.send_error(404)
+                return
+            stat = file.stat()
+            etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(stat.st_size))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            with open(file, "rb") as f:
+                while chunk := f.read(COPY_CHUNK_BYTES):
+                    self.wfile.write(chunk)
+        elif path.startswith("/rss/"):
+            self._send(rss_document(Path(path).stem), "application/rss+xml")
+        elif path == "/newsapi":
+            self._send(newsapi_document(), "application/json")
+        else:
+            self.send_error(404)
+
+    def do_POST(self) -> None:
+        if self.path.split("?", 1)[0] != "/v1/chat/completions":
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        text = json.dumps(DETECTOR_RESPONSE) if "Anomaly Detection Agent" in prompt else NARRATOR_RESPONSE
+        if self.server.ai_latency:
+            time.sleep(self.server.ai_latency)
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": "standin", "created": 0, "model": body["model"]}
+        if not body.get("stream"):
+            self._send(json.dumps({
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }).encode(), "application/json")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        chunks = [{"index": 0, "delta": {"content": text[i:i + 40]}, "finish_reason": None} for i in range(0, len(text), 40)]
+        events = [{**base, "object": "chat.completion.chunk", "choices": [c]} for c in chunks]
+        events.append({**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if body.get("stream_options", {}).get("include_usage"):
+            events.append({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+        for event in events:
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Serves the stand-in endpoints from a daemon thread on an ephemeral port.
+    NAB files carry an ETag and answer a matching If-None-Match with 304. Set
+    fail_next to answer that many GETs with 503; requests logs (path, If-None-Match)
+    of every GET.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, data_dir: Path, ai_latency: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.data_dir = Path(data_dir)
+        self.ai_latency = ai_latency
+        self.fail_next = 0
+        self.requests: list[tuple[str, str | None]] = []
+        self.lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def __enter__(self) -> "StandInServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    @property
+    def openai_base_url(self) -> str:
+        return self.url("/v1")
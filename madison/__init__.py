@@ -0,0 +1,15 @@
+"""
+Madison Transparency Agent - core building blocks shared by the dashboard.
+"""
+
+from madison.series import MetricSeries, MetricSeriesBuilder
+from madison.stats import batch_statistics, compute_statistics, compute_statistics_batch, statistics_with_mask
+
+__all__ = [
+    "MetricSeries",
+    "MetricSeriesBuilder",
+    "batch_statistics",
+    "compute_statistics",
+    "compute_statistics_batch",
+    "statistics_with_mask",
+]
@@ -0,0 +1,5 @@
+import sys
+
+from madison.cli import main
+
+sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Typed anomaly-detector results.
+
+The detector call requests OpenAI structured outputs with DETECTOR_SCHEMA in
+strict mode, so the completion is exactly one JSON object of this shape with no
+preamble. It is validated once into an AnomalyAnalysis and handed as-is to the
+narrator prompt, the reports and the anomaly table; nothing downstream parses
+model text again.
+"""
+
+import json
+from dataclasses import asdict, dataclass, field
+
+SEVERITIES = ("CRITICAL", "HIGH", "MEDIUM")
+RISK_LEVELS = ("HIGH", "MEDIUM", "LOW")
+
+DETECTOR_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "analysis_summary": {"type": "string", "description": "Brief overview of findings"},
+        "confirmed_anomalies": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "record_id": {"type": "string", "description": "peak_record_id of the episode"},
+                    "timestamp": {"type": "string", "description": "Peak time, YYYY-MM-DD HH:MM"},
+                    "value": {"type": "number", "description": "Peak value in percent"},
+                    "severity": {"type": "string", "enum": list(SEVERITIES)},
+                    "reason": {"type": "string", "description": "Why this is anomalous"},
+                },
+                "required": ["record_id", "timestamp", "value", "severity", "reason"],
+                "additionalProperties": False,
+            },
+        },
+        "patterns_detected": {"type": "array", "items": {"type": "string"}},
+        "risk_level": {"type": "string", "enum": list(RISK_LEVELS)},
+        "recommended_actions": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["analysis_summary", "confirmed_anomalies", "patterns_detected", "risk_level", "recommended_actions"],
+    "additionalProperties": False,
+}
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "anomaly_analysis", "strict": True, "schema": DETECTOR_SCHEMA},
+}
+
+
+def severity_for(value: float) -> str:
+    """The prompt's severity bands: CRITICAL above 80%, HIGH above 60%, MEDIUM otherwise."""
+    return "CRITICAL" if value > 80 else ("HIGH" if value > 60 else "MEDIUM")
+
+
+@dataclass
+class ConfirmedAnomaly:
+    record_id: str
+    timestamp: str
+    value: float
+    severity: str
+    reason: str
+
+
+@dataclass
+class AnomalyAnalysis:
+    """The detector's verdict; error is set when the AI call failed and the lists are empty."""
+    analysis_summary: str
+    confirmed_anomalies: list[ConfirmedAnomaly] = field(default_factory=list)
+    patterns_detected: list[str] = field(default_factory=list)
+    risk_level: str = "MEDIUM"
+    recommended_actions: list[str] = field(default_factory=list)
+    error: str | None = None
+
+    @classmethod
+    def unavailable(cls, error: str) -> "AnomalyAnalysis":
+        return cls("AI analysis unavailable", error=error)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AnomalyAnalysis":
+        """Validate a schema-shaped dict; raises ValueError on anything the schema would reject."""
+        missing = [key for key in DETECTOR_SCHEMA["required"] if key not in data]
+        if missing:
+            raise ValueError(f"detector output is missing {', '.join(missing)}")
+        if data["risk_level"] not in RISK_LEVELS:
+            raise ValueError(f"risk_level must be one of {RISK_LEVELS}, got {data['risk_level']!r}")
+        anomalies = []
+        for item in data["confirmed_anomalies"]:
+            if item.get("severity") not in SEVERITIES:
+                raise ValueError(f"severity must be one of {SEVERITIES}, got {item.get('severity')!r}")
+            anomalies.append(ConfirmedAnomaly(
+                record_id=str(item["record_id"]),
+                timestamp=str(item["timestamp"]),
+                value=float(item["value"]),
+                severity=item["severity"],
+                reason=str(item["reason"]),
+            ))
+        return cls(
+            analysis_summary=str(data["analysis_summary"]),
+            confirmed_anomalies=anomalies,
+            patterns_detected=[str(p) for p in data["patterns_detected"]],
+            risk_level=data["risk_level"],
+            recommended_actions=[str(a) for a in data["recommended_actions"]],
+        )
+
+    @classmethod
+    def from_json(cls, text: str) -> "AnomalyAnalysis":
+        return cls.from_dict(json.loads(text))
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        if data["error"] is None:
+            del data["error"]
+        return data
+
+    def to_json(self, indent: int | None = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
+
+    def by_record_id(self) -> dict[str, ConfirmedAnomaly]:
+        return {a.record_id: a for a in self.confirmed_anomalies}
@@ -0,0 +1,85 @@
+"""
+Report artifacts built on demand and cached per run.
+
+A report is only rendered when someone asks for it (a download click, or the
+CLI writing its outputs) and is then kept on disk under
+
+    <root>/<run_id>/madison_report.<fmt>
+
+so repeated downloads and dashboard reruns never rebuild it. The writer
+streams into a temporary file that is renamed into place, and only the most
+recent keep_runs runs are kept.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, TextIO
+
+from madison.telemetry import record
+
+DEFAULT_REPORT_DIR = Path.home() / ".cache" / "madison" / "reports"
+
+REPORT_FORMATS = {
+    "html": ("madison_report.html", "text/html"),
+    "json": ("madison_report.json", "application/json"),
+    "md": ("madison_report.md", "text/markdown"),
+}
+
+
+class ReportStore:
+    """Per-run directory of rendered reports, built once per (run_id, format)."""
+
+    def __init__(self, root: str | os.PathLike | None = None, keep_runs: int = 20):
+        self.root = Path(root or os.environ.get("MADISON_REPORT_DIR") or DEFAULT_REPORT_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.keep_runs = keep_runs
+        self._lock = threading.Lock()
+
+    def path(self, run_id: str, fmt: str) -> Path:
+        return self.root / run_id / REPORT_FORMATS[fmt][0]
+
+    def build(self, run_id: str, fmt: str, write: Callable[[TextIO], None]) -> Path:
+        """Return the report's path, calling write(file) to render it first if it is not on disk yet."""
+        path = self.path(run_id, fmt)
+        with self._lock:
+            if path.exists():
+                record(report_cache="hit")
+                return path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    write(f)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            record(report_cache="miss", bytes=path.stat().st_size)
+            self._prune(keep=path.parent)
+        return path
+
+    def loader(self, run_id: str, fmt: str, write: Callable[[TextIO], None]) -> Callable[[], bytes]:
+        """A zero-argument callable for st.download_button(data=...): renders on first click only."""
+        return lambda: self.build(run_id, fmt, write).read_bytes()
+
+    def _prune(self, keep: Path) -> None:
+        runs = sorted((d for d in self.root.iterdir() if d.is_dir() and d != keep),
+                      key=lambda d: d.stat().st_mtime, reverse=True)
+        for old in runs[max(self.keep_runs - 1, 0):]:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+_default_store: ReportStore | None = None
+_default_store_lock = threading.Lock()
+
+
+def default_report_store() -> ReportStore:
+    """Process-wide store rooted at $MADISON_REPORT_DIR (or ~/.cache/madison/reports)."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ReportStore()
+    return _default_store
@@ -0,0 +1,132 @@
+"""
+Fleet batch analysis.
+
+Fetches and parses many NAB-style sources (URLs or local files) across a process pool, runs the
+batched statistics engine over all of them in one call, and ranks the series
+by how anomalous they look so the expensive LLM steps only run for the top few.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+
+from madison.files import local_path, read_local_series
+from madison.http_cache import cached_fetch
+from madison.ingest import parse_nab_chunks
+from madison.series import MetricSeries
+from madison.stats import compute_statistics_batch
+
+NAB_RAW_BASE = "https://raw.githubusercontent.com/numenta/NAB/master/data"
+
+# Every series in NAB's realKnownCause directory.
+NAB_REAL_KNOWN_CAUSE = [
+    f"{NAB_RAW_BASE}/realKnownCause/{name}"
+    for name in (
+        "ambient_temperature_system_failure.csv",
+        "cpu_utilization_asg_misconfiguration.csv",
+        "ec2_request_latency_system_failure.csv",
+        "machine_temperature_system_failure.csv",
+        "nyc_taxi.csv",
+        "rogue_agent_key_hold.csv",
+        "rogue_agent_key_updown.csv",
+    )
+]
+
+
+@dataclass
+class FleetEntry:
+    """One series in the fleet view, with the scores used for ranking."""
+
+    source: str
+    series: MetricSeries | None = None
+    stats: dict = field(default_factory=dict)
+    error: str | None = None
+    peak_z: float = 0.0
+    anomaly_rate: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.source.rstrip("/").rsplit("/", 1)[-1]
+
+    def row(self) -> dict:
+        """Flat row for the ranked fleet table."""
+        return {
+            "Series": self.name,
+            "Records": self.stats.get("total_records", 0),
+            "Anomalies": self.stats.get("potential_anomalies_count", 0),
+            "Anomaly Rate (%)": round(self.anomaly_rate * 100, 2),
+            "Peak z-score": round(self.peak_z, 2),
+            "Average": self.stats.get("average"),
+            "Max": self.stats.get("max"),
+            "Error": self.error or "",
+        }
+
+
+def parse_manifest(text: str) -> list[str]:
+    """One source URL or path per line; blank lines and # comments are ignored."""
+    sources = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line and line not in sources:
+            sources.append(line)
+    return sources
+
+
+def load_series(source: str) -> tuple[str, MetricSeries | None, str | None]:
+    """Worker entry point: fetch and parse one source (through the persistent HTTP cache, or a memory map for local files)."""
+    try:
+        path = local_path(source)
+        if path is not None:
+            return source, read_local_series(path), None
+        fetched = cached_fetch(source, parse_nab_chunks, kind="nab_csv:v1:step=1")
+        return source, fetched.value, None
+    except Exception as e:
+        return source, None, str(e) or type(e).__name__
+
+
+def scan_fleet(
+    sources: list[str],
+    sigma_multiplier: float = 1.5,
+    max_workers: int | None = None,
+    on_loaded: Callable[[str, str | None], None] | None = None,
+) -> list[FleetEntry]:
+    """
+    Fetch and parse every source in a process pool, compute statistics for the
+    whole fleet in one batched call, and return entries ranked most anomalous first.
+    on_loaded(source, error) is called in the parent as each source finishes loading.
+    """
+    entries = {source: FleetEntry(source) for source in sources}
+    workers = max_workers or min(len(sources), os.cpu_count() or 1) or 1
+    # spawn: never fork a process that may be running the Streamlit server's threads.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(load_series, source) for source in sources]
+        for future in as_completed(futures):
+            source, series, error = future.result()
+            entries[source].series = series
+            entries[source].error = error
+            if on_loaded:
+                on_loaded(source, error)
+
+    for entry in entries.values():
+        if entry.error is None and (entry.series is None or not len(entry.series)):
+            # Nothing to score: keep it out of the ranking (and the AI calls) and say why in the table.
+            problems = entry.series.errors[:1] if entry.series is not None else []
+            entry.error = "; ".join(["No metric records", *problems])
+    loaded = [e for e in entries.values() if e.error is None]
+    for entry, stats in zip(loaded, compute_statistics_batch([e.series for e in loaded], sigma_multiplier)):
+        entry.stats = stats
+        std = stats["std_dev"]
+        entry.peak_z = (stats["max"] - stats["average"]) / std if std else 0.0
+        entry.anomaly_rate = stats["potential_anomalies_count"] / stats["total_records"]
+    return rank_fleet(list(entries.values()))
+
+
+def rank_fleet(entries: list[FleetEntry]) -> list[FleetEntry]:
+    """Order by peak z-score, then anomaly rate; failed and empty sources go last."""
+    scores = np.array([(e.error is None, e.peak_z, e.anomaly_rate) for e in entries], dtype=float).reshape(-1, 3)
+    order = np.lexsort((-scores[:, 2], -scores[:, 1], -scores[:, 0]))
+    return [entries[i] for i in order]
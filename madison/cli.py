@@ -0,0 +1,169 @@
+"""
+Command-line entry point: python -m madison.
+
+Runs the headless pipeline once and writes the HTML, JSON and Markdown reports.
+With --refresh-every it keeps running as a background worker, publishing each
+result to the shared result store the dashboard opens with.
+Keys come from OPENAI_API_KEY / NEWSAPI_KEY in the environment; Streamlit is never imported.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+from madison.correlate import DEFAULT_WINDOW_HOURS
+from madison.files import time_bounds
+from madison.online import ONLINE_MODES
+from madison.pipeline import PipelineConfig, run_pipeline
+from madison.refresh import default_result_store
+from madison.sampling import ANOMALY_SELECTIONS, SamplingPolicy
+from madison.seasonal import SEASONAL_PERIODS
+from madison.sources import DEFAULT_NAB_URL
+
+REPORT_FORMATS = ("html", "json", "md")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m madison",
+        description="Run the Madison anomaly analysis headlessly and write the reports.",
+    )
+    parser.add_argument("--csv-url", default=DEFAULT_NAB_URL,
+                        help="URL, local path or file:// URI of a CSV, Parquet or Arrow file with timestamp,value columns")
+    parser.add_argument("--start", help="Only analyze records at or after this time (e.g. 2014-04-01)")
+    parser.add_argument("--end", help="Only analyze records at or before this time (e.g. 2014-04-15 12:00)")
+    parser.add_argument("--news-query", default="AI analytics metrics", help="Search query for NewsAPI articles")
+    parser.add_argument("--news-window-hours", type=float, default=DEFAULT_WINDOW_HOURS,
+                        help="Correlate articles published this close to an anomaly episode (default 24)")
+    parser.add_argument("--sigma", type=float, default=1.5, help="Anomaly threshold multiplier (default 1.5)")
+    parser.add_argument("--mode", choices=("global",) + ONLINE_MODES + ("seasonal",), default="global", help="Detection mode")
+    parser.add_argument("--alpha", type=float, default=0.02, help="EWMA smoothing for --mode ewma")
+    parser.add_argument("--window", type=int, default=288, help="Rolling window in points for --mode rolling")
+    parser.add_argument("--period", choices=tuple(SEASONAL_PERIODS), default="week",
+                        help="Hour-of-day or hour-of-week baselines for --mode seasonal")
+    parser.add_argument("--max-anomalies", type=int, default=10, help="Anomaly records listed in the reports")
+    parser.add_argument("--anomaly-selection", choices=ANOMALY_SELECTIONS, default="peaks")
+    parser.add_argument("--token-budget", type=int, default=1500, help="Token budget of the anomaly-detection prompt")
+    parser.add_argument("--no-nab", action="store_true", help="Skip the NAB CSV source")
+    parser.add_argument("--no-techcrunch", action="store_true", help="Skip the TechCrunch RSS feed")
+    parser.add_argument("--no-venturebeat", action="store_true", help="Skip the VentureBeat AI RSS feed")
+    parser.add_argument("--no-newsapi", action="store_true", help="Skip NewsAPI")
+    parser.add_argument("--no-ai", action="store_true", help="Statistics only, even if OPENAI_API_KEY is set")
+    parser.add_argument("--no-ai-cache", action="store_true", help="Force fresh GPT-4o-mini completions")
+    parser.add_argument("--out-dir", default=".", help="Directory the reports are written to")
+    parser.add_argument("--formats", default=",".join(REPORT_FORMATS),
+                        help="Comma-separated subset of html,json,md (default: all)")
+    parser.add_argument("--perf-log", metavar="PATH",
+                        help="Append the run's performance log line (one JSON object) to PATH, or '-' for stdout")
+    parser.add_argument("--publish", action="store_true",
+                        help="Also store the result in the shared result store ($MADISON_RESULT_DIR) for the dashboard")
+    parser.add_argument("--refresh-every", type=float, metavar="SECONDS",
+                        help="Keep running: repeat the analysis every SECONDS and publish each result (implies --publish)")
+    parser.add_argument("--quiet", action="store_true", help="Only print the written report paths")
+    return parser
+
+
+def config_from_args(args: argparse.Namespace) -> PipelineConfig:
+    online_params = None
+    if args.mode == "ewma":
+        online_params = {"mode": "ewma", "k": args.sigma, "alpha": args.alpha}
+    elif args.mode == "rolling":
+        online_params = {"mode": "rolling", "k": args.sigma, "window": args.window}
+    elif args.mode == "seasonal":
+        online_params = {"mode": "seasonal", "k": args.sigma, "period": args.period}
+    return PipelineConfig(
+        csv_url=args.csv_url,
+        time_range=(args.start, args.end) if args.start or args.end else None,
+        news_query=args.news_query,
+        news_window_hours=args.news_window_hours,
+        sigma_multiplier=args.sigma,
+        enable_nab=not args.no_nab,
+        enable_techcrunch=not args.no_techcrunch,
+        enable_venturebeat=not args.no_venturebeat,
+        enable_newsapi=not args.no_newsapi,
+        online_params=online_params,
+        sampling=SamplingPolicy(
+            llm_max_anomalies=args.max_anomalies,
+            llm_anomaly_selection=args.anomaly_selection,
+            llm_token_budget=args.token_budget,
+        ),
+        openai_api_key="" if args.no_ai else os.environ.get("OPENAI_API_KEY", ""),
+        newsapi_key=os.environ.get("NEWSAPI_KEY", ""),
+        use_ai_cache=not args.no_ai_cache,
+    )
+
+
+def run_once(args: argparse.Namespace, formats: list[str], log: Callable[[str], None]) -> int:
+    """One analysis round. Any failure (fetching, analysis, publishing, writing) is reported and returns 1."""
+    try:
+        return _run_round(args, formats, log)
+    except Exception as e:
+        detail = str(e) if isinstance(e, RuntimeError) else f"{type(e).__name__}: {e}"
+        print(f"error: {detail}", file=sys.stderr)
+        return 1
+
+
+def _run_round(args: argparse.Namespace, formats: list[str], log: Callable[[str], None]) -> int:
+    started = time.perf_counter()
+    config = config_from_args(args)
+    result = run_pipeline(config, on_event=log)
+
+    stats = result.stats
+    for span in result.trace.spans:
+        tokens = f", {span.prompt_tokens}+{span.completion_tokens} tokens" if span.prompt_tokens else ""
+        log(f"  {span.name:22} {(span.wall_s or 0) * 1e3:9.1f} ms{tokens}")
+    log(f"{stats['total_records']} records, {stats['potential_anomalies_count']} anomalies above "
+        f"{stats['anomaly_threshold']}% — finished in {time.perf_counter() - started:.2f}s")
+    if args.perf_log == "-":
+        print(result.trace.log_line())
+    elif args.perf_log:
+        with open(args.perf_log, "a", encoding="utf-8") as f:
+            f.write(result.trace.log_line() + "\n")
+    if args.publish or args.refresh_every:
+        stored = default_result_store().save(config, result)
+        log(f"Published to the shared result store as {stored.key}")
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for fmt in formats:
+        path = out_dir / f"madison_report.{fmt}"
+        with open(path, "w", encoding="utf-8") as f:
+            result.write_report(fmt, f)
+        print(path)
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    unknown = sorted(set(formats) - set(REPORT_FORMATS))
+    if unknown:
+        print(f"error: unknown report format(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    try:
+        time_bounds((args.start, args.end))
+    except ValueError as e:
+        print(f"error: invalid --start/--end: {e}", file=sys.stderr)
+        return 2
+    if args.refresh_every is not None and args.refresh_every <= 0:
+        print("error: --refresh-every must be positive", file=sys.stderr)
+        return 2
+    if args.refresh_every and args.no_ai_cache and not args.no_ai:
+        print("error: --refresh-every cannot be combined with --no-ai-cache (every round would be paid calls)",
+              file=sys.stderr)
+        return 2
+
+    log = (lambda message: None) if args.quiet else (lambda message: print(message, file=sys.stderr))
+    if not args.refresh_every:
+        return run_once(args, formats, log)
+    try:
+        while True:
+            # A failed round is reported and retried on the next tick; the worker only stops on Ctrl-C.
+            round_started = time.monotonic()
+            run_once(args, formats, log)
+            time.sleep(max(args.refresh_every - (time.monotonic() - round_started), 0))
+    except KeyboardInterrupt:
+        return 0
@@ -0,0 +1,135 @@
+"""
+Time-indexed news <-> anomaly correlation.
+
+NewsIndex keeps news records sorted by publication time, so the articles
+within a window of any number of anomalies or episodes are found with two
+vectorized binary searches (O((n + m) log n)) instead of an n x m scan.
+"""
+
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+import numpy as np
+
+from madison.episodes import Episodes
+from madison.series import MetricSeries
+
+DEFAULT_WINDOW_HOURS = 24.0
+
+
+def to_epoch_seconds(timestamps) -> np.ndarray:
+    """datetime64 values (or strings numpy can parse) as int64 seconds since the epoch."""
+    return np.asarray(timestamps, dtype="datetime64[s]").astype(np.int64)
+
+
+def _parse_timestamp(value: str) -> int | None:
+    """ISO 8601 (the unified schema) or RFC 822 (raw RSS dates) as epoch seconds, else None."""
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.replace(tzinfo=None) - parsed.utcoffset()
+    return int((parsed - datetime(1970, 1, 1)).total_seconds())
+
+
+class NewsIndex:
+    """News records sorted by timestamp; records without a parseable timestamp are set aside."""
+
+    def __init__(self, news: list[dict]):
+        parsed = [_parse_timestamp(n.get("timestamp", "")) for n in news]
+        dated = [i for i, t in enumerate(parsed) if t is not None]
+        times = np.array([parsed[i] for i in dated], dtype=np.int64)
+        order = np.argsort(times, kind="stable")
+        self.times = times[order]
+        self.records = [news[dated[i]] for i in order]
+        self.undated = [n for n, t in zip(news, parsed) if t is None]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def ranges(self, starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """[lo, hi) positions in self.records of the articles inside each [start, end] (epoch seconds)."""
+        lo = np.searchsorted(self.times, starts, side="left")
+        hi = np.searchsorted(self.times, ends, side="right")
+        return lo, hi
+
+    def around(self, times: np.ndarray, window_s: float) -> tuple[np.ndarray, np.ndarray]:
+        """ranges() for a symmetric window around each point in time."""
+        times = np.asarray(times, dtype=np.int64)
+        return self.ranges(times - int(window_s), times + int(window_s))
+
+
+def related_news_column(index: NewsIndex, anomalies: list[dict], window_s: float) -> list[str]:
+    """Per anomaly record: how many articles fall within the window, and the closest headline."""
+    if not anomalies:
+        return []
+    times = to_epoch_seconds([a["timestamp"] for a in anomalies])
+    lo, hi = index.around(times, window_s)
+    cells = []
+    for t, a, b in zip(times, lo, hi):
+        if a == b:
+            cells.append("")
+            continue
+        closest = a + int(np.argmin(np.abs(index.times[a:b] - t)))
+        cells.append(f"{b - a} — {index.records[closest]['title']}")
+    return cells
+
+
+def correlated_news_context(
+    index: NewsIndex,
+    series: MetricSeries,
+    episodes: Episodes,
+    window_s: float,
+    limit: int = 10,
+) -> list[dict]:
+    """
+    The narrator's news context: articles published within window_s of an
+    anomaly episode, closest first (ties go to the episode with the higher peak),
+    each tagged with the episode it relates to. Remaining slots are filled with
+    the latest articles so the narrator still sees current news when nothing lines up.
+    """
+    context: list[dict] = []
+    used: set[int] = set()
+    if len(index) and len(episodes):
+        starts = to_epoch_seconds(series.timestamps[episodes.starts])
+        ends = to_epoch_seconds(series.timestamps[episodes.ends])
+        lo, hi = index.ranges(starts - int(window_s), ends + int(window_s))
+        rank = np.empty(len(episodes), dtype=np.int64)
+        rank[episodes.by_peak(series.values)] = np.arange(len(episodes))
+        hits = np.flatnonzero(hi > lo)
+        if len(hits):
+            # Expand every (episode, article) pair inside a window without a Python loop.
+            counts = hi[hits] - lo[hits]
+            episode = np.repeat(hits, counts)
+            offsets = np.repeat(np.cumsum(counts) - counts, counts)
+            article = np.repeat(lo[hits], counts) + np.arange(counts.sum()) - offsets
+            t = index.times[article]
+            distance = np.maximum(np.maximum(starts[episode] - t, t - ends[episode]), 0)
+            for k in np.lexsort((rank[episode], distance)):
+                a = int(article[k])
+                if a in used:
+                    continue
+                used.add(a)
+                peak = episodes.peaks[episode[k]]
+                n = index.records[a]
+                context.append({
+                    "source": n["source_name"],
+                    "title": n["title"],
+                    "date": n["timestamp"],
+                    "related_anomaly": f"episode peaking at {series.timestamp_strings([peak])[0]} ({series.values[peak]:.1f}%)",
+                })
+                if len(context) >= limit:
+                    return context
+    for a in range(len(index) - 1, -1, -1):
+        if len(context) >= limit:
+            break
+        if a not in used:
+            n = index.records[a]
+            context.append({"source": n["source_name"], "title": n["title"], "date": n["timestamp"]})
+    for n in index.undated[: max(limit - len(context), 0)]:
+        context.append({"source": n["source_name"], "title": n["title"], "date": n["timestamp"]})
+    return context
@@ -0,0 +1,173 @@
+"""
+Cross-source near-duplicate news collapsing.
+
+TechCrunch, VentureBeat and NewsAPI often carry the same story under slightly
+different titles. Articles are grouped when their normalized URLs match or
+when their titles are near-duplicates: character shingles of the normalized
+title are MinHashed and bucketed with LSH, so only articles that share a
+bucket are compared. Buckets stay small for real news, so the pass remains
+near-linear in the number of articles.
+"""
+
+import re
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+
+SHINGLE_CHARS = 5
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 Jaccard become candidates
+SIMILARITY_THRESHOLD = 0.5
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.default_rng(20240101)
+_PERM_A = _rng.integers(1, 1 << 32, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+# Only keys that are tracking by convention; "ref", "source", "id" and the like can select the content.
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_\w+)$", re.IGNORECASE)
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_url(url: str) -> str:
+    """Lower-case host without www., no fragment, tracking parameters or trailing slash."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k)])
+    return urlunsplit(("", host, parts.path.rstrip("/"), query, ""))
+
+
+def normalize_title(title: str) -> str:
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", title.lower())).strip()
+
+
+def numeric_tokens(title: str) -> frozenset[str]:
+    """Tokens containing digits ("GPT-5", "$10B", "2024"); titles that disagree on them are different stories."""
+    return frozenset(t for t in normalize_title(title).split() if any(c.isdigit() for c in t))
+
+
+def shingles(title: str, k: int = SHINGLE_CHARS) -> set[str]:
+    text = normalize_title(title)
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def minhash(shingle_set: set[str]) -> np.ndarray:
+    """NUM_PERM-value MinHash signature of a shingle set."""
+    if not shingle_set:
+        return np.full(NUM_PERM, _MERSENNE_PRIME, dtype=np.uint64)
+    # Python's string hash is salted per process, which is fine: signatures are only
+    # compared within one run, never stored.
+    hashes = np.fromiter((hash(s) & 0xFFFFFFFF for s in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    # a < 2^32 and h < 2^32, so a * h + b stays inside uint64.
+    return ((hashes[:, None] * _PERM_A + _PERM_B) % _MERSENNE_PRIME).min(axis=0)
+
+
+def jaccard(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def provenance_label(record: dict) -> str:
+    """Where an article came from: the feed name, or the publisher for NewsAPI results."""
+    if record.get("source") == "newsapi":
+        return f"NewsAPI ({record.get('source_name', 'Unknown')})"
+    return record.get("source_name", "Unknown")
+
+
+class _DisjointSet:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> None:
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)  # the earliest article stays the representative
+
+
+@dataclass
+class DedupResult:
+    """Collapsed stories (first-seen article of each group, annotated) and provenance counts."""
+    stories: list[dict]
+    articles: int
+    provenance: dict[str, dict[str, int]]
+
+    @property
+    def collapsed(self) -> int:
+        return self.articles - len(self.stories)
+
+    def counts(self) -> dict:
+        """The entries merged into source_counts."""
+        return {
+            "news_articles": self.articles,
+            "news_unique_stories": len(self.stories),
+            "news_duplicates_collapsed": self.collapsed,
+            "news_provenance": self.provenance,
+        }
+
+
+def collapse_duplicates(news: list[dict], threshold: float = SIMILARITY_THRESHOLD) -> DedupResult:
+    """
+    Group articles that share a normalized URL or have near-identical titles
+    (shingle Jaccard >= threshold and the same numbers). Each group keeps its first article, with
+    "reported_by" (every source that carried the story) and "duplicate_ids" added.
+    """
+    n = len(news)
+    groups = _DisjointSet(n)
+
+    by_url: dict[str, int] = {}
+    for i, record in enumerate(news):
+        url = normalize_url(record.get("url", ""))
+        if url:
+            groups.union(by_url.setdefault(url, i), i)
+
+    shingle_sets = [shingles(record.get("title", "")) for record in news]
+    numbers = [numeric_tokens(record.get("title", "")) for record in news]
+    if n:
+        signatures = np.stack([minhash(s) for s in shingle_sets])
+        rows = NUM_PERM // BANDS
+        for band in range(BANDS):
+            buckets: dict[bytes, list[int]] = {}
+            band_keys = signatures[:, band * rows:(band + 1) * rows]
+            for i in range(n):
+                if not shingle_sets[i]:
+                    continue
+                bucket = buckets.setdefault(band_keys[i].tobytes(), [])
+                # Compare with every earlier member of the bucket that is not already in i's group:
+                # a bucket's first article need not be similar to all the others that landed in it.
+                for j in bucket:
+                    if numbers[j] == numbers[i] and groups.find(j) != groups.find(i) \
+                            and jaccard(shingle_sets[j], shingle_sets[i]) >= threshold:
+                        groups.union(j, i)
+                bucket.append(i)
+
+    # Groups come out in order of their first article, since every root is its group's smallest index.
+    members: dict[int, list[int]] = {}
+    for i in range(n):
+        members.setdefault(groups.find(i), []).append(i)
+
+    stories = []
+    provenance: dict[str, dict[str, int]] = {}
+    for root, idx in members.items():
+        labels = list(dict.fromkeys(provenance_label(news[i]) for i in idx))
+        for label in labels:
+            entry = provenance.setdefault(label, {"articles": 0, "stories": 0, "shared_stories": 0})
+            entry["stories"] += 1
+            entry["shared_stories"] += len(labels) > 1
+        stories.append({
+            **news[root],
+            "reported_by": labels,
+            "duplicate_ids": [news[i]["record_id"] for i in idx[1:]],
+        })
+    for record in news:
+        provenance.setdefault(provenance_label(record), {"articles": 0, "stories": 0, "shared_stories": 0})["articles"] += 1
+    return DedupResult(stories, n, provenance)
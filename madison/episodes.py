@@ -0,0 +1,96 @@
+"""
+Anomaly episodes: runs of consecutive flagged points merged into one period.
+
+A spike that stays above the threshold for an hour is one event, not twelve
+five-minute anomalies. Episodes carry start, end and peak positions as index
+arrays into the series, so thousands of them cost a few array operations.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from madison.series import MetricSeries
+
+
+@dataclass
+class Episodes:
+    """Parallel index arrays into a series: first, last and peak flagged point of each episode."""
+    starts: np.ndarray
+    ends: np.ndarray
+    peaks: np.ndarray
+    points: np.ndarray  # flagged points per episode
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def by_peak(self, values: np.ndarray) -> np.ndarray:
+        """Episode order from the highest peak down."""
+        return np.argsort(-values[self.peaks], kind="stable")
+
+    def records(self, series: MetricSeries, order: np.ndarray | None = None) -> list[dict]:
+        """One dict per episode (in order, default chronological), for prompts and reports."""
+        order = np.arange(len(self)) if order is None else order
+        starts, ends, peaks = self.starts[order], self.ends[order], self.peaks[order]
+        start_ts = series.timestamp_strings(starts)
+        end_ts = series.timestamp_strings(ends)
+        peak_ts = series.timestamp_strings(peaks)
+        minutes = (series.timestamps[ends] - series.timestamps[starts]) // np.timedelta64(1, "m")
+        return [
+            {
+                "record_id": f"{series.record_prefix}_{int(peaks[i]) + 1}",  # the peak's record
+                "start": start_ts[i],
+                "end": end_ts[i],
+                "peak_timestamp": peak_ts[i],
+                "peak_value": round(float(series.values[peaks[i]]), 2),
+                "points": int(self.points[order[i]]),
+                "duration_minutes": int(minutes[i]),
+            }
+            for i in range(len(order))
+        ]
+
+    def prompt_records(self, series: MetricSeries, limit: int) -> tuple[list[dict], dict[str, list]]:
+        """
+        Records of the limit highest-peak episodes (chronological), plus a per-day
+        rollup of all the others: "YYYY-MM-DD" -> [episodes, points, max peak, first
+        start, last end], as prompt_budget.render_episodes takes it. Only the first
+        are ever expanded into dicts, however many episodes the series has.
+        """
+        if len(self) <= limit:
+            return self.records(series), {}
+        order = self.by_peak(series.values)
+        rest = np.sort(order[limit:])
+        day_of_start = series.timestamps[self.starts[rest]].astype("datetime64[D]")
+        # Episodes are chronological, so each day is a contiguous run of them: its first start
+        # is the start of the run's first episode and its last end the end of the run's last.
+        first = np.flatnonzero(np.concatenate(([True], day_of_start[1:] != day_of_start[:-1])))
+        last = np.concatenate((first[1:], [len(rest)])) - 1
+        counts = last - first + 1
+        points = np.add.reduceat(self.points[rest], first)
+        peaks = np.maximum.reduceat(series.values[self.peaks[rest]], first)
+        first_ts = series.timestamp_strings(self.starts[rest[first]])
+        last_ts = series.timestamp_strings(self.ends[rest[last]])
+        unlisted = {
+            first_ts[d][:10]: [int(counts[d]), int(points[d]), round(float(peaks[d]), 2), first_ts[d], last_ts[d]]
+            for d in range(len(first))
+        }
+        return self.records(series, np.sort(order[:limit])), unlisted
+
+
+def find_episodes(values: np.ndarray, mask: np.ndarray, max_gap: int = 1) -> Episodes:
+    """
+    Merge flagged points into episodes. Flagged points at most max_gap positions
+    apart belong to the same episode (max_gap=1 joins only adjacent points).
+    """
+    flagged = np.flatnonzero(mask)
+    if len(flagged) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return Episodes(empty, empty, empty, empty)
+    breaks = np.flatnonzero(np.diff(flagged) > max_gap) + 1
+    first = np.concatenate(([0], breaks))
+    last = np.concatenate((breaks - 1, [len(flagged) - 1]))
+    # Peak per episode: sort flagged points by (episode, -value) and keep the first of each episode.
+    episode_of = np.repeat(np.arange(len(first)), last - first + 1)
+    order = np.lexsort((-values[flagged], episode_of))
+    peaks = flagged[order[first]]
+    return Episodes(flagged[first], flagged[last], peaks, last - first + 1)
@@ -0,0 +1,247 @@
+"""
+Local metric files: CSV, Parquet and Arrow IPC.
+
+A metric source can be a plain path or a file:// URI as well as an HTTP URL.
+Local files skip the HTTP cache entirely and are memory-mapped, so the OS pages
+the data in on demand and nothing is downloaded or buffered twice:
+
+- CSV is streamed from the mapping through the same NAB parser as downloads.
+- Parquet and Arrow IPC (.arrow / .arrows / .feather / .ipc) are read column-projected:
+  only the timestamp and value columns are touched, and their buffers become
+  the MetricSeries arrays without passing through Python strings. A time range
+  is pushed down to Parquet row-group statistics and to Arrow record batches,
+  so data outside it is skipped rather than read and discarded.
+
+pyarrow is imported lazily and only needed for the columnar formats.
+
+The CLI reads any local path it is given. A server that takes sources from
+visitors must pass them through confined_local_path, which only admits files
+under an operator-chosen directory ($MADISON_LOCAL_DATA_ROOT in the dashboard).
+"""
+
+import mmap
+import os
+from pathlib import Path
+from typing import Callable, Iterator
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+import numpy as np
+
+from madison.ingest import STREAM_CHUNK_BYTES, parse_nab_chunks
+from madison.series import TIMESTAMP_DTYPE, MetricSeries
+
+TIMESTAMP_COLUMN = "timestamp"
+VALUE_COLUMN = "value"
+
+FILE_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".arrows": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+LOCAL_ROOT_ENV = "MADISON_LOCAL_DATA_ROOT"
+
+TimeRange = tuple[str | None, str | None]
+
+
+def local_path(source: str) -> Path | None:
+    """The filesystem path of a local source (a path or file:// URI), or None for a remote URL."""
+    parsed = urlparse(source)
+    if parsed.scheme == "file":
+        if parsed.netloc not in ("", "localhost"):
+            raise ValueError(f"Unsupported file URI host: {parsed.netloc}")
+        return Path(url2pathname(parsed.path))
+    # A one-letter "scheme" is a Windows drive letter, not a URL.
+    if parsed.scheme and len(parsed.scheme) > 1:
+        return None
+    return Path(source).expanduser()
+
+
+def confined_local_path(source: str, root: str | os.PathLike | None) -> Path | None:
+    """
+    local_path(source) for sources typed by untrusted users: None for a remote URL,
+    otherwise the real path (symlinks and ".." resolved; relative paths taken from root).
+    Raises PermissionError when no root is configured or the file lies outside it.
+    """
+    path = local_path(source)
+    if path is None:
+        return None
+    if not root:
+        raise PermissionError(f"Local files are disabled on this server (set {LOCAL_ROOT_ENV} to allow a directory)")
+    real_root = os.path.realpath(root)
+    real = os.path.realpath(path if path.is_absolute() else Path(real_root) / path)
+    if os.path.commonpath([real, real_root]) != real_root:
+        raise PermissionError(f"{source} is outside the allowed data directory")
+    return Path(real)
+
+
+def file_format(source: str | os.PathLike) -> str:
+    """"csv", "parquet" or "arrow", from the file (or URL path) extension; unknown extensions are read as CSV."""
+    return FILE_FORMATS.get(Path(urlparse(str(source)).path).suffix.lower(), "csv")
+
+
+def parse_time_range(text: str) -> TimeRange | None:
+    """Parse "START..END" (either side may be empty) into a time range; blank text means no range."""
+    text = text.strip()
+    if not text:
+        return None
+    start, sep, end = text.partition("..")
+    if not sep:
+        raise ValueError('Time range must look like "2014-04-01..2014-04-15" (either side may be empty)')
+    time_range = (start.strip() or None, end.strip() or None)
+    time_bounds(time_range)  # validate now rather than at read time
+    return time_range
+
+
+def time_bounds(time_range: TimeRange | None) -> tuple[np.datetime64 | None, np.datetime64 | None]:
+    """Inclusive (start, end) of a time range as datetime64[ns]; None for an open side."""
+    start, end = time_range or (None, None)
+    return (
+        np.datetime64(start, "ns") if start else None,
+        np.datetime64(end, "ns") if end else None,
+    )
+
+
+def iter_mapped_chunks(path: Path, chunk_size: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+    """Yield a file's bytes chunk by chunk from a read-only memory map."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for start in range(0, len(mapped), chunk_size):
+                yield mapped[start:start + chunk_size]
+
+
+def _pyarrow():
+    try:
+        import pyarrow  # imported lazily: only needed for Parquet / Arrow inputs
+    except ImportError:
+        raise RuntimeError("Reading Parquet or Arrow files requires pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+
+def read_local_series(
+    source: str | os.PathLike,
+    sample_step: int = 1,
+    time_range: TimeRange | None = None,
+    on_progress: Callable[[int, int, int], None] | None = None,
+) -> MetricSeries:
+    """
+    Read a local CSV, Parquet or Arrow IPC file into a time-ordered MetricSeries.
+    sample_step > 1 keeps only every Nth record; time_range keeps only records
+    with start <= timestamp <= end. on_progress(bytes_read, total_bytes, records_kept)
+    is called per chunk for CSV and once for the columnar formats.
+    """
+    path = Path(source) if isinstance(source, os.PathLike) else local_path(source)
+    if path is None:
+        raise ValueError(f"Not a local file: {source}")
+    total = path.stat().st_size
+    fmt = file_format(path)
+    if fmt == "csv":
+        def on_records(received: int, records: int) -> None:
+            if on_progress:
+                on_progress(received, total, records)
+
+        series = parse_nab_chunks(iter_mapped_chunks(path), sample_step, on_records)
+        return series.between(*time_bounds(time_range))
+
+    timestamps, values, errors = (_read_parquet if fmt == "parquet" else _read_arrow)(path, time_range)
+    if sample_step > 1:
+        timestamps, values = timestamps[::sample_step], values[::sample_step]
+    series = MetricSeries(timestamps, values).sorted()
+    series.errors = errors
+    if on_progress:
+        on_progress(total, total, len(series))
+    return series
+
+
+def _read_parquet(path: Path, time_range: TimeRange | None) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    pa = _pyarrow()
+    import pyarrow.parquet as pq
+
+    schema = pq.read_schema(path)
+    _check_columns(schema.names, path)
+    filters = None
+    start, end = time_bounds(time_range)
+    # Only a typed timestamp column has row-group statistics the bounds can be compared against;
+    # string timestamps are filtered after conversion instead.
+    ts_type = schema.field(TIMESTAMP_COLUMN).type
+    if pa.types.is_timestamp(ts_type) and (start is not None or end is not None):
+        # Bounds are naive UTC; give them the column's timezone so Arrow can compare them.
+        bound_type = pa.timestamp("ns", tz=ts_type.tz)
+        filters = []
+        if start is not None:
+            filters.append((TIMESTAMP_COLUMN, ">=", pa.scalar(int(start.astype(np.int64)), bound_type)))
+        if end is not None:
+            filters.append((TIMESTAMP_COLUMN, "<=", pa.scalar(int(end.astype(np.int64)), bound_type)))
+    table = pq.read_table(path, columns=[TIMESTAMP_COLUMN, VALUE_COLUMN], memory_map=True, filters=filters)
+    return _to_arrays(table, start, end)
+
+
+def _read_arrow(path: Path, time_range: TimeRange | None) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    pa = _pyarrow()
+    import pyarrow.compute as pc
+    import pyarrow.ipc
+
+    start, end = time_bounds(time_range)
+    with pa.memory_map(str(path), "r") as mapped:
+        try:
+            reader = pyarrow.ipc.open_file(mapped)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+            schema = reader.schema
+        except pa.ArrowInvalid:
+            mapped.seek(0)
+            reader = pyarrow.ipc.open_stream(mapped)
+            batches, schema = iter(reader), reader.schema
+        _check_columns(schema.names, path)
+        typed = pa.types.is_timestamp(schema.field(TIMESTAMP_COLUMN).type)
+        kept = []
+        for batch in batches:
+            batch = batch.select([TIMESTAMP_COLUMN, VALUE_COLUMN])
+            if typed and (start is not None or end is not None) and batch.num_rows:
+                # Skip whole batches outside the range without converting them.
+                bounds = pc.min_max(batch.column(0).cast(pa.timestamp("ns")).cast(pa.int64())).as_py()
+                low, high = bounds["min"], bounds["max"]
+                if low is None or (end is not None and low > end.astype(np.int64)) or (
+                    start is not None and high < start.astype(np.int64)
+                ):
+                    continue
+            kept.append(batch)
+        if not kept:
+            return np.array([], dtype=TIMESTAMP_DTYPE), np.array([], dtype=np.float64), []
+        return _to_arrays(pa.Table.from_batches(kept), start, end)
+
+
+def _check_columns(names: list[str], path: Path) -> None:
+    missing = [c for c in (TIMESTAMP_COLUMN, VALUE_COLUMN) if c not in names]
+    if missing:
+        raise ValueError(f"{path.name} has no {' or '.join(missing)} column (columns: {', '.join(names)})")
+
+
+def _to_arrays(table, start: np.datetime64 | None, end: np.datetime64 | None) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """Timestamp and value arrays of a two-column table, dropping null rows and rows outside [start, end]."""
+    pa = _pyarrow()
+    errors: list[str] = []
+    try:
+        ts_column = table.column(TIMESTAMP_COLUMN).cast(pa.timestamp("ns"))
+        value_column = table.column(VALUE_COLUMN).cast(pa.float64())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        raise ValueError(f"Cannot read timestamp/value columns: {e}") from None
+    timestamps = ts_column.to_numpy()
+    values = value_column.to_numpy()
+    keep = ~(np.isnat(timestamps) | np.isnan(values))
+    dropped = int(len(keep) - keep.sum())
+    if dropped:
+        errors.append(f"{dropped} rows with a missing timestamp or value were skipped")
+    if start is not None:
+        keep &= timestamps >= start
+    if end is not None:
+        keep &= timestamps <= end
+    if not keep.all():
+        timestamps, values = timestamps[keep], values[keep]
+    return timestamps, values, errors
@@ -0,0 +1,267 @@
+"""
+Request coalescing and admission control shared by every session in a process.
+
+When several dashboard sessions run the same analysis at once they would each
+download the same CSV and send the same prompts. SingleFlight lets the first
+caller for a key do the work while every concurrent caller with the same key
+waits for, and shares, its result (or, for streams, replays its chunks as they
+arrive). A stream is produced on its own thread, so it runs to completion, and
+releases whatever it holds, even when every reader has gone away. Nothing is cached once the call completes; that is the job of the
+HTTP and response caches behind it.
+
+Calls that do reach OpenAI pass through an LLMGate: a bounded number of
+concurrent requests plus token buckets for requests and prompt tokens per
+minute, so bursts queue locally instead of tripping the API's rate limits.
+The gate's stats() report queue depth, in-flight calls and wait times.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from madison.telemetry import record
+
+DEFAULT_MAX_CONCURRENT = 4
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 200_000
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class _Broadcast:
+    """Chunks of one in-flight stream, replayed to every follower."""
+
+    def __init__(self):
+        self.chunks: list = []
+        self.finished = False
+        self.error: BaseException | None = None
+        self.cond = threading.Condition()
+
+    def append(self, chunk) -> None:
+        with self.cond:
+            self.chunks.append(chunk)
+            self.cond.notify_all()
+
+    def close(self, error: BaseException | None = None) -> None:
+        with self.cond:
+            self.finished = True
+            self.error = error
+            self.cond.notify_all()
+
+    def follow(self) -> Iterator:
+        i = 0
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: i < len(self.chunks) or self.finished)
+                pending = self.chunks[i:]
+                finished, error = self.finished, self.error
+            yield from pending
+            i += len(pending)
+            if finished and i >= len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    """At most one in-flight call per key; concurrent callers with the same key share its outcome."""
+
+    def __init__(self):
+        self._calls: dict[str, _Call] = {}
+        self._streams: dict[str, _Broadcast] = {}
+        self._lock = threading.Lock()
+        self.shared = 0  # callers served by another caller's call
+
+    def do(self, key: str, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Return (fn() or the in-flight result for key, whether it was shared). Errors are shared too."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            record(singleflight="shared")
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+        try:
+            call.value = fn()
+            return call.value, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stream(self, key: str, produce: Callable[[], Iterator]) -> Iterator:
+        """
+        Iterate produce() once per key; every iterator for key, the first included, replays
+        its chunks as they arrive. produce() runs on a daemon thread (in the caller's context,
+        so record() still reaches the caller's span) and is always read to the end: a reader
+        that stops early, such as a rerun or a closed session, cannot hold it open.
+        """
+        with self._lock:
+            broadcast = self._streams.get(key)
+            leader = broadcast is None
+            if leader:
+                broadcast = self._streams[key] = _Broadcast()
+            else:
+                self.shared += 1
+        if leader:
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(self._drive, key, produce, broadcast),
+                             name="madison-stream", daemon=True).start()
+        else:
+            record(singleflight="shared")
+        yield from broadcast.follow()
+
+    def _drive(self, key: str, produce: Callable[[], Iterator], broadcast: _Broadcast) -> None:
+        error: BaseException | None = None
+        try:
+            for chunk in produce():
+                broadcast.append(chunk)
+        except BaseException as e:
+            error = e
+        finally:
+            with self._lock:
+                del self._streams[key]
+            broadcast.close(error)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._streams)
+
+
+class TokenBucket:
+    """Refills at rate tokens per second up to capacity; acquire() blocks until enough tokens are available."""
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens (capped at capacity), sleeping as needed; returns the seconds waited."""
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class LLMGate:
+    """Admission for OpenAI calls: a concurrency bound plus request and prompt-token rate limits."""
+
+    def __init__(
+        self,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE,
+    ):
+        self.max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._requests = TokenBucket(requests_per_minute / 60, max(requests_per_minute / 60, 1.0))
+        self._tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute / 60 * 10)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self._calls = 0
+        self._total_wait_s = 0.0
+        self._max_wait_s = 0.0
+        self._recent_waits: deque[float] = deque(maxlen=256)
+
+    @contextmanager
+    def slot(self, prompt_tokens: int = 0) -> Iterator[float]:
+        """Hold one of the concurrent slots for the enclosed call; yields the seconds spent queued."""
+        started = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+        try:
+            self._slots.acquire()
+            try:
+                self._requests.acquire(1)
+                self._tokens.acquire(prompt_tokens)
+            except BaseException:
+                self._slots.release()
+                raise
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._in_flight += 1
+            self._calls += 1
+            self._total_wait_s += waited
+            self._max_wait_s = max(self._max_wait_s, waited)
+            self._recent_waits.append(waited)
+        record(llm_wait_s=round(waited, 4))
+        try:
+            yield waited
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent_waits)
+            return {
+                "queue_depth": self._waiting,
+                "in_flight": self._in_flight,
+                "max_concurrent": self.max_concurrent,
+                "calls": self._calls,
+                "mean_wait_s": round(self._total_wait_s / self._calls, 4) if self._calls else 0.0,
+                "p95_wait_s": round(recent[int(0.95 * (len(recent) - 1))], 4) if recent else 0.0,
+                "max_wait_s": round(self._max_wait_s, 4),
+            }
+
+
+_default_gate: LLMGate | None = None
+_default_gate_lock = threading.Lock()
+
+fetch_flights = SingleFlight()
+completion_flights = SingleFlight()
+
+
+def default_llm_gate() -> LLMGate:
+    """
+    Process-wide gate sized by $MADISON_LLM_CONCURRENCY, $MADISON_LLM_RPM and
+    $MADISON_LLM_TPM (defaults 4 concurrent calls, 500 requests and 200k tokens per minute).
+    """
+    global _default_gate
+    with _default_gate_lock:
+        if _default_gate is None:
+            _default_gate = LLMGate(
+                int(os.environ.get("MADISON_LLM_CONCURRENCY", DEFAULT_MAX_CONCURRENT)),
+                float(os.environ.get("MADISON_LLM_RPM", DEFAULT_REQUESTS_PER_MINUTE)),
+                float(os.environ.get("MADISON_LLM_TPM", DEFAULT_TOKENS_PER_MINUTE)),
+            )
+    return _default_gate
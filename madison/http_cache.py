@@ -0,0 +1,266 @@
+"""
+Persistent HTTP cache with conditional revalidation.
+
+Each cached URL keeps two files under the cache directory:
+
+    <key>.json   metadata: ETag, Last-Modified, parser kind, timestamps
+    <key>.pkl    the parsed result
+
+The raw body is parsed as it streams in and never stored. On the next fetch
+the stored validators are sent as If-None-Match / If-Modified-Since. A 304
+response loads the parsed result straight from disk, so unchanged CSVs and
+feeds are neither re-downloaded nor re-parsed, and the cache survives process
+restarts and redeploys. Every store prunes the directory to max_bytes,
+dropping entries not used within max_age_s and then the least recently used. Concurrent fetches of the same
+URL and parser share one request (see madison.flight), and every request goes
+through the pooled, retrying client in madison.http_client.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import formatdate
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
+
+from madison.flight import fetch_flights
+from madison.http_client import default_http_client
+from madison.telemetry import record
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "madison" / "http"
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_CACHE_MAX_AGE_S = 30 * 24 * 3600.0
+STALE_TMP_S = 3600.0  # temp files this old were left by a crashed writer
+
+
+@dataclass
+class CachedFetch:
+    """A parsed fetch result and how it was obtained ("miss", "not_modified" or "shared")."""
+
+    value: Any
+    status: str
+    bytes_fetched: int = 0
+
+
+class HTTPCache:
+    """On-disk store of parsed responses and their validators, bounded in size and age."""
+
+    def __init__(
+        self,
+        root: str | os.PathLike | None = None,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        max_age_s: float = DEFAULT_CACHE_MAX_AGE_S,
+    ):
+        self.root = Path(root or os.environ.get("MADISON_CACHE_DIR") or DEFAULT_CACHE_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self._prune_lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str, params: dict | None = None) -> str:
+        canonical = json.dumps([url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.root / f"{key}{suffix}"
+
+    def metadata(self, key: str) -> dict | None:
+        try:
+            return json.loads(self._path(key, ".json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def conditional_headers(self, key: str, kind: str) -> dict:
+        """Validators to send for key, or {} if there is nothing reusable for this parser kind."""
+        meta = self.metadata(key)
+        if not meta or meta.get("kind") != kind or not self._path(key, ".pkl").exists():
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def load_parsed(self, key: str) -> Any:
+        with open(self._path(key, ".pkl"), "rb") as f:
+            return pickle.load(f)
+
+    def store(self, key: str, url: str, kind: str, response_headers, parsed: Any) -> None:
+        """Persist the parsed result and validators, then prune the cache back within its bounds."""
+        # Pickled straight into the file: a large series is never also held as one big bytes object.
+        self._atomic_write(key, ".pkl", lambda f: pickle.dump(parsed, f, protocol=pickle.HIGHEST_PROTOCOL))
+        meta = {
+            "url": url,
+            "kind": kind,
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "stored_at": formatdate(time.time(), usegmt=True),
+            "revalidated_at": None,
+        }
+        self._write_json(key, meta)
+        self.prune()
+
+    def prune(self) -> int:
+        """
+        Delete entries last used more than max_age_s ago, then the least recently used
+        ones until the directory fits in max_bytes. Returns the number of entries removed.
+        """
+        now = time.time()
+        entries: dict[str, list] = {}  # key -> [last used, bytes, paths]
+        with self._prune_lock:
+            for path in self.root.iterdir():
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                if path.suffix == ".tmp":
+                    if now - st.st_mtime > STALE_TMP_S:
+                        path.unlink(missing_ok=True)
+                    continue
+                entry = entries.setdefault(path.name.split(".", 1)[0], [0.0, 0, []])
+                entry[0] = max(entry[0], st.st_mtime)  # touch() rewrites the .json on every 304
+                entry[1] += st.st_size
+                entry[2].append(path)
+            total = sum(size for _, size, _ in entries.values())
+            removed = 0
+            for used, size, paths in sorted(entries.values(), key=lambda e: e[0]):
+                if now - used <= self.max_age_s and total <= self.max_bytes:
+                    break
+                for path in paths:
+                    path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+            return removed
+
+    def touch(self, key: str) -> None:
+        meta = self.metadata(key)
+        if meta is not None:
+            meta["revalidated_at"] = formatdate(time.time(), usegmt=True)
+            self._write_json(key, meta)
+
+    def _write_json(self, key: str, meta: dict) -> None:
+        data = json.dumps(meta, indent=2).encode("utf-8")
+        self._atomic_write(key, ".json", lambda f: f.write(data))
+
+    def _atomic_write(self, key: str, suffix: str, write: Callable[[BinaryIO], Any]) -> None:
+        """Call write(file) on a temporary file, then move it into place; a failed write leaves nothing behind."""
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=f"{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, self._path(key, suffix))
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+
+_default_cache: HTTPCache | None = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache() -> HTTPCache:
+    """
+    Process-wide cache rooted at $MADISON_CACHE_DIR (or ~/.cache/madison/http) and
+    bounded by $MADISON_CACHE_MAX_MB (default 512 MB).
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            max_mb = float(os.environ.get("MADISON_CACHE_MAX_MB", DEFAULT_CACHE_MAX_BYTES / 1024 / 1024))
+            _default_cache = HTTPCache(max_bytes=int(max_mb * 1024 * 1024))
+    return _default_cache
+
+
+def cached_fetch(
+    url: str,
+    parse: Callable[[Iterator[bytes]], Any],
+    kind: str,
+    params: dict | None = None,
+    cache: HTTPCache | None = None,
+    timeout: float = 30,
+    chunk_size: int = 64 * 1024,
+    on_progress: Callable[[int, int], None] | None = None,
+    revalidate: bool = True,
+) -> CachedFetch:
+    """
+    GET url through the persistent cache and return parse(body_chunks).
+    kind names the parser (and its options); results parsed by a different kind
+    are never reused. parse may raise to reject a body, in which case nothing is cached.
+    on_progress(bytes_received, content_length) is called per chunk on a full download.
+    A caller that joins an identical fetch already in flight waits for its result
+    (status "shared", no progress callbacks) instead of sending a second request.
+    """
+    cache = cache or default_cache()
+    flight_key = f"{cache.root}:{cache.key(url, params)}:{kind}:{revalidate}"
+    fetched, shared = fetch_flights.do(
+        flight_key, lambda: _fetch(url, parse, kind, params, cache, timeout, chunk_size, on_progress, revalidate),
+    )
+    if shared:
+        record(http_cache="shared")
+        return CachedFetch(fetched.value, "shared")
+    return fetched
+
+
+def _fetch(
+    url: str,
+    parse: Callable[[Iterator[bytes]], Any],
+    kind: str,
+    params: dict | None,
+    cache: HTTPCache,
+    timeout: float,
+    chunk_size: int,
+    on_progress: Callable[[int, int], None] | None,
+    revalidate: bool,
+) -> CachedFetch:
+    key = cache.key(url, params)
+    headers = cache.conditional_headers(key, kind) if revalidate else {}
+
+    refetch = False
+    with default_http_client().get(url, params=params, headers=headers, timeout=timeout) as resp:
+        if resp.status_code == 304 and headers:
+            try:
+                value = cache.load_parsed(key)
+            except Exception:
+                # The parsed artifact vanished, is corrupt or no longer unpickles: fetch in full instead,
+                # once this response has given its connection back to the pool.
+                refetch = True
+            else:
+                cache.touch(key)
+                record(http_cache="not_modified")
+                return CachedFetch(value, "not_modified")
+        else:
+            resp.raise_for_status()
+
+            total = int(resp.headers.get("Content-Length") or 0)
+            fetched = 0
+            network_s = 0.0
+
+            def counted(chunks: Iterable[bytes]) -> Iterator[bytes]:
+                # Time spent waiting on the socket, so a span can split download from parsing.
+                nonlocal fetched, network_s
+                chunks = iter(chunks)
+                while True:
+                    started = time.perf_counter()
+                    chunk = next(chunks, None)
+                    network_s += time.perf_counter() - started
+                    if chunk is None:
+                        return
+                    fetched += len(chunk)
+                    if on_progress:
+                        on_progress(fetched, total)
+                    yield chunk
+
+            value = parse(counted(resp.iter_content(chunk_size=chunk_size)))
+
+    if refetch:
+        return _fetch(url, parse, kind, params, cache, timeout, chunk_size, on_progress, revalidate=False)
+    cache.store(key, url, kind, resp.headers, value)
+    record(bytes=fetched, http_cache="miss", network_s=round(network_s, 4))
+    return CachedFetch(value, "miss", fetched)
@@ -0,0 +1,134 @@
+"""
+Shared pooled HTTP client for every fetcher.
+
+All downloads (NAB CSV, RSS feeds, NewsAPI) go through one requests.Session,
+so connections are kept alive and reused across fetches instead of paying a
+new TCP and TLS handshake each time. Each host gets a bounded connection pool;
+callers beyond the bound wait for a free connection rather than opening more,
+but only for a bounded time, so a leaked or stuck connection fails the request
+instead of hanging it.
+Connection errors, timeouts and transient statuses (429 and 5xx) are retried
+with full-jitter exponential backoff, honouring Retry-After when the server
+sends one. Responses are streamed: only the headers are read before returning.
+"""
+
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError
+
+from madison.telemetry import record
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+DEFAULT_MAX_PER_HOST = 4
+DEFAULT_RETRIES = 3
+DEFAULT_POOL_WAIT_S = 60.0
+USER_AGENT = "madison-transparency-agent/1.0 (+https://github.com/Ankit240619/Madison-Framework)"
+
+
+def _bounded_wait(pool_class: type, wait_s: float) -> type:
+    """pool_class whose requests wait at most wait_s for a free connection (requests never passes pool_timeout)."""
+
+    class BoundedWaitPool(pool_class):
+        def urlopen(self, *args, pool_timeout=None, **kwargs):
+            return super().urlopen(*args, pool_timeout=wait_s if pool_timeout is None else pool_timeout, **kwargs)
+
+    return BoundedWaitPool
+
+
+class HTTPClient:
+    """Keep-alive session with per-host connection limits and jittered retries."""
+
+    def __init__(
+        self,
+        max_per_host: int = DEFAULT_MAX_PER_HOST,
+        retries: int = DEFAULT_RETRIES,
+        backoff_s: float = 0.5,
+        max_backoff_s: float = 8.0,
+        max_hosts: int = 16,
+        pool_wait_s: float = DEFAULT_POOL_WAIT_S,
+    ):
+        self.retries = retries
+        self.pool_wait_s = pool_wait_s
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        # pool_block: past max_per_host connections to one host, callers wait (up to pool_wait_s) for a free one.
+        adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=max_per_host, pool_block=True, max_retries=0)
+        adapter.poolmanager.pool_classes_by_scheme = {
+            "http": _bounded_wait(HTTPConnectionPool, pool_wait_s),
+            "https": _bounded_wait(HTTPSConnectionPool, pool_wait_s),
+        }
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def backoff(self, attempt: int, retry_after: str | None = None) -> float:
+        """Delay before retry number attempt + 1: Retry-After seconds if given, else full jitter."""
+        if retry_after and retry_after.strip().isdigit():
+            return min(float(retry_after), self.max_backoff_s)
+        return random.uniform(0, min(self.max_backoff_s, self.backoff_s * 2 ** attempt))
+
+    def get(
+        self,
+        url: str,
+        params: dict | None = None,
+        headers: dict | None = None,
+        timeout: float = 30,
+    ) -> requests.Response:
+        """
+        Streamed GET. Use the response as a context manager so its connection goes
+        back to the pool. Only the request and its headers are retried; a failure
+        while the body is being read propagates to the caller. Raises
+        requests.ConnectionError, without retrying, when no pooled connection to the
+        host frees up within pool_wait_s.
+        """
+        attempt = 0
+        while True:
+            try:
+                resp = self.session.get(url, params=params, headers=headers, timeout=timeout, stream=True)
+            except EmptyPoolError:
+                raise requests.ConnectionError(
+                    f"No free connection to {requests.utils.urlparse(url).netloc} after {self.pool_wait_s:g}s"
+                ) from None
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+                delay = self.backoff(attempt)
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    if attempt:
+                        record(http_retries=attempt)
+                    return resp
+                delay = self.backoff(attempt, resp.headers.get("Retry-After"))
+                resp.close()
+            attempt += 1
+            time.sleep(delay)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_default_client: HTTPClient | None = None
+_default_client_lock = threading.Lock()
+
+
+def default_http_client() -> HTTPClient:
+    """
+    Process-wide client sized by $MADISON_HTTP_MAX_PER_HOST, $MADISON_HTTP_RETRIES and
+    $MADISON_HTTP_POOL_WAIT_S (defaults 4 connections per host, 3 retries, 60 s wait for a connection).
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HTTPClient(
+                int(os.environ.get("MADISON_HTTP_MAX_PER_HOST", DEFAULT_MAX_PER_HOST)),
+                int(os.environ.get("MADISON_HTTP_RETRIES", DEFAULT_RETRIES)),
+                pool_wait_s=float(os.environ.get("MADISON_HTTP_POOL_WAIT_S", DEFAULT_POOL_WAIT_S)),
+            )
+    return _default_client
@@ -0,0 +1,75 @@
+"""
+Streaming NAB CSV parsing.
+
+Turns an iterator of raw byte chunks into a MetricSeries without ever holding
+the whole body or a list of all its lines in memory.
+"""
+
+from typing import Callable, Iterable, Iterator
+
+from madison.series import MetricSeries, MetricSeriesBuilder
+
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def iter_stream_lines(chunks: Iterable[bytes], on_bytes: Callable[[int], None] | None = None) -> Iterator[str]:
+    """
+    Re-assemble an iterator of raw byte chunks into decoded text lines.
+    Only the current partial line is buffered, so memory stays bounded by the
+    chunk size regardless of how large the response body is.
+    """
+    pending = b""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if on_bytes:
+            on_bytes(len(chunk))
+        pending += chunk
+        *complete, pending = pending.split(b"\n")
+        for raw in complete:
+            yield raw.decode("utf-8", errors="replace").rstrip("\r")
+    if pending:
+        yield pending.decode("utf-8", errors="replace").rstrip("\r")
+
+
+def parse_nab_lines(lines: Iterable[str], sample_step: int = 1, builder: MetricSeriesBuilder | None = None) -> MetricSeries:
+    """
+    Parse "timestamp,value" CSV lines (header first) into a time-ordered MetricSeries.
+    sample_step > 1 keeps only every Nth data row; malformed rows are recorded in series.errors.
+    """
+    builder = builder or MetricSeriesBuilder()
+    lines = iter(lines)
+    next(lines, None)  # header row
+    for i, line in enumerate(lines, start=1):
+        if (i - 1) % sample_step:
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        parts = line.split(",")
+        if len(parts) < 2:
+            builder.errors.append(f"Row {i}: expected timestamp,value")
+            continue
+        builder.add(parts[0], parts[1], row=i)
+    return builder.build().sorted()
+
+
+def parse_nab_chunks(
+    chunks: Iterable[bytes],
+    sample_step: int = 1,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> MetricSeries:
+    """
+    Parse a NAB CSV body from raw byte chunks as they arrive.
+    on_progress(bytes_received, records_parsed) is called once per chunk.
+    """
+    builder = MetricSeriesBuilder()
+    received = 0
+
+    def on_bytes(n: int) -> None:
+        nonlocal received
+        received += n
+        if on_progress:
+            on_progress(received, len(builder))
+
+    return parse_nab_lines(iter_stream_lines(chunks, on_bytes), sample_step, builder)
@@ -0,0 +1,202 @@
+"""
+AI calls (mirror the AI Anomaly Detector & AI Insights Narrator nodes).
+
+Prompt builders are pure functions; the call helpers go through the persistent
+response cache. The OpenAI SDK is only imported when a client is created.
+"""
+
+import json
+
+from madison.anomaly_analysis import RESPONSE_FORMAT, AnomalyAnalysis, ConfirmedAnomaly, severity_for
+from madison.llm_cache import cached_completion, stream_completion
+from madison.prompt_budget import DayRollup, estimate_tokens, point_episodes, render_episodes
+
+DETECTOR_TOKEN_BUDGET = 1500
+
+
+def make_client(api_key: str):
+    """Return an OpenAI client, or None when there is no key or the SDK is not installed."""
+    if not api_key:
+        return None
+    try:
+        from openai import OpenAI
+    except ImportError:
+        return None
+    return OpenAI(api_key=api_key)
+
+
+def build_detector_prompt(
+    metrics_summary: dict,
+    episodes: list[dict] | None = None,
+    token_budget: int = DETECTOR_TOKEN_BUDGET,
+    unlisted_episodes: DayRollup | None = None,
+) -> str:
+    """
+    Render the anomaly-classification prompt.
+    Uses the same prompt as the n8n AI Anomaly Detector node, except that the
+    anomaly records are replaced by compact episode lines that fill whatever is
+    left of token_budget, and the response shape is enforced by the structured-output
+    schema instead of an inline JSON example. Without episodes, potential_anomalies
+    are listed as single-point episodes. unlisted_episodes is the per-day rollup of
+    episodes not passed as records (see Episodes.prompt_records).
+    """
+    if episodes is None:
+        episodes = point_episodes(metrics_summary.get("potential_anomalies", []))
+    template = _detector_template(metrics_summary)
+    section_budget = token_budget - estimate_tokens(template.replace("{episodes}", ""))
+    return template.replace("{episodes}", render_episodes(episodes, section_budget, unlisted_episodes))
+
+
+def _detector_template(metrics_summary: dict) -> str:
+    return f"""You are a KPI Anomaly Detection Agent for the Madison Transparency system. Analyze the following CPU utilization metrics and identify anomalies.
+
+## Metrics Summary:
+- Total Records: {metrics_summary['total_records']}
+- Metric: {metrics_summary['metric_name']}
+- Average: {metrics_summary['average']}%
+- Min: {metrics_summary['min']}%
+- Max: {metrics_summary['max']}%
+- Std Deviation: {metrics_summary['std_dev']}
+- Anomaly Threshold (1.5 σ): {metrics_summary['anomaly_threshold']}%
+- Potential Anomalies Found: {metrics_summary['potential_anomalies_count']}
+
+## Anomaly Episodes (consecutive readings above the threshold; one line each, or summarized per day):
+{{episodes}}
+
+## Your Task:
+1. Analyze the metrics and confirm which are true anomalies
+2. Classify each anomaly severity: CRITICAL (>80%), HIGH (60-80%), MEDIUM (40-60%)
+3. Identify any patterns (time-based, consecutive spikes, etc.)
+4. Report each confirmed episode under its peak_record_id, with its peak time and value
+5. Assess the overall risk level and recommend actions"""
+
+
+def call_anomaly_detector(
+    client,
+    metrics_summary: dict,
+    bypass_cache: bool = False,
+    episodes: list[dict] | None = None,
+    token_budget: int = DETECTOR_TOKEN_BUDGET,
+    unlisted_episodes: DayRollup | None = None,
+) -> AnomalyAnalysis:
+    """
+    Send metrics summary and anomaly episodes to GPT-4o-mini for classification,
+    constrained to the AnomalyAnalysis JSON schema (structured outputs, strict mode).
+    Identical prompts are answered from the persistent response cache unless bypass_cache is set.
+    """
+    try:
+        prompt = build_detector_prompt(metrics_summary, episodes, token_budget, unlisted_episodes)
+        text, hit = cached_completion(client, prompt, temperature=0.3, bypass=bypass_cache, response_format=RESPONSE_FORMAT)
+        try:
+            return AnomalyAnalysis.from_json(text)
+        except ValueError:
+            if not hit:
+                raise
+            # A cached answer that no longer validates: ask again and overwrite it.
+            text, _ = cached_completion(client, prompt, temperature=0.3, bypass=True, response_format=RESPONSE_FORMAT)
+            return AnomalyAnalysis.from_json(text)
+    except Exception as e:
+        return AnomalyAnalysis.unavailable(str(e))
+
+
+def build_narrator_prompt(anomaly_analysis: AnomalyAnalysis, news_context: list[dict]) -> str:
+    """
+    Render the executive-summary prompt.
+    Uses the EXACT same prompt from the n8n AI Insights Narrator node.
+    """
+    news_json = json.dumps(news_context[:10], indent=2, default=str)
+
+    prompt = f"""You are the Insight Narrator for the Madison Transparency Agent. Your job is to generate clear, business-friendly explanations of KPI anomalies.
+
+## Anomaly Analysis Results:
+{anomaly_analysis.to_json()}
+
+## Recent News Context:
+{news_json}
+
+## Your Task:
+Generate a professional executive summary that:
+1. Summarizes the key findings in plain English (no technical jargon)
+2. Correlates anomalies with any relevant news if applicable
+3. Provides actionable recommendations for stakeholders
+4. Rates overall system health: HEALTHY / WARNING / CRITICAL
+
+Respond in this format:
+
+# Madison Transparency Agent - Executive Summary
+
+## Overall System Health: [HEALTHY/WARNING/CRITICAL]
+
+## Key Findings
+[2-3 bullet points summarizing the most important discoveries]
+
+## Anomaly Details
+[Brief description of each critical/high anomaly in business terms]
+
+## Potential Business Context
+[Any correlations with news or market events]
+
+## Recommended Actions
+[3-5 specific, actionable recommendations]
+
+## Next Steps
+[What should stakeholders do immediately]"""
+    return prompt
+
+
+def call_insights_narrator(client, anomaly_analysis: AnomalyAnalysis, news_context: list[dict], bypass_cache: bool = False) -> str:
+    """
+    Generate executive summary from anomaly results + news context.
+    Identical prompts are answered from the persistent response cache unless bypass_cache is set.
+    """
+    try:
+        text, _ = cached_completion(client, build_narrator_prompt(anomaly_analysis, news_context), temperature=0.4, bypass=bypass_cache)
+        return text
+    except Exception as e:
+        return f"# Error\n\nInsight generation failed: {e}"
+
+
+def stream_insights_narrator(client, anomaly_analysis: AnomalyAnalysis, news_context: list[dict], bypass_cache: bool = False):
+    """
+    Streaming variant of call_insights_narrator: yields the executive summary as it is generated.
+    """
+    try:
+        yield from stream_completion(client, build_narrator_prompt(anomaly_analysis, news_context), temperature=0.4, bypass=bypass_cache)
+    except Exception as e:
+        yield f"# Error\n\nInsight generation failed: {e}"
+
+
+def offline_analysis(stats: dict, sigma_multiplier: float) -> tuple[AnomalyAnalysis, str]:
+    """
+    Statistics-only stand-ins for the detector output and executive summary,
+    used when no OpenAI key is configured. Returns (anomaly_analysis, executive_summary).
+    """
+    anomaly_analysis = AnomalyAnalysis(
+        analysis_summary="AI analysis unavailable — no API key configured.",
+        confirmed_anomalies=[
+            ConfirmedAnomaly(
+                record_id=a["record_id"],
+                timestamp=a["timestamp"],
+                value=a["metric_value"],
+                severity=severity_for(a["metric_value"]),
+                reason=f"Value {a['metric_value']}% exceeds threshold {stats['anomaly_threshold']}%",
+            )
+            for a in stats.get("potential_anomalies", [])
+        ],
+        risk_level="HIGH" if stats.get("potential_anomalies_count", 0) > 3 else "MEDIUM",
+    )
+    executive_summary = f"""# Madison Transparency Agent - Executive Summary
+
+## Overall System Health: {"CRITICAL" if stats.get("potential_anomalies_count", 0) > 5 else "WARNING" if stats.get("potential_anomalies_count", 0) > 0 else "HEALTHY"}
+
+## Key Findings
+- Analyzed {stats['total_records']} CPU utilization records from the NAB benchmark dataset.
+- Detected {stats['potential_anomalies_count']} potential anomalies above the {stats['anomaly_threshold']}% threshold ({sigma_multiplier}σ).
+- CPU utilization ranged from {stats['min']}% to {stats['max']}% with an average of {stats['average']}%.
+
+## Recommended Actions
+1. Investigate timestamps where CPU exceeded {stats['anomaly_threshold']}%.
+2. Set up real-time alerting for values above {round(stats['anomaly_threshold'] * 0.9, 1)}%.
+3. Review workload scaling policies.
+"""
+    return anomaly_analysis, executive_summary
@@ -0,0 +1,219 @@
+"""
+Content-addressed cache for chat completions.
+
+Responses are keyed by a hash of (model, temperature, fully rendered prompt),
+so an identical request is answered from disk instead of the API. Entries are
+stored in a small SQLite database and evicted by age and by total size
+(least recently used first). Hit / miss counters are kept per process.
+
+Misses are coalesced per key across concurrent callers and admitted through
+the process-wide LLMGate (see madison.flight) before reaching the API.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Iterator
+
+from madison.flight import completion_flights, default_llm_gate
+from madison.prompt_budget import estimate_tokens
+from madison.telemetry import record
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "madison" / "llm_responses.sqlite3"
+
+
+class ResponseCache:
+    """SQLite-backed prompt -> completion cache with size- and age-based eviction."""
+
+    def __init__(
+        self,
+        path: str | os.PathLike | None = None,
+        max_bytes: int = 50 * 1024 * 1024,
+        max_age_s: float = 7 * 24 * 3600,
+    ):
+        self.path = Path(path or os.environ.get("MADISON_LLM_CACHE") or DEFAULT_CACHE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER,"
+                " created_at REAL, last_used REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    @staticmethod
+    def key(model: str, temperature: float, prompt: str, **options) -> str:
+        payload = json.dumps([model, temperature, prompt, options], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock, closing(self._connect()) as db, db:
+            row = db.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at >= ?",
+                (key, now - self.max_age_s),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def note_bypass(self) -> None:
+        """Count a request that skipped the lookup on purpose as a miss, so the hit rate stays honest."""
+        with self._lock:
+            self.misses += 1
+
+    def put(self, key: str, model: str, response: str) -> None:
+        now = time.time()
+        with self._lock, closing(self._connect()) as db, db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode("utf-8")), now, now),
+            )
+            self._evict(db, now)
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age_s,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        with self._lock, closing(self._connect()) as db, db:
+            db.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        with closing(self._connect()) as db:
+            entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+_default_cache: ResponseCache | None = None
+_default_cache_lock = threading.Lock()
+
+
+def default_response_cache() -> ResponseCache:
+    """Process-wide response cache at $MADISON_LLM_CACHE (or ~/.cache/madison)."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+    return _default_cache
+
+
+def cached_completion(
+    client,
+    prompt: str,
+    model: str = "gpt-4o-mini",
+    temperature: float = 0.3,
+    cache: ResponseCache | None = None,
+    bypass: bool = False,
+    response_format: dict | None = None,
+) -> tuple[str, bool]:
+    """
+    Return (completion text, cache_hit) for a single-user-message chat request.
+    response_format (e.g. a strict JSON schema) is passed to the API and is part of the cache key.
+    With bypass=True the API is always called, and the fresh answer still refreshes the cache.
+    Concurrent identical requests share one API call (the followers get cache_hit=False).
+    API errors and refusals propagate and are never cached.
+    """
+    cache = cache or default_response_cache()
+    options = {"response_format": response_format} if response_format else {}
+    key = cache.key(model, temperature, prompt, **options)
+    if bypass:
+        cache.note_bypass()
+    else:
+        cached = cache.get(key)
+        if cached is not None:
+            record(cache_hits=1)
+            return cached, True
+
+    def call() -> str:
+        with default_llm_gate().slot(estimate_tokens(prompt)):
+            response = client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                **options,
+            )
+        message = response.choices[0].message
+        if getattr(message, "refusal", None):
+            raise RuntimeError(f"Model refused: {message.refusal}")
+        if response.usage:
+            record(prompt_tokens=response.usage.prompt_tokens, completion_tokens=response.usage.completion_tokens)
+        cache.put(key, model, message.content)
+        return message.content
+
+    text, _ = completion_flights.do(key, call)
+    return text, False
+
+
+def stream_completion(
+    client,
+    prompt: str,
+    model: str = "gpt-4o-mini",
+    temperature: float = 0.3,
+    cache: ResponseCache | None = None,
+    bypass: bool = False,
+):
+    """
+    Like cached_completion, but yield the completion as text deltas as they arrive.
+    A cache hit yields the stored text in one piece; a fully streamed answer is
+    written to the cache when the stream ends (never on error). The API stream is
+    read on its own thread while holding an LLMGate slot, so the slot is released
+    when the answer is complete even if the caller stops iterating early.
+    Concurrent identical streams share one API call and receive the same deltas.
+    """
+    cache = cache or default_response_cache()
+    key = cache.key(model, temperature, prompt)
+    if bypass:
+        cache.note_bypass()
+    else:
+        cached = cache.get(key)
+        if cached is not None:
+            record(cache_hits=1)
+            yield cached
+            return
+
+    def deltas() -> Iterator[str]:
+        # Runs on the flight's thread: the slot is held only while the API is streaming.
+        with default_llm_gate().slot(estimate_tokens(prompt)):
+            stream = client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            parts = []
+            for chunk in stream:
+                if chunk.usage:  # the final chunk carries token usage and no choices
+                    record(prompt_tokens=chunk.usage.prompt_tokens, completion_tokens=chunk.usage.completion_tokens)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+            cache.put(key, model, "".join(parts))
+
+    yield from completion_flights.stream(key, deltas)
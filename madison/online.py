@@ -0,0 +1,186 @@
+"""
+Incremental online anomaly detection.
+
+OnlineDetector keeps a running estimate of the mean and variance and scores
+each new point against it before folding it in, with O(1) work per point:
+
+- "ewma":    exponentially weighted mean/variance (West/Finch incremental form)
+- "rolling": exact mean/variance over the last `window` points, maintained with
+             Welford add/remove updates
+
+The detector state is a small JSON-serializable dict, so a new batch of points
+only advances the stored state instead of recomputing over the whole history.
+"""
+
+import math
+from collections import deque
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from madison.series import MetricSeries
+
+ONLINE_MODES = ("ewma", "rolling")
+
+
+@dataclass
+class OnlineScores:
+    """Per-point output of the detector, aligned with the series it scored."""
+
+    z_scores: np.ndarray
+    thresholds: np.ndarray
+    flags: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    @classmethod
+    def empty(cls) -> "OnlineScores":
+        return cls(np.empty(0), np.empty(0), np.empty(0, dtype=bool))
+
+    def extend(self, other: "OnlineScores") -> "OnlineScores":
+        return OnlineScores(
+            np.concatenate([self.z_scores, other.z_scores]),
+            np.concatenate([self.thresholds, other.thresholds]),
+            np.concatenate([self.flags, other.flags]),
+        )
+
+
+@dataclass
+class OnlineDetector:
+    """Streaming z-score detector; flags points above mean + k * std of the running estimate."""
+
+    mode: str = "ewma"
+    k: float = 3.0
+    alpha: float = 0.02
+    window: int = 288
+    warmup: int = 30
+    count: int = 0
+    mean: float = 0.0
+    var: float = 0.0
+    m2: float = 0.0
+    last_timestamp: int | None = None
+    scored_digest: str | None = None  # MetricSeries.prefix_digest of the points absorbed so far
+    recent: deque = field(default_factory=deque)
+
+    def __post_init__(self):
+        if self.mode not in ONLINE_MODES:
+            raise ValueError(f"mode must be one of {ONLINE_MODES}, got {self.mode!r}")
+        self.recent = deque(self.recent, maxlen=self.window if self.mode == "rolling" else 0)
+
+    # ---- state ----
+
+    def params(self) -> dict:
+        return {"mode": self.mode, "k": self.k, "alpha": self.alpha, "window": self.window, "warmup": self.warmup}
+
+    def to_dict(self) -> dict:
+        return {
+            **self.params(),
+            "count": self.count,
+            "mean": self.mean,
+            "var": self.var,
+            "m2": self.m2,
+            "last_timestamp": self.last_timestamp,
+            "scored_digest": self.scored_digest,
+            "recent": list(self.recent),
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "OnlineDetector":
+        return cls(**state)
+
+    @property
+    def std(self) -> float:
+        if self.mode == "ewma":
+            return math.sqrt(self.var)
+        n = len(self.recent)
+        return math.sqrt(self.m2 / n) if n else 0.0
+
+    @property
+    def threshold(self) -> float:
+        """Current upper threshold (mean + k * std) for the next point."""
+        return self.mean + self.k * self.std
+
+    # ---- updates ----
+
+    def _push(self, x: float) -> None:
+        self.count += 1
+        if self.mode == "ewma":
+            if self.count == 1:
+                self.mean, self.var = x, 0.0
+                return
+            diff = x - self.mean
+            incr = self.alpha * diff
+            self.mean += incr
+            self.var = (1.0 - self.alpha) * (self.var + diff * incr)
+            return
+
+        if len(self.recent) == self.recent.maxlen:
+            old = self.recent[0]
+            n = len(self.recent) - 1
+            if n:
+                delta = old - self.mean
+                self.mean -= delta / n
+                self.m2 -= delta * (old - self.mean)
+            else:
+                self.mean, self.m2 = 0.0, 0.0
+        self.recent.append(x)
+        n = len(self.recent)
+        delta = x - self.mean
+        self.mean += delta / n
+        self.m2 = max(self.m2 + delta * (x - self.mean), 0.0)
+
+    def update(self, timestamps: np.ndarray, values: np.ndarray) -> tuple[int, OnlineScores]:
+        """
+        Score and absorb the points newer than the last one seen.
+        Returns (offset, scores) where scores covers timestamps[offset:].
+        """
+        ts = np.asarray(timestamps).view("int64")
+        offset = 0 if self.last_timestamp is None else int(np.searchsorted(ts, self.last_timestamp, side="right"))
+        new_values = np.asarray(values, dtype=np.float64)[offset:]
+        n = len(new_values)
+        z_scores = np.zeros(n)
+        thresholds = np.full(n, np.nan)
+        flags = np.zeros(n, dtype=bool)
+        for i, x in enumerate(new_values.tolist()):
+            if self.count >= self.warmup:
+                std = self.std
+                thresholds[i] = self.mean + self.k * std
+                if std > 0:
+                    z = (x - self.mean) / std
+                    z_scores[i] = z
+                    flags[i] = z > self.k
+            self._push(x)
+        if n:
+            self.last_timestamp = int(ts[-1])
+        return offset, OnlineScores(z_scores, thresholds, flags)
+
+
+def score_incrementally(
+    series: MetricSeries,
+    params: dict,
+    previous: tuple[dict, OnlineScores] | None = None,
+) -> tuple[dict, OnlineScores]:
+    """
+    Score series with a detector built from params, reusing previous = (state, scores)
+    when it was produced by the same params over a prefix of this series: the first
+    len(scores) points must hash to the digest recorded in the state, so a corrected
+    or backfilled value anywhere in the prefix forces a full rescore.
+    Returns the new (state, scores) pair, with scores aligned to the whole series.
+    """
+    if previous is not None and isinstance(previous[0], dict):  # not another detector's state
+        state, scores = previous
+        detector = OnlineDetector.from_dict(state)
+        if (
+            detector.params() == OnlineDetector(**params).params()
+            and detector.count == len(scores) <= len(series)
+            and detector.scored_digest == series.prefix_digest(len(scores))
+        ):
+            offset, new_scores = detector.update(series.timestamps, series.values)
+            if offset == len(scores):
+                detector.scored_digest = series.prefix_digest()
+                return detector.to_dict(), scores.extend(new_scores)
+    detector = OnlineDetector(**params)
+    _, scores = detector.update(series.timestamps, series.values)
+    detector.scored_digest = series.prefix_digest()
+    return detector.to_dict(), scores
@@ -0,0 +1,300 @@
+"""
+Headless fetch -> stats -> AI -> report pipeline.
+
+The same stages the dashboard runs, without any Streamlit dependency, so the
+analysis can be imported by a cron job, a worker or a test. Sources are fetched
+concurrently through SourceRunner and the anomaly detector starts as soon as
+the metrics are ready, overlapping the news fetches exactly like the app.
+"""
+
+import io
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Iterator, TextIO
+
+import numpy as np
+
+from madison.anomaly_analysis import AnomalyAnalysis
+from madison.correlate import DEFAULT_WINDOW_HOURS, NewsIndex, correlated_news_context
+from madison.dedup import collapse_duplicates
+from madison.episodes import Episodes, find_episodes
+from madison.llm import call_anomaly_detector, call_insights_narrator, make_client, offline_analysis
+from madison.online import OnlineDetector, OnlineScores, score_incrementally
+from madison.prompt_budget import listable_episodes
+from madison.reports import write_html_report, write_json_report
+from madison.runner import SourceRunner
+from madison.seasonal import SeasonalProfile, score_seasonal
+from madison.sampling import SamplingPolicy
+from madison.series import MetricSeries
+from madison.sources import (
+    DEFAULT_NAB_URL,
+    NEWSAPI_URL,
+    TECHCRUNCH_FEED_URL,
+    VENTUREBEAT_FEED_URL,
+    fetch_nab_csv,
+    fetch_newsapi,
+    fetch_rss,
+)
+from madison.stats import statistics_with_mask, with_anomalies
+from madison.telemetry import RunTrace
+
+SOURCE_TIMEOUT_S = 45.0  # per-source wall-clock budget for the concurrent fetch phase
+AI_TIMEOUT_S = 120.0  # budget for the anomaly-detector call running alongside the fetches
+
+SOURCE_LABELS = {
+    "kaggle_nab": "NAB CPU utilization CSV",
+    "techcrunch_rss": "TechCrunch RSS feed",
+    "venturebeat_rss": "VentureBeat AI RSS feed",
+    "newsapi": "NewsAPI articles",
+}
+
+
+@dataclass
+class PipelineConfig:
+    """Everything one analysis run depends on (the dashboard's Configuration panel)."""
+    csv_url: str = DEFAULT_NAB_URL
+    time_range: tuple[str | None, str | None] | None = None
+    techcrunch_feed_url: str = TECHCRUNCH_FEED_URL
+    venturebeat_feed_url: str = VENTUREBEAT_FEED_URL
+    newsapi_url: str = NEWSAPI_URL
+    news_query: str = "AI analytics metrics"
+    news_window_hours: float = DEFAULT_WINDOW_HOURS
+    sigma_multiplier: float = 1.5
+    enable_nab: bool = True
+    enable_techcrunch: bool = True
+    enable_venturebeat: bool = True
+    enable_newsapi: bool = True
+    online_params: dict | None = None
+    sampling: SamplingPolicy = field(default_factory=SamplingPolicy)
+    openai_api_key: str = ""
+    newsapi_key: str = ""
+    use_ai_cache: bool = True
+    source_timeout: float = SOURCE_TIMEOUT_S
+    ai_timeout: float = AI_TIMEOUT_S
+
+
+@dataclass
+class MetricsAnalysis:
+    """Statistics for one series plus the per-point anomaly mask and the episodes it forms."""
+    stats: dict
+    anomaly_mask: np.ndarray
+    episodes: Episodes
+    online_scores: OnlineScores | None = None
+    detector_state: dict | SeasonalProfile | None = None
+
+
+@dataclass
+class PipelineResult:
+    """Outputs of one run, with the three downloadable reports."""
+    stats: dict
+    anomaly_analysis: AnomalyAnalysis
+    executive_summary: str
+    source_counts: dict
+    news: list[dict]
+    series: MetricSeries | None = None
+    analysis: MetricsAnalysis | None = None
+    errors: dict[str, str] = field(default_factory=dict)
+    trace: RunTrace | None = None
+
+    def anomaly_records(self) -> Iterator[dict] | None:
+        """Every flagged record, expanded lazily in chunks (None when no series was analyzed)."""
+        if self.series is None or self.analysis is None:
+            return None
+        return self.series.iter_records(np.flatnonzero(self.analysis.anomaly_mask))
+
+    def write_report(self, fmt: str, out: TextIO, report_date: str | None = None) -> None:
+        """Stream one report format ("html", "json" or "md") into a text file object."""
+        if fmt == "html":
+            report_date = report_date or datetime.now().strftime("%A, %B %d, %Y")
+            write_html_report(out, self.stats, self.executive_summary, self.anomaly_analysis, report_date,
+                              anomalies=self.anomaly_records())
+        elif fmt == "json":
+            performance = self.trace.to_dict() if self.trace else None
+            write_json_report(out, self.stats, self.executive_summary, self.anomaly_analysis, self.source_counts,
+                              performance, anomalies=self.anomaly_records())
+        elif fmt == "md":
+            out.write(self.executive_summary)
+        else:
+            raise ValueError(f"Unknown report format: {fmt!r}")
+
+    def report(self, fmt: str, report_date: str | None = None) -> str:
+        out = io.StringIO()
+        self.write_report(fmt, out, report_date)
+        return out.getvalue()
+
+    def html_report(self, report_date: str | None = None) -> str:
+        return self.report("html", report_date)
+
+    def json_report(self) -> str:
+        return self.report("json")
+
+    def markdown_report(self) -> str:
+        return self.executive_summary
+
+
+def analyze_metrics(
+    series: MetricSeries,
+    sigma_multiplier: float,
+    sampling: SamplingPolicy,
+    online_params: dict | None = None,
+    previous: tuple[dict | SeasonalProfile, OnlineScores] | None = None,
+) -> MetricsAnalysis:
+    """
+    Global statistics for the series and, when online_params is set, the online
+    or seasonal detector's flags in place of the global threshold. previous is the
+    (detector_state, scores) pair from an earlier run over the same series, so only
+    new points are scored (or, for the seasonal profile, merged in).
+    Mirrors: Code in JavaScript4 node.
+    """
+    stats, mask = statistics_with_mask(
+        series,
+        sigma_multiplier,
+        max_anomaly_records=sampling.llm_max_anomalies,
+        anomaly_selection=sampling.llm_anomaly_selection,
+    )
+    if not online_params:
+        return MetricsAnalysis(stats, mask, find_episodes(series.values, mask))
+    if online_params["mode"] == "seasonal":
+        detector_state, online_scores = score_seasonal(series, online_params, previous)
+        threshold = online_scores.thresholds[-1] if len(online_scores.thresholds) else np.nan  # the latest point's slot
+    else:
+        detector_state, online_scores = score_incrementally(series, online_params, previous)
+        threshold = OnlineDetector.from_dict(detector_state).threshold
+    if not np.isfinite(threshold):
+        # The latest slot (or a detector still warming up) has no threshold yet, e.g. a flat slot whose
+        # MAD is 0. Report the median of the defined ones, or the global threshold, never NaN.
+        defined = online_scores.thresholds[np.isfinite(online_scores.thresholds)]
+        threshold = float(np.median(defined)) if len(defined) else stats["anomaly_threshold"]
+    stats = with_anomalies(
+        stats,
+        series,
+        online_scores.flags,
+        threshold=threshold,
+        max_anomaly_records=sampling.llm_max_anomalies,
+        anomaly_selection=sampling.llm_anomaly_selection,
+    )
+    episodes = find_episodes(series.values, online_scores.flags)
+    return MetricsAnalysis(stats, online_scores.flags, episodes, online_scores, detector_state)
+
+
+def news_context(
+    news: list[dict],
+    series: MetricSeries,
+    episodes: Episodes,
+    window_hours: float = DEFAULT_WINDOW_HOURS,
+    limit: int = 10,
+) -> list[dict]:
+    """
+    The compact headline list handed to the insights narrator: articles published
+    within window_hours of an anomaly episode first, then the latest news.
+    """
+    return correlated_news_context(NewsIndex(news), series, episodes, window_hours * 3600, limit)
+
+
+def run_pipeline(
+    config: PipelineConfig,
+    on_event: Callable[[str], None] | None = None,
+    trace: RunTrace | None = None,
+) -> PipelineResult:
+    """
+    Run every enabled source, the statistics and the two AI calls, and return
+    the results. on_event receives one human-readable line per stage.
+    Every stage is timed as a span on trace (a new RunTrace by default).
+    Without an OpenAI key the statistics-only summary is used.
+    """
+    emit = on_event or (lambda message: None)
+    trace = trace or RunTrace()
+    with trace.span("setup.ai_client"):
+        client = make_client(config.openai_api_key)
+    series: MetricSeries | None = None
+    analysis: MetricsAnalysis | None = None
+    all_records: list[dict] = []
+    source_counts: dict = {}
+    errors: dict[str, str] = {}
+
+    with SourceRunner(timeout=config.source_timeout) as runner:
+        if config.enable_nab:
+            runner.submit("kaggle_nab", trace.wrap("fetch.kaggle_nab", fetch_nab_csv), config.csv_url,
+                          time_range=config.time_range)
+        if config.enable_techcrunch:
+            runner.submit("techcrunch_rss", trace.wrap("fetch.techcrunch_rss", fetch_rss), config.techcrunch_feed_url, "TechCrunch", "rss_techcrunch")
+        if config.enable_venturebeat:
+            runner.submit("venturebeat_rss", trace.wrap("fetch.venturebeat_rss", fetch_rss), config.venturebeat_feed_url, "VentureBeat AI", "rss_venturebeat")
+        if config.enable_newsapi:
+            if config.newsapi_key:
+                runner.submit("newsapi", trace.wrap("fetch.newsapi", fetch_newsapi), config.news_query, config.newsapi_key, config.newsapi_url)
+            else:
+                emit("NewsAPI key not configured — skipping.")
+                source_counts["newsapi"] = 0
+
+        fetch_names = runner.pending
+        while any(name in runner.pending for name in fetch_names):
+            for result in runner.poll(interval=0.1):
+                if result.name not in SOURCE_LABELS:
+                    continue  # the anomaly detector finishing early; collected below
+                label = SOURCE_LABELS[result.name]
+                if not result.ok:
+                    errors[result.name] = result.error
+                    emit(f"{label}: failed after {result.elapsed:.2f}s — {result.error}")
+                elif result.name == "kaggle_nab":
+                    series = result.value
+                    source_counts["kaggle_nab"] = len(series)
+                    emit(f"{label}: {len(series)} metric records loaded in {result.elapsed:.2f}s")
+                    if len(series):
+                        with trace.span("stats") as span:
+                            analysis = analyze_metrics(series, config.sigma_multiplier, config.sampling, config.online_params)
+                            span.record(records=len(series))
+                        if client:
+                            listed, unlisted = analysis.episodes.prompt_records(series, listable_episodes(config.sampling.llm_token_budget))
+                            runner.submit("ai_detector", trace.wrap("ai.detector", call_anomaly_detector), client, analysis.stats,
+                                          timeout=config.ai_timeout, bypass_cache=not config.use_ai_cache,
+                                          episodes=listed, unlisted_episodes=unlisted,
+                                          token_budget=config.sampling.llm_token_budget)
+                else:
+                    all_records.extend(result.value)
+                    source_counts[result.name] = len(result.value)
+                    emit(f"{label}: {len(result.value)} news articles loaded in {result.elapsed:.2f}s")
+
+        source_counts["total"] = len(all_records) + source_counts.get("kaggle_nab", 0)
+        with trace.span("dedup") as span:
+            dedup = collapse_duplicates([r for r in all_records if r.get("record_type") == "news"])
+            span.record(records=dedup.articles)
+        news = dedup.stories
+        source_counts.update(dedup.counts())
+        if dedup.collapsed:
+            emit(f"Collapsed {dedup.collapsed} duplicate articles into {len(news)} unique stories")
+        if analysis is None:
+            raise RuntimeError("No metric records were loaded. Enable the NAB CSV source and try again.")
+        stats = analysis.stats
+
+        if client:
+            while "ai_detector" in runner.pending:
+                runner.poll(interval=0.1)
+            detector_result = runner.results["ai_detector"]
+            if detector_result.ok:
+                anomaly_analysis = detector_result.value
+            else:
+                anomaly_analysis = AnomalyAnalysis.unavailable(detector_result.error)
+            emit("GPT-4o-mini: anomaly classification ready")
+            with trace.span("correlate") as span:
+                context = news_context(news, series, analysis.episodes, config.news_window_hours)
+                span.record(records=len(news))
+            with trace.span("ai.narrator"):
+                executive_summary = call_insights_narrator(client, anomaly_analysis, context,
+                                                           bypass_cache=not config.use_ai_cache)
+            emit("GPT-4o-mini: executive summary ready")
+        else:
+            emit("OpenAI API key not configured — statistical analysis only.")
+            anomaly_analysis, executive_summary = offline_analysis(stats, config.sigma_multiplier)
+
+    return PipelineResult(
+        stats=stats,
+        anomaly_analysis=anomaly_analysis,
+        executive_summary=executive_summary,
+        source_counts=source_counts,
+        news=news,
+        series=series,
+        analysis=analysis,
+        errors=errors,
+        trace=trace,
+    )
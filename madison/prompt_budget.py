@@ -0,0 +1,149 @@
+"""
+Token-budgeted anomaly sections for LLM prompts.
+
+The detector prompt used to embed the first ten anomaly records as indented
+JSON, repeating source, metric name and record type on every one and silently
+dropping the rest. Here anomalies arrive as episodes and are written one CSV
+line each. Episodes are added highest peak first until the token budget is
+spent; whatever does not fit is still summarized per day, so the model sees
+every anomalous period. Only the episodes that can possibly fit need to be
+records; the rest may arrive already rolled up per day (Episodes.prompt_records),
+so a series with hundreds of thousands of episodes never becomes as many dicts.
+"""
+
+import math
+from functools import lru_cache
+
+EPISODE_COLUMNS = "peak_record_id,start,end,peak_time,peak_pct,points,minutes"
+CHARS_PER_TOKEN = 4  # fallback estimate when tiktoken is not installed
+MIN_LINE_TOKENS = 5  # an episode line (record id, start minute, peak, ...) plus its newline never costs less
+
+DayRollup = dict[str, list]  # "YYYY-MM-DD" -> [episodes, points, max peak, first start, last end]
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")  # GPT-4o family
+    except Exception:
+        return None  # encoding files unavailable (e.g. offline); fall back to the estimate
+
+
+def estimate_tokens(text: str) -> int:
+    """Prompt tokens for text: exact with tiktoken, otherwise ~4 characters per token."""
+    encoder = _encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def listable_episodes(token_budget: int) -> int:
+    """Upper bound on how many episode lines fit in token_budget: callers need no more records than this."""
+    return max(token_budget // MIN_LINE_TOKENS, 1)
+
+
+def _minute(timestamp: str) -> str:
+    """"YYYY-MM-DD HH:MM:SS" without zero seconds, which NAB timestamps always have."""
+    return timestamp[:-3] if timestamp.endswith(":00") and len(timestamp) == 19 else timestamp
+
+
+def point_episodes(anomalies: list[dict]) -> list[dict]:
+    """Unified-schema anomaly records as single-point episodes, for callers without an episode list."""
+    return [
+        {
+            "record_id": a["record_id"],
+            "start": a["timestamp"],
+            "end": a["timestamp"],
+            "peak_timestamp": a["timestamp"],
+            "peak_value": a["metric_value"],
+            "points": 1,
+            "duration_minutes": 0,
+        }
+        for a in anomalies
+    ]
+
+
+def episode_line(episode: dict) -> str:
+    """One CSV line; end and peak_time are left empty when they equal start (single-point spikes)."""
+    start = episode["start"]
+    return ",".join([
+        str(episode["record_id"]),
+        _minute(start),
+        "" if episode["end"] == start else _minute(episode["end"]),
+        "" if episode["peak_timestamp"] == start else _minute(episode["peak_timestamp"]),
+        f"{episode['peak_value']:.1f}",
+        str(episode["points"]),
+        str(episode["duration_minutes"]),
+    ])
+
+
+def _day_totals(episodes: list[dict], unlisted: DayRollup | None = None) -> DayRollup:
+    """Per-day totals of episode records, merged into a copy of an existing per-day rollup."""
+    days = {day: list(totals) for day, totals in (unlisted or {}).items()}
+    for e in episodes:
+        day = days.setdefault(e["start"][:10], [0, 0, float("-inf"), e["start"], e["end"]])
+        day[0] += 1
+        day[1] += e["points"]
+        day[2] = max(day[2], e["peak_value"])
+        day[3] = min(day[3], e["start"])
+        day[4] = max(day[4], e["end"])
+    return days
+
+
+def _day_rollups(days: DayRollup) -> list[str]:
+    return [f"{day}: {n} episodes, {p} points, peak {peak:.1f}%" for day, (n, p, peak, _, _) in sorted(days.items())]
+
+
+def _overall_rollup(days: DayRollup) -> str:
+    totals = list(days.values())
+    episodes = sum(t[0] for t in totals)
+    points = sum(t[1] for t in totals)
+    peak = max(t[2] for t in totals)
+    first, last = min(t[3] for t in totals), max(t[4] for t in totals)
+    return f"{episodes} more episodes ({points} points) between {_minute(first)} and {_minute(last)}, peak {peak:.1f}%"
+
+
+def render_episodes(episodes: list[dict], token_budget: int, unlisted: DayRollup | None = None) -> str:
+    """
+    The episode section of a prompt in at most ~token_budget tokens: a header, one
+    line per episode (chosen by peak, listed chronologically) and a rollup of the
+    episodes that did not fit. unlisted is a per-day rollup of further episodes
+    that were not passed as records; they are counted and rolled up but never listed.
+    """
+    if not episodes and not unlisted:
+        return "No anomaly episodes."
+    unlisted = unlisted or {}
+    count = len(episodes) + sum(t[0] for t in unlisted.values())
+    points = sum(e["points"] for e in episodes) + sum(t[1] for t in unlisted.values())
+    header = (f"{count} episodes, {points} anomalous points. "
+              f"Columns: {EPISODE_COLUMNS} (empty end/peak_time = same as start)")
+    lines = [episode_line(e) for e in episodes]
+    costs = [estimate_tokens(line) + 1 for line in lines]  # +1 for the newline
+    available = token_budget - estimate_tokens(header) - 1
+    if not unlisted and sum(costs) <= available:
+        return "\n".join([header, *lines])
+
+    # Keep room for the rollup of whatever is left out. The per-day rollup of all
+    # episodes is an upper bound on it; fall back to one line if even that is too big.
+    rollup_title = "Not listed (lower peaks), by day:"
+    all_days = _day_totals(episodes, unlisted)
+    day_cost = estimate_tokens("\n".join([rollup_title, *_day_rollups(all_days)])) + 1
+    per_day = day_cost <= available // 2
+    reserve = day_cost if per_day else estimate_tokens(_overall_rollup(all_days)) + 1
+
+    chosen: list[int] = []
+    spent = 0
+    for i in sorted(range(len(episodes)), key=lambda i: -episodes[i]["peak_value"]):
+        if spent + costs[i] > available - reserve:
+            break
+        chosen.append(i)
+        spent += costs[i]
+    chosen.sort()
+    listed = set(chosen)
+    rest = _day_totals([e for i, e in enumerate(episodes) if i not in listed], unlisted)
+    rollup = [rollup_title, *_day_rollups(rest)] if per_day else [_overall_rollup(rest)]
+    return "\n".join([header, *(lines[i] for i in chosen), *rollup])
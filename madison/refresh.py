@@ -0,0 +1,267 @@
+"""
+Background refresh of precomputed analyses, shared across sessions.
+
+A RefreshWorker periodically runs the headless pipeline for a set of watched
+configurations and writes each finished PipelineResult to a ResultStore. The
+store lives on disk, so every dashboard session, and every process (a
+separate `python -m madison --refresh-every N` worker included), reads the
+same latest result instead of paying the fetch + GPT-4o-mini latency itself.
+
+Results are keyed by the source inputs only (CSV URL and time range, feeds,
+news query and which sources are enabled); detection settings are re-applied by the reader,
+so one stored run serves every σ and detection mode.
+"""
+
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from madison.pipeline import PipelineConfig, PipelineResult, run_pipeline
+from madison.stages import stage_key
+
+logger = logging.getLogger("madison.refresh")
+
+DEFAULT_RESULT_DIR = Path.home() / ".cache" / "madison" / "results"
+DEFAULT_REFRESH_INTERVAL_S = 900.0
+DEFAULT_RESULT_MAX_ENTRIES = 32
+DEFAULT_RESULT_MAX_AGE_S = 7 * 24 * 3600.0
+
+SOURCE_FIELDS = (
+    "csv_url",
+    "time_range",
+    "techcrunch_feed_url",
+    "venturebeat_feed_url",
+    "newsapi_url",
+    "news_query",
+    "enable_nab",
+    "enable_techcrunch",
+    "enable_venturebeat",
+    "enable_newsapi",
+)
+
+
+def source_key(config: PipelineConfig) -> str:
+    """Store key of a configuration: what is fetched, never how it is analyzed (or any secret)."""
+    return stage_key("sources", {name: getattr(config, name) for name in SOURCE_FIELDS})
+
+
+@dataclass
+class StoredResult:
+    """A finished run as kept in the store, with the configuration it ran with (minus secrets)."""
+    key: str
+    result: PipelineResult
+    config: PipelineConfig
+    finished_at: float
+    origin: str  # "scheduled" or "on_demand"
+
+    @property
+    def age_s(self) -> float:
+        return time.time() - self.finished_at
+
+    @property
+    def with_ai(self) -> bool:
+        return self.config.openai_api_key != ""
+
+
+class ResultStore:
+    """
+    Latest PipelineResult per source key, pickled under <root>/<key>.pkl and memoized by mtime.
+    Every save prunes results older than max_age_s and, past max_entries, the least recently saved.
+    """
+
+    def __init__(
+        self,
+        root: str | os.PathLike | None = None,
+        max_entries: int = DEFAULT_RESULT_MAX_ENTRIES,
+        max_age_s: float = DEFAULT_RESULT_MAX_AGE_S,
+    ):
+        self.root = Path(root or os.environ.get("MADISON_RESULT_DIR") or DEFAULT_RESULT_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+        self._memo: dict[str, tuple[int, StoredResult]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.pkl"
+
+    def save(self, config: PipelineConfig, result: PipelineResult, origin: str = "scheduled") -> StoredResult:
+        """Atomically replace the stored result for config's sources."""
+        key = source_key(config)
+        # Keys are not persisted; only whether the run had AI analysis is kept.
+        public = PipelineConfig(**{**config.__dict__, "openai_api_key": "set" if config.openai_api_key else "",
+                                   "newsapi_key": ""})
+        stored = StoredResult(key, result, public, time.time(), origin)
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=f"{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(stored, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.prune()
+        return stored
+
+    def prune(self) -> int:
+        """Delete expired results and the oldest ones past max_entries; returns how many were removed."""
+        entries = []
+        for path in self.root.glob("*.pkl"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue  # removed by another process meanwhile
+        entries.sort(reverse=True)
+        cutoff = time.time() - self.max_age_s
+        doomed = [path for i, (mtime, path) in enumerate(entries) if i >= self.max_entries or mtime < cutoff]
+        for path in doomed:
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self._memo.pop(path.stem, None)
+        return len(doomed)
+
+    def load(self, key: str) -> StoredResult | None:
+        """The latest stored result, unpickled only when the file changed since the last load."""
+        path = self._path(key)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            memo = self._memo.get(key)
+            if memo is not None and memo[0] == mtime:
+                return memo[1]
+        try:
+            with open(path, "rb") as f:
+                stored = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError) as e:
+            logger.warning("Ignoring unreadable stored result %s: %s", path.name, e)
+            return None
+        with self._lock:
+            self._memo[key] = (mtime, stored)
+        return stored
+
+    def latest(self, config: PipelineConfig) -> StoredResult | None:
+        return self.load(source_key(config))
+
+
+@dataclass
+class RefreshStatus:
+    """Outcome of the last scheduled refresh of one configuration."""
+    key: str
+    started_at: float
+    wall_s: float = 0.0
+    error: str | None = None
+
+
+class RefreshWorker:
+    """
+    Daemon thread that re-runs every watched configuration each interval_s seconds.
+    Configurations whose stored result is younger than the interval (for example
+    after an on-demand run) are skipped until it ages out.
+    """
+
+    def __init__(
+        self,
+        store: ResultStore,
+        interval_s: float = DEFAULT_REFRESH_INTERVAL_S,
+        max_watched: int = 8,
+        runner: Callable[[PipelineConfig], PipelineResult] = run_pipeline,
+    ):
+        self.store = store
+        self.interval_s = interval_s
+        self.max_watched = max_watched
+        self._runner = runner
+        self._watched: OrderedDict[str, PipelineConfig] = OrderedDict()
+        self._status: dict[str, RefreshStatus] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def watch(self, config: PipelineConfig) -> str:
+        """
+        Keep config's sources refreshed; the least recently watched one is dropped past max_watched.
+        Configurations that bypass the AI response cache are refused: every round would be paid calls.
+        """
+        if config.openai_api_key and not config.use_ai_cache:
+            raise ValueError("Refusing to schedule a configuration that bypasses the AI response cache")
+        key = source_key(config)
+        with self._lock:
+            self._watched[key] = config
+            self._watched.move_to_end(key)
+            while len(self._watched) > self.max_watched:
+                self._watched.popitem(last=False)
+        return key
+
+    def status(self) -> dict[str, RefreshStatus]:
+        with self._lock:
+            return dict(self._status)
+
+    def refresh(self, config: PipelineConfig) -> StoredResult | None:
+        """Run the pipeline for config now and store the result; errors are logged and kept in status()."""
+        key = source_key(config)
+        status = RefreshStatus(key, time.time())
+        with self._lock:
+            self._status[key] = status
+        started = time.perf_counter()
+        try:
+            return self.store.save(config, self._runner(config), origin="scheduled")
+        except Exception as e:
+            status.error = f"{type(e).__name__}: {e}"
+            logger.warning("Refresh of %s failed: %s", config.csv_url, status.error)
+            return None
+        finally:
+            status.wall_s = time.perf_counter() - started
+
+    def run_once(self) -> int:
+        """Refresh every watched configuration whose stored result is due; returns how many ran."""
+        with self._lock:
+            due = list(self._watched.values())
+        ran = 0
+        for config in due:
+            if self._stop.is_set():
+                break
+            stored = self.store.latest(config)
+            if stored is not None and stored.age_s < self.interval_s:
+                continue
+            self.refresh(config)
+            ran += 1
+        return ran
+
+    def start(self) -> "RefreshWorker":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="madison-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.run_once()
+            # Wake often enough to pick up configurations whose results age out between rounds.
+            self._stop.wait(min(self.interval_s, 60.0))
+
+
+_default_store: ResultStore | None = None
+_default_store_lock = threading.Lock()
+
+
+def default_result_store() -> ResultStore:
+    """Process-wide store rooted at $MADISON_RESULT_DIR (or ~/.cache/madison/results)."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ResultStore()
+    return _default_store
@@ -0,0 +1,149 @@
+"""
+Report generation (mirrors the Format final output node).
+
+The write_* functions stream a report into any text file object, so large
+reports (with every anomaly listed) go straight to disk; the generate_*
+functions build the small in-memory versions.
+"""
+
+import io
+import json
+from datetime import datetime
+from typing import Iterable, TextIO
+
+from madison.anomaly_analysis import AnomalyAnalysis
+
+
+def _health(metrics_summary: dict) -> tuple[str, str]:
+    count = metrics_summary.get("potential_anomalies_count", 0)
+    if count == 0:
+        return "HEALTHY", "#28a745"
+    if count > 5:
+        return "CRITICAL", "#dc3545"
+    return "WARNING", "#FFC107"
+
+
+def write_html_report(
+    out: TextIO,
+    metrics_summary: dict,
+    executive_summary: str,
+    anomaly_analysis: AnomalyAnalysis,
+    report_date: str,
+    anomalies: Iterable[dict] | None = None,
+) -> None:
+    """
+    Write the styled HTML report to out section by section. anomalies (every flagged
+    record, e.g. from MetricSeries.iter_records) adds a full anomaly table streamed row by row.
+    """
+    health, health_color = _health(metrics_summary)
+    out.write(f"""<!DOCTYPE html>
+<html>
+<head>
+<title>Madison Transparency Agent Report</title>
+<style>
+body{{font-family:Arial,sans-serif;max-width:800px;margin:0 auto;padding:20px;background:#f5f5f5}}
+.container{{background:white;padding:30px;border-radius:8px;box-shadow:0 2px 8px rgba(0,0,0,0.1)}}
+h1{{color:#1E3A5F;border-bottom:2px solid #1E3A5F;padding-bottom:10px}}
+h2{{color:#2E5A8F}}
+.health{{background-color:{health_color}22;padding:15px;border-radius:5px;border-left:4px solid {health_color};margin:15px 0}}
+.stat{{background:#E8F4FD;padding:10px;margin:5px 0;border-radius:4px}}
+.action{{background:#E8F5E9;padding:10px;margin:5px 0;border-radius:4px}}
+pre{{background:#f4f4f4;padding:12px;border-radius:6px;overflow-x:auto;font-size:0.85em}}
+table{{border-collapse:collapse;width:100%;font-size:0.85em}}
+td,th{{border-bottom:1px solid #ddd;padding:4px 8px;text-align:left}}
+</style>
+</head>
+<body>
+<div class="container">
+<h1>Madison Transparency Agent</h1>
+<p>Report Generated: {report_date}</p>
+<div class="health"><strong>System Health: {health}</strong><br>{metrics_summary.get('potential_anomalies_count',0)} anomalies detected in {metrics_summary.get('total_records',0)} records</div>
+
+<h2>Key Metrics</h2>
+<div class="stat">Records Analyzed: {metrics_summary.get('total_records',0)}</div>
+<div class="stat">Average CPU: {metrics_summary.get('average',0)}%</div>
+<div class="stat">Min CPU: {metrics_summary.get('min',0)}% | Max CPU: {metrics_summary.get('max',0)}%</div>
+<div class="stat">Std Deviation: {metrics_summary.get('std_dev',0)}</div>
+<div class="stat">Anomaly Threshold: {metrics_summary.get('anomaly_threshold',0)}%</div>
+<div class="stat">Anomalies Found: {metrics_summary.get('potential_anomalies_count',0)}</div>
+
+<h2>Executive Summary</h2>
+<pre>{executive_summary}</pre>
+
+<h2>Anomaly Analysis</h2>
+<pre>{anomaly_analysis.to_json()}</pre>
+""")
+    if anomalies is not None:
+        out.write("\n<h2>All Anomalies</h2>\n<table>\n<tr><th>Record ID</th><th>Timestamp</th><th>CPU (%)</th></tr>\n")
+        for a in anomalies:
+            out.write(f"<tr><td>{a['record_id']}</td><td>{a['timestamp']}</td><td>{a['metric_value']:.2f}</td></tr>\n")
+        out.write("</table>\n")
+    out.write("""
+<p><em>Powered by Madison Transparency Agent + OpenAI GPT-4o-mini</em></p>
+</div>
+</body>
+</html>""")
+
+
+def generate_html_report(metrics_summary: dict, executive_summary: str, anomaly_analysis: AnomalyAnalysis, report_date: str) -> str:
+    """Generate a styled HTML report matching the n8n workflow output."""
+    out = io.StringIO()
+    write_html_report(out, metrics_summary, executive_summary, anomaly_analysis, report_date)
+    return out.getvalue()
+
+
+def generate_json_report(
+    metrics_summary: dict,
+    executive_summary: str,
+    anomaly_analysis: AnomalyAnalysis,
+    source_counts: dict,
+    performance: dict | None = None,
+) -> dict:
+    """
+    Generate JSON report matching the n8n workflow output.
+    performance (RunTrace.to_dict()) is added to report_metadata when given.
+    """
+    report_metadata = {
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "agent_name": "Madison Transparency Agent",
+        "ai_model": "GPT-4o-mini",
+    }
+    if performance is not None:
+        report_metadata["performance"] = performance
+    return {
+        "report_metadata": report_metadata,
+        "executive_summary": executive_summary,
+        "anomaly_analysis": anomaly_analysis.to_dict(),
+        "metrics_summary": metrics_summary,
+        "data_sources": source_counts,
+    }
+
+
+def write_json_report(
+    out: TextIO,
+    metrics_summary: dict,
+    executive_summary: str,
+    anomaly_analysis: AnomalyAnalysis,
+    source_counts: dict,
+    performance: dict | None = None,
+    anomalies: Iterable[dict] | None = None,
+) -> None:
+    """
+    Write the JSON report to out with two-space indentation, one top-level key at a
+    time. anomalies adds an "all_anomalies" list written one compact record per line.
+    """
+    report = generate_json_report(metrics_summary, executive_summary, anomaly_analysis, source_counts, performance)
+    encoder = json.JSONEncoder(indent=2, default=str, ensure_ascii=False)
+    out.write("{")
+    for i, (key, value) in enumerate(report.items()):
+        out.write(("," if i else "") + f"\n  {json.dumps(key)}: ")
+        for chunk in encoder.iterencode(value):
+            # Newlines only occur between tokens (inside strings they are escaped), so re-indenting is safe.
+            out.write(chunk.replace("\n", "\n  "))
+    if anomalies is not None:
+        out.write(',\n  "all_anomalies": [')
+        for i, a in enumerate(anomalies):
+            record = {"record_id": a["record_id"], "timestamp": a["timestamp"], "value": a["metric_value"]}
+            out.write(("," if i else "") + "\n    " + json.dumps(record))
+        out.write("\n  ]")
+    out.write("\n}")
@@ -0,0 +1,94 @@
+"""
+Concurrent source runner.
+
+Runs independent fetches on a thread pool so the fetch phase costs the slowest
+source rather than the sum of all of them. Each source has its own deadline;
+sources that fail or run past it are reported as such and simply left out of
+the results, so one slow feed never blocks the rest of the pipeline.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+@dataclass
+class SourceResult:
+    """Outcome of one source: its value, or the error / timeout that replaced it."""
+
+    name: str
+    value: Any = None
+    error: str | None = None
+    elapsed: float = 0.0
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class SourceRunner:
+    """Submit named callables, then poll for results as they complete."""
+
+    def __init__(self, timeout: float = 45.0, max_workers: int = 8, initializer: Callable | None = None):
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="madison-source", initializer=initializer)
+        self._futures: dict[str, Future] = {}
+        self._started: dict[str, float] = {}
+        self._deadlines: dict[str, float] = {}
+        self.results: dict[str, SourceResult] = {}
+
+    def __enter__(self) -> "SourceRunner":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+    def submit(self, name: str, fn: Callable, *args, timeout: float | None = None, **kwargs) -> None:
+        """Start fn(*args, **kwargs) in the pool under the given source name."""
+        now = time.perf_counter()
+        self._started[name] = now
+        self._deadlines[name] = now + (self.timeout if timeout is None else timeout)
+        self._futures[name] = self._pool.submit(fn, *args, **kwargs)
+
+    @property
+    def pending(self) -> list[str]:
+        return list(self._futures)
+
+    def poll(self, interval: float = 0.1) -> list[SourceResult]:
+        """
+        Wait up to interval seconds and return the sources that finished
+        (successfully, with an error, or by exceeding their deadline) since the last poll.
+        """
+        finished: list[SourceResult] = []
+        if not self._futures:
+            return finished
+        by_future = {f: name for name, f in self._futures.items()}
+        done, _ = wait(by_future, timeout=interval, return_when=FIRST_COMPLETED)
+        now = time.perf_counter()
+        for future in done:
+            name = by_future[future]
+            elapsed = now - self._started[name]
+            try:
+                result = SourceResult(name, value=future.result(), elapsed=elapsed)
+            except Exception as e:
+                result = SourceResult(name, error=str(e) or type(e).__name__, elapsed=elapsed)
+            finished.append(self._finish(name, result))
+        for name, future in list(self._futures.items()):
+            if now > self._deadlines[name]:
+                future.cancel()
+                elapsed = now - self._started[name]
+                finished.append(self._finish(name, SourceResult(
+                    name, error=f"timed out after {elapsed:.1f}s", elapsed=elapsed, timed_out=True,
+                )))
+        return finished
+
+    def _finish(self, name: str, result: SourceResult) -> SourceResult:
+        del self._futures[name]
+        self.results[name] = result
+        return result
+
+    def shutdown(self) -> None:
+        """Stop accepting work; abandoned (timed out) calls finish in the background."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,163 @@
+"""
+Sampling policy.
+
+Detection always runs on the full-resolution series; sampling is only applied
+where volume actually hurts - the points sent to the browser chart, the
+anomaly records kept for tables and reports, and the token budget of the
+detector prompt.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+CHART_METHODS = ("minmax", "lttb", "stride", "none")
+DETAIL_LEVEL_FACTOR = 4  # each precomputed zoom level keeps 4x the points of the one above
+ANOMALY_SELECTIONS = ("peaks", "first")
+
+
+@dataclass(frozen=True)
+class SamplingPolicy:
+    """Where and how the pipeline is allowed to thin out data."""
+
+    chart_method: str = "minmax"
+    chart_max_points: int = 2000
+    llm_max_anomalies: int = 10
+    llm_anomaly_selection: str = "peaks"
+    llm_token_budget: int = 1500
+
+    def __post_init__(self):
+        if self.chart_method not in CHART_METHODS:
+            raise ValueError(f"chart_method must be one of {CHART_METHODS}, got {self.chart_method!r}")
+        if self.llm_anomaly_selection not in ANOMALY_SELECTIONS:
+            raise ValueError(
+                f"llm_anomaly_selection must be one of {ANOMALY_SELECTIONS}, got {self.llm_anomaly_selection!r}"
+            )
+        if self.llm_token_budget <= 0:
+            raise ValueError(f"llm_token_budget must be positive, got {self.llm_token_budget}")
+
+
+def downsample_indices(values: np.ndarray, max_points: int, method: str = "minmax") -> np.ndarray:
+    """
+    Return sorted positions of at most ~max_points samples of values.
+    "minmax" keeps the lowest and highest point of every bucket so spikes survive,
+    "lttb" keeps the most visually significant point of every bucket,
+    "stride" keeps every Nth point, "none" keeps everything.
+    """
+    n = len(values)
+    if method == "none" or n <= max_points:
+        return np.arange(n)
+    if method == "stride":
+        step = -(-n // max_points)
+        return np.arange(0, n, step)
+    if method == "lttb":
+        return lttb_indices(values, max_points)
+    if method != "minmax":
+        raise ValueError(f"Unknown downsampling method: {method!r}")
+
+    # Two points per bucket; pad the last bucket with its edge value so the
+    # whole array reshapes into (buckets, bucket_size) in one go.
+    bucket_size = -(-n // max(max_points // 2, 1))
+    buckets = -(-n // bucket_size)
+    padded = np.pad(np.asarray(values, dtype=np.float64), (0, buckets * bucket_size - n), mode="edge")
+    grid = padded.reshape(buckets, bucket_size)
+    offsets = np.arange(buckets) * bucket_size
+    lows = np.minimum(offsets + grid.argmin(axis=1), n - 1)
+    highs = np.minimum(offsets + grid.argmax(axis=1), n - 1)
+    # Buckets are disjoint and ordered, so (earlier, later) per bucket is already sorted:
+    # interleave and drop repeats (flat buckets) instead of sorting with np.unique.
+    picks = np.column_stack([np.minimum(lows, highs), np.maximum(lows, highs)]).ravel()
+    return picks[np.concatenate(([True], np.diff(picks) != 0))]
+
+
+def lttb_indices(values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: the first and last point plus, per bucket, the
+    point forming the largest triangle with its neighbouring buckets. The previous
+    bucket's average stands in for its selected point, so all buckets are chosen
+    in one vectorized pass instead of a Python loop over buckets.
+    """
+    n = len(values)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    y = np.asarray(values, dtype=np.float64)
+    bucket_size = -(-(n - 2) // (max_points - 2))
+    buckets = -(-(n - 2) // bucket_size)
+    pad = buckets * bucket_size - (n - 2)
+    grid_y = np.pad(y[1:-1], (0, pad), constant_values=np.nan).reshape(buckets, bucket_size)
+    grid_x = np.pad(np.arange(1, n - 1, dtype=np.float64), (0, pad), constant_values=np.nan).reshape(buckets, bucket_size)
+    mean_x, mean_y = np.nanmean(grid_x, axis=1), np.nanmean(grid_y, axis=1)
+    prev_x, prev_y = np.concatenate(([0.0], mean_x[:-1])), np.concatenate(([y[0]], mean_y[:-1]))
+    next_x, next_y = np.concatenate((mean_x[1:], [n - 1.0])), np.concatenate((mean_y[1:], [y[-1]]))
+    # Twice the triangle area (prev, candidate, next); padding cells score -1.
+    area = np.abs((prev_x - next_x)[:, None] * (grid_y - prev_y[:, None])
+                  - (prev_x[:, None] - grid_x) * (next_y - prev_y)[:, None])
+    area = np.nan_to_num(area, nan=-1.0)
+    picks = 1 + np.arange(buckets) * bucket_size + area.argmax(axis=1)
+    return np.concatenate(([0], picks, [n - 1]))
+
+
+@dataclass
+class DetailLevels:
+    """
+    Precomputed zoom levels for one series: each level is a sorted set of positions
+    DETAIL_LEVEL_FACTOR times denser than the previous one. A zoomed window is
+    served from the densest level that still fits the point budget. When that
+    leaves the window under half the budget, the window's points in the next
+    denser level (or the raw points past the last level) are downsampled instead:
+    at most about DETAIL_LEVEL_FACTOR budgets of points, so zooming never
+    re-samples the whole series.
+    """
+
+    levels: list[np.ndarray]
+    max_points: int
+    length: int
+    values: np.ndarray | None = None  # the series values, kept (not copied) to refine sparse windows
+    method: str = "minmax"
+
+    @classmethod
+    def build(cls, values: np.ndarray, max_points: int, method: str = "minmax") -> "DetailLevels":
+        levels = []
+        budget = max_points
+        if method != "none":
+            # Stop once a level would keep over 1/DETAIL_LEVEL_FACTOR of the series; windows
+            # that need more detail than the last level are refined from the raw points.
+            while budget * DETAIL_LEVEL_FACTOR <= len(values):
+                levels.append(downsample_indices(values, budget, method))
+                budget *= DETAIL_LEVEL_FACTOR
+        return cls(levels, max_points, len(values), values, method)
+
+    def window(self, lo: int = 0, hi: int | None = None) -> np.ndarray:
+        """Positions to draw for the half-open range [lo, hi) of the series."""
+        hi = self.length if hi is None else hi
+        if hi - lo <= self.max_points or not self.levels:
+            return np.arange(lo, hi)
+        best, denser = self.levels[0], None
+        for level in self.levels[1:]:
+            a, b = np.searchsorted(level, [lo, hi])
+            if b - a > self.max_points:
+                denser = level[a:b]
+                break
+            best = level
+        a, b = np.searchsorted(best, [lo, hi])
+        if b - a >= self.max_points // 2 or self.values is None:
+            return best[a:b]
+        # Too sparse for this window: downsample its points in the next denser level (or the raw points).
+        candidates = np.arange(lo, hi) if denser is None else denser
+        return candidates[downsample_indices(self.values[candidates], self.max_points, self.method)]
+
+
+def select_anomaly_indices(values: np.ndarray, anomaly_idx: np.ndarray, limit: int, selection: str = "first") -> np.ndarray:
+    """
+    Choose which anomaly positions are expanded into records for the LLM payload.
+    "first" keeps the earliest ones (the original behaviour), "peaks" keeps the
+    largest exceedances, returned in chronological order.
+    """
+    if len(anomaly_idx) <= limit:
+        return anomaly_idx
+    if selection == "first":
+        return anomaly_idx[:limit]
+    if selection != "peaks":
+        raise ValueError(f"Unknown anomaly selection: {selection!r}")
+    top = np.argpartition(values[anomaly_idx], -limit)[-limit:]
+    return np.sort(anomaly_idx[top])
@@ -0,0 +1,165 @@
+"""
+Seasonality-aware anomaly detection.
+
+CPU utilization follows the clock: a nightly batch job or a weekday-afternoon
+peak is normal for its hour and would be flagged by a single global
+mean + kσ threshold, while a spike at 3 a.m. on a quiet Sunday can stay below
+it. SeasonalProfile keeps, for every hour-of-day (24 slots) or hour-of-week
+(168 slots), the median and MAD of the values seen in that slot, and each point
+is scored with a robust z-score against the baseline of its own slot.
+
+The profile holds the sorted values of every slot, so new points are merged
+into the slots they touch and only those slots' baselines are recomputed.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from madison.online import OnlineScores
+from madison.series import MetricSeries
+
+SEASONAL_PERIODS = {"day": 24, "week": 168}
+MAD_TO_SIGMA = 1.4826  # MAD of a normal distribution is 0.6745 σ
+_EPOCH_WEEKDAY_HOURS = 72  # 1970-01-01 was a Thursday; shift so slot 0 is Monday 00:00
+
+
+def slot_of(timestamps: np.ndarray, period: str) -> np.ndarray:
+    """Hour-of-day (0-23) or hour-of-week (0-167, Monday 00:00 first) of each timestamp."""
+    hours = np.asarray(timestamps).astype("datetime64[h]").astype(np.int64)
+    if period == "day":
+        return hours % 24
+    return (hours + _EPOCH_WEEKDAY_HOURS) % 168
+
+
+def _medians(sorted_values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Per-slot medians of values sorted within consecutive slot blocks (NaN for empty slots)."""
+    starts = np.cumsum(counts) - counts
+    lo = starts + np.maximum(counts - 1, 0) // 2
+    hi = starts + counts // 2
+    medians = np.full(len(counts), np.nan)
+    filled = counts > 0
+    medians[filled] = (sorted_values[lo[filled]] + sorted_values[hi[filled]]) / 2
+    return medians
+
+
+def _slot_baselines(sorted_values: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Median and MAD per slot, vectorized over all slots at once."""
+    medians = _medians(sorted_values, counts)
+    slot_ids = np.repeat(np.arange(len(counts)), counts)
+    deviations = np.abs(sorted_values - medians[slot_ids])
+    deviations = deviations[np.lexsort((deviations, slot_ids))]
+    return medians, _medians(deviations, counts)
+
+
+@dataclass
+class SeasonalProfile:
+    """Per-slot median/MAD baselines and the sorted values behind them."""
+
+    period: str = "week"
+    min_points: int = 5  # slots with fewer observations fall back to the typical slot
+    count: int = 0
+    last_timestamp: int | None = None
+    scored_digest: str | None = None  # MetricSeries.prefix_digest of the points absorbed so far
+    slot_values: list[np.ndarray] = field(default_factory=list)
+    medians: np.ndarray = field(default_factory=lambda: np.empty(0))
+    mads: np.ndarray = field(default_factory=lambda: np.empty(0))
+
+    def __post_init__(self):
+        if self.period not in SEASONAL_PERIODS:
+            raise ValueError(f"period must be one of {tuple(SEASONAL_PERIODS)}, got {self.period!r}")
+        slots = SEASONAL_PERIODS[self.period]
+        if not self.slot_values:
+            self.slot_values = [np.empty(0) for _ in range(slots)]
+            self.medians = np.full(slots, np.nan)
+            self.mads = np.full(slots, np.nan)
+
+    def params(self) -> dict:
+        return {"period": self.period, "min_points": self.min_points}
+
+    @property
+    def counts(self) -> np.ndarray:
+        return np.array([len(v) for v in self.slot_values], dtype=np.int64)
+
+    def update(self, timestamps: np.ndarray, values: np.ndarray) -> int:
+        """
+        Absorb the points newer than the last one seen and recompute the baselines
+        of the slots they fall in. Returns the offset of the first new point.
+        """
+        ts = np.asarray(timestamps).view("int64")
+        offset = 0 if self.last_timestamp is None else int(np.searchsorted(ts, self.last_timestamp, side="right"))
+        new_values = np.asarray(values, dtype=np.float64)[offset:]
+        if not len(new_values):
+            return offset
+        slots = slot_of(np.asarray(timestamps)[offset:], self.period)
+        order = np.lexsort((new_values, slots))
+        new_counts = np.bincount(slots, minlength=len(self.slot_values))
+        blocks = np.split(new_values[order], np.cumsum(new_counts)[:-1])
+        touched = np.flatnonzero(new_counts)
+        for s in touched:
+            if len(self.slot_values[s]):
+                # Two sorted runs: the stable (merge) sort combines them in linear time.
+                self.slot_values[s] = np.sort(np.concatenate([self.slot_values[s], blocks[s]]), kind="stable")
+            else:
+                self.slot_values[s] = blocks[s]
+        counts = np.array([len(self.slot_values[s]) for s in touched], dtype=np.int64)
+        medians, mads = _slot_baselines(np.concatenate([self.slot_values[s] for s in touched]), counts)
+        self.medians[touched] = medians
+        self.mads[touched] = mads
+        self.count += len(new_values)
+        self.last_timestamp = int(ts[-1])
+        return offset
+
+    def baselines(self) -> tuple[np.ndarray, np.ndarray]:
+        """(median, robust σ) per slot; thin slots borrow the median slot's values."""
+        medians = self.medians.copy()
+        sigmas = self.mads * MAD_TO_SIGMA
+        counts = self.counts
+        reliable = counts >= self.min_points
+        if not reliable.any():
+            reliable = counts > 0
+        if reliable.any():
+            medians[~reliable] = np.median(medians[reliable])
+            sigmas[~reliable] = np.median(sigmas[reliable])
+            # A flat slot (MAD 0) would flag any deviation at all; use the typical spread instead.
+            sigmas[sigmas == 0] = np.median(sigmas[reliable])
+        return medians, sigmas
+
+    def score(self, timestamps: np.ndarray, values: np.ndarray, k: float) -> OnlineScores:
+        """Robust z-scores, thresholds (median + k σ of the slot) and flags (z > k) for every point."""
+        slots = slot_of(timestamps, self.period)
+        medians, sigmas = self.baselines()
+        center, spread = medians[slots], sigmas[slots]
+        values = np.asarray(values, dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z_scores = np.where(spread > 0, (values - center) / spread, 0.0)
+        return OnlineScores(z_scores, center + k * spread, z_scores > k)
+
+
+def score_seasonal(
+    series: MetricSeries,
+    params: dict,
+    previous: tuple[SeasonalProfile, OnlineScores] | None = None,
+) -> tuple[SeasonalProfile, OnlineScores]:
+    """
+    Score series against a seasonal profile built from params ({"period", "k",
+    optional "min_points"}), reusing previous = (profile, scores) when it was built
+    with the same settings over an unchanged prefix of this series; only the new points are
+    merged in. The threshold multiplier k only affects scoring, so changing it
+    never rebuilds the profile. Returns (profile, scores aligned to the whole series).
+    """
+    profile_params = {key: params[key] for key in ("period", "min_points") if key in params}
+    fresh = SeasonalProfile(**profile_params)
+    profile = None
+    if previous is not None and isinstance(previous[0], SeasonalProfile) and previous[0].params() == fresh.params():
+        profile = previous[0]
+        ts = series.timestamps.view("int64")
+        if profile.count > len(series) or profile.scored_digest != series.prefix_digest(profile.count) or (
+            profile.last_timestamp is not None and np.searchsorted(ts, profile.last_timestamp, side="right") != profile.count
+        ):
+            profile = None  # not a continuation of the series the profile was built from
+    if profile is None:
+        profile = fresh
+    profile.update(series.timestamps, series.values)
+    profile.scored_digest = series.prefix_digest()
+    return profile, profile.score(series.timestamps, series.values, params.get("k", 3.0))
@@ -0,0 +1,200 @@
+"""
+Columnar metric storage.
+
+A MetricSeries keeps one datetime64 timestamp array and one float64 value array,
+with the constant per-record fields (source, description, category, ...) stored
+once on the series instead of repeated in every row.
+"""
+
+import hashlib
+from array import array
+from dataclasses import dataclass, field
+from typing import Iterator
+
+import numpy as np
+
+TIMESTAMP_DTYPE = "datetime64[ns]"
+
+
+@dataclass
+class MetricSeries:
+    """A single metric as parallel timestamp/value arrays plus series-level metadata."""
+
+    timestamps: np.ndarray
+    values: np.ndarray
+    metric_name: str = "cpu_utilization"
+    source: str = "kaggle"
+    source_name: str = "NAB - Numenta Anomaly Benchmark"
+    description: str = "AWS CPU utilization metric"
+    category: str = "infrastructure"
+    record_prefix: str = "nab_cpu"
+    errors: list[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.timestamps = np.asarray(self.timestamps, dtype=TIMESTAMP_DTYPE)
+        self.values = np.asarray(self.values, dtype=np.float64)
+        if self.timestamps.shape != self.values.shape:
+            raise ValueError(
+                f"timestamps and values must have the same length "
+                f"({len(self.timestamps)} != {len(self.values)})"
+            )
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the timestamp and value arrays."""
+        return self.timestamps.nbytes + self.values.nbytes
+
+    def prefix_digest(self, n: int | None = None) -> str:
+        """Fingerprint of the first n points (all by default): a hash of their timestamp and value bytes."""
+        n = len(self) if n is None else n
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(self.timestamps[:n]).view("int64").tobytes())
+        digest.update(np.ascontiguousarray(self.values[:n]).tobytes())
+        return digest.hexdigest()
+
+    def is_sorted(self) -> bool:
+        ts = self.timestamps.view("int64")
+        return bool(np.all(ts[1:] >= ts[:-1]))
+
+    def sorted(self) -> "MetricSeries":
+        """Return the series ordered by timestamp (self if already ordered)."""
+        if self.is_sorted():
+            return self
+        order = np.argsort(self.timestamps, kind="stable")
+        return self.take(order)
+
+    def take(self, indices) -> "MetricSeries":
+        """Return a new series holding only the given positions."""
+        return MetricSeries(
+            timestamps=self.timestamps[indices],
+            values=self.values[indices],
+            metric_name=self.metric_name,
+            source=self.source,
+            source_name=self.source_name,
+            description=self.description,
+            category=self.category,
+            record_prefix=self.record_prefix,
+        )
+
+    def between(self, start: np.datetime64 | None = None, end: np.datetime64 | None = None) -> "MetricSeries":
+        """Return the records with start <= timestamp <= end (either bound may be None) of a sorted series."""
+        if start is None and end is None:
+            return self
+        lo = 0 if start is None else int(np.searchsorted(self.timestamps, start, side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.timestamps, end, side="right"))
+        trimmed = self.take(slice(lo, hi))
+        trimmed.errors = self.errors
+        return trimmed
+
+    def timestamp_strings(self, indices=None) -> list[str]:
+        """Format timestamps the way they appear in the NAB CSV ("YYYY-MM-DD HH:MM:SS")."""
+        ts = self.timestamps if indices is None else self.timestamps[indices]
+        return [s.replace("T", " ") for s in np.datetime_as_string(ts, unit="s")]
+
+    def record(self, i: int) -> dict:
+        """Expand position i into the unified-schema record dict used by prompts and reports."""
+        return self.records([i])[0]
+
+    def records(self, indices=None) -> list[dict]:
+        """Expand the given positions (default: all) into unified-schema record dicts."""
+        if indices is None:
+            indices = np.arange(len(self))
+        indices = np.asarray(indices, dtype=np.int64)
+        stamps = self.timestamp_strings(indices)
+        return [
+            {
+                "record_id": f"{self.record_prefix}_{int(i) + 1}",
+                "source": self.source,
+                "source_name": self.source_name,
+                "record_type": "metric",
+                "timestamp": stamp,
+                "metric_name": self.metric_name,
+                "metric_value": float(self.values[i]),
+                "description": self.description,
+                "category": self.category,
+            }
+            for i, stamp in zip(indices, stamps)
+        ]
+
+    def iter_records(self, indices, chunk_size: int = 10_000) -> Iterator[dict]:
+        """records() for many positions, expanded one chunk at a time so they never all exist at once."""
+        indices = np.asarray(indices, dtype=np.int64)
+        for start in range(0, len(indices), chunk_size):
+            yield from self.records(indices[start:start + chunk_size])
+
+
+class MetricSeriesBuilder:
+    """
+    Accumulate (timestamp, value) string pairs into compact arrays.
+    Rows are buffered in small batches and converted with vectorized NumPy
+    parsing, so only one batch of Python strings is alive at a time.
+    """
+
+    def __init__(self, batch_size: int = 65536, **metadata):
+        self.batch_size = batch_size
+        self.metadata = metadata
+        self.errors: list[str] = []
+        self._ts = array("q")
+        self._values = array("d")
+        self._batch_ts: list[str] = []
+        self._batch_values: list[str] = []
+        self._batch_rows: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._values) + len(self._batch_values)
+
+    def add(self, timestamp: str, value: str, row: int = -1) -> None:
+        self._batch_ts.append(timestamp)
+        self._batch_values.append(value)
+        self._batch_rows.append(row)
+        if len(self._batch_values) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._batch_values:
+            return
+        try:
+            ts = np.array(self._batch_ts, dtype=TIMESTAMP_DTYPE)
+            values = np.array(self._batch_values, dtype=np.float64)
+        except ValueError:
+            ts, values = self._convert_row_by_row()
+        self._ts.frombytes(ts.view("int64").tobytes())
+        self._values.frombytes(values.tobytes())
+        self._batch_ts.clear()
+        self._batch_values.clear()
+        self._batch_rows.clear()
+
+    def _convert_row_by_row(self) -> tuple[np.ndarray, np.ndarray]:
+        """Slow path for a batch containing malformed rows: keep the good ones."""
+        good_ts, good_values = [], []
+        for stamp, raw, row in zip(self._batch_ts, self._batch_values, self._batch_rows):
+            try:
+                ts = np.datetime64(stamp, "ns")
+                value = float(raw)
+            except ValueError as e:
+                self.errors.append(f"Row {row}: {e}")
+                continue
+            good_ts.append(ts)
+            good_values.append(value)
+        return np.array(good_ts, dtype=TIMESTAMP_DTYPE), np.array(good_values, dtype=np.float64)
+
+    def build(self) -> MetricSeries:
+        """
+        The accumulated rows as a MetricSeries. Its arrays are views of the builder's
+        buffers rather than copies, so parsing never holds the data twice; the
+        builder starts over empty afterwards.
+        """
+        self._flush()
+        ts, values = self._ts, self._values
+        self._ts, self._values = array("q"), array("d")  # a viewed array can no longer grow
+        series = MetricSeries(
+            timestamps=np.frombuffer(ts, dtype=np.int64).view(TIMESTAMP_DTYPE),
+            values=np.frombuffer(values, dtype=np.float64),
+            **self.metadata,
+        )
+        series.errors = self.errors
+        self.errors = []
+        return series
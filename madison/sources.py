@@ -0,0 +1,158 @@
+"""
+Data source fetchers (mirror the n8n HTTP Request / RSS Read / Code nodes).
+
+Plain functions with no Streamlit dependency: each one goes through the
+persistent HTTP cache (local metric files are memory-mapped instead) and
+raises on failure so callers can report errors per source. The dashboard wraps them in st.cache_data; headless runs call them directly.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Callable
+
+from madison.files import TimeRange, file_format, local_path, read_local_series, time_bounds
+from madison.http_cache import cached_fetch
+from madison.ingest import parse_nab_chunks
+from madison.series import MetricSeries
+
+DEFAULT_NAB_URL = "https://raw.githubusercontent.com/numenta/NAB/master/data/realKnownCause/cpu_utilization_asg_misconfiguration.csv"
+TECHCRUNCH_FEED_URL = "https://techcrunch.com/feed/"
+VENTUREBEAT_FEED_URL = "https://venturebeat.com/category/ai/feed/"
+NEWSAPI_URL = os.environ.get("MADISON_NEWSAPI_URL", "https://newsapi.org/v2/everything")
+
+
+def fetch_nab_csv(
+    url: str,
+    sample_step: int = 1,
+    on_progress: Callable[[int, int, int], None] | None = None,
+    time_range: TimeRange | None = None,
+) -> MetricSeries:
+    """
+    Stream the NAB CPU CSV into a columnar MetricSeries at full resolution
+    (sample_step > 1 keeps only every Nth record).
+    Rows are parsed and sampled as bytes arrive, so peak memory is bounded by
+    the sampled output rather than the size of the download. The body and the
+    parsed series are kept in the persistent HTTP cache and revalidated with a
+    conditional GET, so an unchanged CSV is never downloaded or parsed twice.
+    url may also be a local path or file:// URI of a CSV, Parquet or Arrow IPC
+    file, read through a memory map (see madison.files).
+    time_range=(start, end) keeps only records in that inclusive range.
+    on_progress(bytes_received, total_bytes, records_kept) is called per chunk.
+    Mirrors: HTTP Request -> Code in JavaScript node.
+    """
+    path = local_path(url)
+    if path is not None:
+        return read_local_series(path, sample_step, time_range, on_progress)
+    if file_format(url) != "csv":
+        raise ValueError("Parquet and Arrow inputs must be local files; download them first")
+
+    progress = {"received": 0, "total": 0}
+
+    def on_bytes(received: int, total: int) -> None:
+        progress.update(received=received, total=total)
+
+    def on_records(received: int, records: int) -> None:
+        if on_progress:
+            on_progress(progress["received"], progress["total"], records)
+
+    fetched = cached_fetch(
+        url,
+        lambda chunks: parse_nab_chunks(chunks, sample_step, on_records),
+        kind=f"nab_csv:v1:step={sample_step}",
+        on_progress=on_bytes,
+    )
+    return fetched.value.between(*time_bounds(time_range))
+
+
+def fetch_rss(feed_url: str, source_name: str, prefix: str) -> list[dict]:
+    """
+    Parse an RSS feed and return unified-schema news records.
+    Raises on network / parse failure so errors are reported per source and not cached.
+    Mirrors: RSS Read -> Code in JavaScript1 / Code in JavaScript3 nodes.
+    """
+    fetched = cached_fetch(
+        feed_url,
+        lambda chunks: parse_rss(b"".join(chunks), source_name, prefix),
+        kind=f"rss:v1:{source_name}:{prefix}",
+    )
+    return fetched.value
+
+
+def parse_rss(body: bytes, source_name: str, prefix: str) -> list[dict]:
+    """Turn a raw RSS/Atom document into unified-schema news records."""
+    import feedparser  # imported lazily: only needed when a feed is actually parsed
+
+    feed = feedparser.parse(body)
+    if feed.get("bozo") and not feed.entries:
+        raise RuntimeError(f"Error fetching RSS ({source_name}): {feed.get('bozo_exception')}")
+    records = []
+    for idx, entry in enumerate(feed.entries):
+        title = getattr(entry, "title", None)
+        link = getattr(entry, "link", None)
+        if not title or not link:
+            continue
+        pub = getattr(entry, "published", getattr(entry, "updated", ""))
+        try:
+            iso_ts = datetime.strptime(pub[:25], "%a, %d %b %Y %H:%M:%S").isoformat() + "Z"
+        except Exception:
+            iso_ts = pub
+        snippet = getattr(entry, "summary", "")[:200]
+        records.append({
+            "record_id": f"{prefix}_{idx + 1}",
+            "source": "rss",
+            "source_name": source_name,
+            "record_type": "news",
+            "timestamp": iso_ts,
+            "title": title,
+            "description": snippet,
+            "url": link,
+            "category": "tech_news",
+        })
+    return records
+
+
+def fetch_newsapi(query: str, api_key: str, url: str = NEWSAPI_URL) -> list[dict]:
+    """
+    Call NewsAPI and return unified-schema news records.
+    Raises on network failure or a non-ok API status so errors are reported per source.
+    Mirrors: HTTP Request1 -> Code in JavaScript2 node.
+    """
+    if not api_key:
+        return []
+    params = {
+        "q": query,
+        "language": "en",
+        "sortBy": "publishedAt",
+        "pageSize": 30,
+        "apiKey": api_key,
+    }
+    fetched = cached_fetch(url, lambda chunks: parse_newsapi(b"".join(chunks)), kind="newsapi:v1", params=params)
+    return fetched.value
+
+
+def parse_newsapi(body: bytes) -> list[dict]:
+    """Turn a raw NewsAPI /v2/everything response into unified-schema news records."""
+    data = json.loads(body)
+    if data.get("status") != "ok":
+        raise RuntimeError(f"NewsAPI returned status: {data.get('status')} — {data.get('message', '')}")
+
+    records = []
+    for idx, art in enumerate(data.get("articles", [])[:30]):
+        title = art.get("title", "")
+        link = art.get("url", "")
+        if not title or not link or title == "[Removed]":
+            continue
+        pub = art.get("publishedAt", "")
+        records.append({
+            "record_id": f"newsapi_{idx + 1}",
+            "source": "newsapi",
+            "source_name": art.get("source", {}).get("name", "Unknown"),
+            "record_type": "news",
+            "timestamp": pub,
+            "title": title,
+            "description": (art.get("description") or "")[:200],
+            "url": link,
+            "category": "business_tech",
+        })
+    return records
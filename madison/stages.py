@@ -0,0 +1,87 @@
+"""
+Dependency-tracked stage results.
+
+The dashboard reruns its whole script on every widget change. A StageCache
+keeps the latest result of each pipeline stage together with a key derived
+from the stage's own parameters and the keys of the stages it reads:
+
+    series ──> stats ──> detector ──> narrator ──> report
+    news ────> correlate ─────────────────┘
+
+so a rerun recomputes exactly the stages whose inputs changed, plus everything
+downstream of them, and serves the rest from memory without any I/O. Changing
+the σ multiplier, for instance, re-keys stats and the views built on it but
+never the fetched series or news.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from madison.telemetry import record
+
+
+def stage_key(name: str, params: dict | None = None, upstream: tuple[str, ...] = ()) -> str:
+    """Stable key of a stage given its parameters and the keys of the stages it depends on."""
+    payload = json.dumps([name, params or {}, list(upstream)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class StageResult:
+    """One stage's value and the inputs it was computed from."""
+    name: str
+    key: str
+    value: Any
+    params: dict = field(default_factory=dict)
+    upstream: tuple[str, ...] = ()
+    wall_s: float = 0.0
+
+
+class StageCache:
+    """Latest result per stage name; a result is reused only while its key still matches."""
+
+    def __init__(self):
+        self._results: dict[str, StageResult] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._results
+
+    def get(self, name: str) -> StageResult | None:
+        """The last result of a stage, whatever inputs it was computed from."""
+        with self._lock:
+            return self._results.get(name)
+
+    def lookup(self, name: str, key: str) -> StageResult | None:
+        """The stage's result only if it was computed for key."""
+        result = self.get(name)
+        return result if result is not None and result.key == key else None
+
+    def put(self, name: str, value: Any, params: dict | None = None, upstream: tuple[str, ...] = (),
+            wall_s: float = 0.0) -> StageResult:
+        """Store a value computed elsewhere (a fetch, a streamed completion) as the stage's result."""
+        result = StageResult(name, stage_key(name, params, upstream), value, dict(params or {}), tuple(upstream), wall_s)
+        with self._lock:
+            self._results[name] = result
+        return result
+
+    def compute(self, name: str, params: dict | None, upstream: tuple[str, ...], fn: Callable[[], Any],
+                force: bool = False) -> StageResult:
+        """Return the stored result when its key matches, otherwise call fn() and store it."""
+        cached = None if force else self.lookup(name, stage_key(name, params, upstream))
+        if cached is not None:
+            record(stage_cache="hit")
+            return cached
+        started = time.perf_counter()
+        value = fn()
+        record(stage_cache="miss")
+        return self.put(name, value, params, upstream, time.perf_counter() - started)
+
+    def invalidate(self, *names: str) -> None:
+        with self._lock:
+            for name in names:
+                self._results.pop(name, None)
@@ -0,0 +1,175 @@
+"""
+Vectorized statistics / anomaly detection engine (mirrors Prepare AI Input node).
+
+All series passed to one call are concatenated into a single flat array and
+reduced segment-wise with ``np.ufunc.reduceat``, so computing stats for a
+thousand series costs a handful of NumPy passes rather than a Python loop.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from madison.sampling import select_anomaly_indices
+from madison.series import MetricSeries
+
+
+@dataclass
+class BatchStatistics:
+    """Per-series statistics for a batch, plus the flat exceedance mask."""
+
+    lengths: np.ndarray
+    means: np.ndarray
+    stds: np.ndarray
+    mins: np.ndarray
+    maxs: np.ndarray
+    thresholds: np.ndarray
+    anomaly_counts: np.ndarray
+    mask: np.ndarray
+    starts: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def series_mask(self, i: int) -> np.ndarray:
+        """Exceedance mask for series i (a view into the flat mask)."""
+        start = self.starts[i]
+        return self.mask[start:start + self.lengths[i]]
+
+
+def _per_point(per_series: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """One value per series spread over its points; a lone series broadcasts its scalar instead of a full-length copy."""
+    return per_series[0] if len(per_series) == 1 else np.repeat(per_series, lengths)
+
+
+def batch_statistics(values_list: list[np.ndarray], sigma_multiplier=1.5) -> BatchStatistics:
+    """
+    Compute mean, population std dev, min, max, threshold and exceedance mask
+    for every array in values_list in one batched pass.
+    sigma_multiplier may be a scalar or one multiplier per series.
+    Every array must be non-empty.
+    """
+    lengths = np.fromiter((len(v) for v in values_list), dtype=np.int64, count=len(values_list))
+    if np.any(lengths == 0):
+        raise ValueError("batch_statistics requires non-empty series")
+    starts = np.zeros(len(lengths), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    flat = values_list[0] if len(values_list) == 1 else np.concatenate(values_list)
+    flat = np.asarray(flat, dtype=np.float64)
+
+    means = np.add.reduceat(flat, starts) / lengths
+    mins = np.minimum.reduceat(flat, starts)
+    maxs = np.maximum.reduceat(flat, starts)
+    dev = flat - _per_point(means, lengths)
+    np.square(dev, out=dev)
+    stds = np.sqrt(np.add.reduceat(dev, starts) / lengths)
+    del dev
+    thresholds = means + np.asarray(sigma_multiplier, dtype=np.float64) * stds
+
+    mask = flat > _per_point(thresholds, lengths)
+    anomaly_counts = np.add.reduceat(mask, starts, dtype=np.int64)
+
+    return BatchStatistics(
+        lengths=lengths,
+        means=means,
+        stds=stds,
+        mins=mins,
+        maxs=maxs,
+        thresholds=thresholds,
+        anomaly_counts=anomaly_counts,
+        mask=mask,
+        starts=starts,
+    )
+
+
+def _summary(series: MetricSeries, batch: BatchStatistics, i: int, max_anomaly_records: int, anomaly_selection: str) -> dict:
+    anomaly_idx = np.flatnonzero(batch.series_mask(i))
+    sample_idx = select_anomaly_indices(series.values, anomaly_idx, max_anomaly_records, anomaly_selection)
+    return {
+        "total_records": int(batch.lengths[i]),
+        "metric_name": series.metric_name,
+        "average": round(float(batch.means[i]), 2),
+        "min": round(float(batch.mins[i]), 2),
+        "max": round(float(batch.maxs[i]), 2),
+        "std_dev": round(float(batch.stds[i]), 2),
+        "anomaly_threshold": round(float(batch.thresholds[i]), 2),
+        "potential_anomalies_count": int(batch.anomaly_counts[i]),
+        "potential_anomalies": series.records(sample_idx),
+    }
+
+
+def compute_statistics_batch(
+    series_list: list[MetricSeries],
+    sigma_multiplier=1.5,
+    max_anomaly_records: int = 10,
+    anomaly_selection: str = "first",
+) -> list[dict]:
+    """
+    Compute the metrics summary dict for many series in a single batched call.
+    Detection covers every point; only the anomaly records embedded in the
+    summary are limited to max_anomaly_records (see madison.sampling).
+    Empty series yield {} in their slot, matching compute_statistics.
+    """
+    summaries: list[dict] = [{} for _ in series_list]
+    live = [i for i, s in enumerate(series_list) if len(s)]
+    if not live:
+        return summaries
+    sigma = np.asarray(sigma_multiplier, dtype=np.float64)
+    if sigma.ndim:
+        sigma = sigma[live]
+    batch = batch_statistics([series_list[i].values for i in live], sigma)
+    for j, i in enumerate(live):
+        summaries[i] = _summary(series_list[i], batch, j, max_anomaly_records, anomaly_selection)
+    return summaries
+
+
+def compute_statistics(
+    series: MetricSeries,
+    sigma_multiplier: float = 1.5,
+    max_anomaly_records: int = 10,
+    anomaly_selection: str = "first",
+) -> dict:
+    """
+    Compute avg, min, max, std dev, anomaly threshold.
+    Mirrors: Prepare AI Input node.
+    """
+    return statistics_with_mask(series, sigma_multiplier, max_anomaly_records, anomaly_selection)[0]
+
+
+def statistics_with_mask(
+    series: MetricSeries,
+    sigma_multiplier: float = 1.5,
+    max_anomaly_records: int = 10,
+    anomaly_selection: str = "first",
+) -> tuple[dict, np.ndarray]:
+    """
+    compute_statistics plus the exceedance mask its anomaly count was taken from.
+    The summary's anomaly_threshold is rounded for display; the mask compares
+    against the exact mean + kσ, so use it rather than re-deriving one from the summary.
+    """
+    if not len(series):
+        return {}, np.zeros(0, dtype=bool)
+    batch = batch_statistics([series.values], sigma_multiplier)
+    return _summary(series, batch, 0, max_anomaly_records, anomaly_selection), batch.mask
+
+
+def with_anomalies(
+    stats: dict,
+    series: MetricSeries,
+    mask: np.ndarray,
+    threshold: float,
+    max_anomaly_records: int = 10,
+    anomaly_selection: str = "first",
+) -> dict:
+    """
+    Return a copy of a compute_statistics summary whose anomaly fields come from
+    another detector's exceedance mask (e.g. the online z-score detector).
+    """
+    anomaly_idx = np.flatnonzero(mask)
+    sample_idx = select_anomaly_indices(series.values, anomaly_idx, max_anomaly_records, anomaly_selection)
+    return {
+        **stats,
+        "anomaly_threshold": round(float(threshold), 2),
+        "potential_anomalies_count": len(anomaly_idx),
+        "potential_anomalies": series.records(sample_idx),
+    }
@@ -0,0 +1,161 @@
+"""
+Per-stage timing spans for one analysis run.
+
+A RunTrace collects one Span per pipeline stage (fetches, statistics, each
+GPT-4o-mini call, dashboard rendering). Low-level helpers such as cached_fetch
+and cached_completion call record() to attach bytes, tokens and cache hits to
+whichever span is active, so they need no extra parameters. The active span
+lives in a context variable and is set on the worker thread that runs a
+wrapped function, so concurrent fetches never write into each other's spans.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger("madison.performance")
+
+COUNTERS = ("bytes", "records", "prompt_tokens", "completion_tokens", "cache_hits")
+
+_current_span: ContextVar["Span | None"] = ContextVar("madison_span", default=None)
+
+
+@dataclass
+class Span:
+    """Wall time and resource counters for one stage; extra details go in attrs."""
+    name: str
+    start_s: float  # offset from the start of the run
+    wall_s: float | None = None  # None while the stage is still running
+    bytes: int = 0
+    records: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hits: int = 0
+    attrs: dict = field(default_factory=dict)
+
+    def record(self, **values: Any) -> None:
+        """Add to the counters; any other keyword is stored in attrs."""
+        for key, value in values.items():
+            if key in COUNTERS:
+                setattr(self, key, getattr(self, key) + int(value))
+            else:
+                self.attrs[key] = value
+
+
+def record(**values: Any) -> None:
+    """Attach counters to the active span, if any (a no-op outside a traced stage)."""
+    span = _current_span.get()
+    if span is not None:
+        span.record(**values)
+
+
+class RunTrace:
+    """Spans of one run, safe to extend from worker threads."""
+
+    def __init__(self, run_id: str | None = None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+        self._t0 = time.perf_counter()
+        self._spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # Pickled with stored results; the lock is per process.
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def spans(self) -> list[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def _open(self, name: str) -> tuple[Span, float]:
+        started = time.perf_counter()
+        span = Span(name, started - self._t0)
+        with self._lock:
+            self._spans.append(span)
+        return span, started
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[Span]:
+        """Time the enclosed block as one stage; errors are recorded and re-raised."""
+        span, started = self._open(name)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.wall_s = time.perf_counter() - started
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        """fn as a traced stage, for handing to SourceRunner; len(result) is recorded as records."""
+        def traced(*args, **kwargs):
+            with self.span(name) as span:
+                value = fn(*args, **kwargs)
+                if span.records == 0 and hasattr(value, "__len__") and not isinstance(value, str):
+                    span.records = len(value)
+                return value
+        return traced
+
+    def wrap_stream(self, name: str, chunks: Iterator[str]) -> Iterator[str]:
+        """Trace a generator consumed elsewhere (e.g. by st.write_stream) as one stage."""
+        span, started = self._open(name)
+        try:
+            while True:
+                token = _current_span.set(span)
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+                finally:
+                    _current_span.reset(token)
+                yield chunk
+        finally:
+            span.wall_s = time.perf_counter() - started
+
+    def to_dict(self) -> dict:
+        """The `performance` section of the JSON report."""
+        now = time.perf_counter() - self._t0
+        stages = []
+        for span in self.spans:
+            stage = asdict(span)
+            if span.wall_s is None:
+                stage["wall_s"] = now - span.start_s
+                stage["attrs"] = {**span.attrs, "status": "running"}
+            stage["start_s"] = round(stage["start_s"], 4)
+            stage["wall_s"] = round(stage["wall_s"], 4)
+            stages.append(stage)
+        # Records are per-stage only: the stats stage re-counts what the fetch parsed.
+        totals = {key: sum(stage[key] for stage in stages) for key in COUNTERS if key != "records"}
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "total_wall_s": round(now, 4),
+            "totals": totals,
+            "stages": stages,
+        }
+
+    def log_line(self) -> str:
+        """One compact JSON object per run, for log collectors."""
+        return json.dumps({"event": "madison.performance", **self.to_dict()}, separators=(",", ":"), default=str)
+
+    def emit(self) -> str:
+        """Write the log line to the madison.performance logger and return it."""
+        line = self.log_line()
+        logger.info(line)
+        return line
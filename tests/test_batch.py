@@ -0,0 +1,21 @@
+"""scan_fleet: series without records are listed as failed, never ranked for AI analysis."""
+
+from benchmarks.standins import write_nab_csv
+from madison.batch import scan_fleet
+
+
+def test_empty_series_are_ranked_last_with_an_error(tmp_path):
+    good = write_nab_csv(tmp_path / "good.csv", 500)
+    empty = tmp_path / "empty.csv"
+    empty.write_text("timestamp,value\n")
+    garbled = tmp_path / "garbled.csv"
+    garbled.write_text("timestamp,value\nnot a time,12\n")
+
+    fleet = scan_fleet([str(empty), str(good), str(garbled)], max_workers=1)
+
+    assert [e.name for e in fleet][0] == "good.csv"
+    assert fleet[0].error is None and fleet[0].stats
+    failed = {e.name: e for e in fleet[1:]}
+    assert failed["empty.csv"].error == "No metric records" and failed["empty.csv"].stats == {}
+    assert failed["garbled.csv"].error.startswith("No metric records; Row")
+    assert failed["garbled.csv"].row()["Error"] == failed["garbled.csv"].error
@@ -0,0 +1,30 @@
+"""collapse_duplicates: URL normalization and LSH bucket comparisons."""
+
+import numpy as np
+
+from madison import dedup
+
+
+def article(record_id: str, title: str, url: str = "", source_name: str = "TechCrunch") -> dict:
+    return {"record_id": record_id, "title": title, "url": url, "source": "rss", "source_name": source_name}
+
+
+def test_only_tracking_parameters_are_stripped():
+    assert dedup.normalize_url("https://www.example.com/a/?utm_source=x&fbclid=1&mc_cid=2&id=7") == "//example.com/a?id=7"
+    assert dedup.normalize_url("https://example.com/read?ref=alpha") != dedup.normalize_url("https://example.com/read?ref=beta")
+    assert dedup.normalize_url("https://example.com/feed?source=hn") == "//example.com/feed?source=hn"
+
+
+def test_articles_sharing_a_bucket_are_compared_with_every_member(monkeypatch):
+    # Every signature is identical, so all three articles land in the same buckets; the first
+    # is unrelated, and the other two must still be matched with each other.
+    monkeypatch.setattr(dedup, "minhash", lambda shingle_set: np.zeros(dedup.NUM_PERM, dtype=np.uint64))
+    news = [
+        article("a", "Chipmaker unveils new datacenter accelerator"),
+        article("b", "OpenAI launches a new model for coding agents", source_name="VentureBeat"),
+        article("c", "OpenAI launches new model for coding agents"),
+    ]
+    result = dedup.collapse_duplicates(news)
+    assert [s["record_id"] for s in result.stories] == ["a", "b"]
+    assert result.stories[1]["duplicate_ids"] == ["c"]
+    assert result.stories[1]["reported_by"] == ["VentureBeat", "TechCrunch"]
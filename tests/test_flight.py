@@ -0,0 +1,61 @@
+"""SingleFlight streams and the LLMGate: shared deltas, shared errors, and no slot held by an abandoned reader."""
+
+import threading
+
+import pytest
+
+from madison.flight import LLMGate, SingleFlight
+
+
+def gated_stream(gate: LLMGate, chunks: list[str], release: threading.Event | None = None, fail: bool = False):
+    """produce() for SingleFlight.stream: yields the first chunk at once, the rest once release is set."""
+    def produce():
+        with gate.slot():
+            for i, chunk in enumerate(chunks):
+                if i and release is not None:
+                    assert release.wait(5)
+                yield chunk
+            if fail:
+                raise RuntimeError("stream broke")
+    return produce
+
+
+def test_concurrent_readers_share_one_stream():
+    flights, gate, release = SingleFlight(), LLMGate(max_concurrent=1), threading.Event()
+    calls = []
+
+    def produce():
+        calls.append(1)
+        return gated_stream(gate, ["a", "b", "c"], release)()
+
+    first = flights.stream("k", produce)
+    assert next(first) == "a"
+    second = flights.stream("k", produce)  # joins while the first is still streaming
+    release.set()
+    assert list(second) == ["a", "b", "c"]
+    assert list(first) == ["b", "c"]
+    assert len(calls) == 1 and flights.shared == 1
+
+
+def test_abandoned_reader_does_not_hold_the_gate_slot():
+    flights, gate = SingleFlight(), LLMGate(max_concurrent=1)
+    stream = flights.stream("k", gated_stream(gate, ["a"] * 100))
+    assert next(stream) == "a"  # then never read again, but still referenced (a rerun that moved on)
+
+    acquired = threading.Event()
+
+    def other_call():
+        with gate.slot():
+            acquired.set()
+
+    threading.Thread(target=other_call, daemon=True).start()
+    assert acquired.wait(5), "the abandoned stream kept the only gate slot"
+    assert flights.in_flight() == 0
+    assert len(list(stream)) == 99  # the reader can still catch up from the buffer
+
+
+def test_stream_errors_reach_every_reader():
+    flights, gate = SingleFlight(), LLMGate(max_concurrent=1)
+    with pytest.raises(RuntimeError, match="stream broke"):
+        list(flights.stream("k", gated_stream(gate, ["a"], fail=True)))
+    assert gate.stats()["in_flight"] == 0
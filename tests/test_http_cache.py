@@ -0,0 +1,145 @@
+"""Persistent HTTP cache against the local stand-in server: revalidation, retries and fallbacks."""
+
+import pytest
+import requests
+
+from benchmarks.standins import StandInServer, write_nab_csv
+from madison import http_cache
+from madison.http_cache import HTTPCache, cached_fetch
+from madison.http_client import HTTPClient
+from madison.ingest import parse_nab_chunks
+
+ROWS = 500
+
+
+@pytest.fixture
+def server(tmp_path):
+    write_nab_csv(tmp_path / "nab.csv", ROWS)
+    with StandInServer(tmp_path) as server:
+        yield server
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return HTTPCache(tmp_path / "http")
+
+
+@pytest.fixture(autouse=True)
+def fast_client(monkeypatch):
+    client = HTTPClient(retries=2, backoff_s=0.001, max_backoff_s=0.01)
+    monkeypatch.setattr(http_cache, "default_http_client", lambda: client)
+    yield client
+    client.close()
+
+
+class CountingParser:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, chunks):
+        self.calls += 1
+        return parse_nab_chunks(chunks)
+
+
+def test_unchanged_body_is_revalidated_not_refetched(server, cache):
+    url = server.url("/nab/nab.csv")
+    parse = CountingParser()
+
+    first = cached_fetch(url, parse, kind="nab", cache=cache)
+    second = cached_fetch(url, parse, kind="nab", cache=cache)
+
+    assert first.status == "miss" and first.bytes_fetched > 0
+    assert second.status == "not_modified" and second.bytes_fetched == 0
+    assert len(second.value) == len(first.value) == ROWS
+    assert parse.calls == 1
+    (_, sent_first), (_, sent_second) = server.requests
+    assert sent_first is None and sent_second is not None
+
+
+def test_transient_503_is_retried(server, cache):
+    server.fail_next = 1
+    fetched = cached_fetch(server.url("/nab/nab.csv"), parse_nab_chunks, kind="nab", cache=cache)
+
+    assert fetched.status == "miss"
+    assert len(fetched.value) == ROWS
+    assert len(server.requests) == 2
+
+
+def test_503_past_the_retry_budget_raises_and_caches_nothing(server, cache, fast_client):
+    server.fail_next = fast_client.retries + 1
+    with pytest.raises(Exception, match="503"):
+        cached_fetch(server.url("/nab/nab.csv"), parse_nab_chunks, kind="nab", cache=cache)
+    assert not list(cache.root.glob("*.pkl"))
+
+
+def test_parser_kind_mismatch_is_not_reused(server, cache):
+    url = server.url("/nab/nab.csv")
+    cached_fetch(url, parse_nab_chunks, kind="nab:step=1", cache=cache)
+    sampled = cached_fetch(url, lambda chunks: parse_nab_chunks(chunks, 5), kind="nab:step=5", cache=cache)
+
+    assert sampled.status == "miss"
+    assert len(sampled.value) == ROWS // 5
+    assert server.requests[-1][1] is None  # no validators sent for a result parsed another way
+    again = cached_fetch(url, lambda chunks: parse_nab_chunks(chunks, 5), kind="nab:step=5", cache=cache)
+    assert again.status == "not_modified" and len(again.value) == ROWS // 5
+
+
+@pytest.mark.parametrize("damage", [b"", b"not a pickle", b"\x80\x05\x95garbage"])
+def test_unreadable_parsed_result_falls_back_to_a_full_fetch(server, cache, damage):
+    url = server.url("/nab/nab.csv")
+    cached_fetch(url, parse_nab_chunks, kind="nab", cache=cache)
+    (pkl,) = cache.root.glob("*.pkl")
+    pkl.write_bytes(damage)
+
+    fetched = cached_fetch(url, parse_nab_chunks, kind="nab", cache=cache)
+
+    assert fetched.status == "miss"
+    assert len(fetched.value) == ROWS
+    assert [sent is not None for _, sent in server.requests] == [False, True, False]
+    assert cached_fetch(url, parse_nab_chunks, kind="nab", cache=cache).status == "not_modified"
+
+
+def test_full_fetch_after_a_304_reuses_the_only_pooled_connection(server, cache, monkeypatch):
+    client = HTTPClient(max_per_host=1, retries=0, pool_wait_s=2)
+    monkeypatch.setattr(http_cache, "default_http_client", lambda: client)
+    url = server.url("/nab/nab.csv")
+    cached_fetch(url, parse_nab_chunks, kind="nab", cache=cache)
+    (pkl,) = cache.root.glob("*.pkl")
+    pkl.write_bytes(b"not a pickle")
+
+    fetched = cached_fetch(url, parse_nab_chunks, kind="nab", cache=cache)
+
+    assert fetched.status == "miss" and len(fetched.value) == ROWS
+    client.close()
+
+
+def test_waiting_for_a_pooled_connection_is_bounded(server):
+    client = HTTPClient(max_per_host=1, retries=0, pool_wait_s=0.2)
+    url = server.url("/nab/nab.csv")
+    with client.get(url):
+        with pytest.raises(requests.ConnectionError, match="No free connection"):
+            client.get(url)
+    with client.get(url) as resp:  # the connection is back in the pool
+        assert resp.status_code == 200
+    client.close()
+
+
+def test_missing_parsed_result_is_not_revalidated(server, cache):
+    url = server.url("/nab/nab.csv")
+    cached_fetch(url, parse_nab_chunks, kind="nab", cache=cache)
+    for pkl in cache.root.glob("*.pkl"):
+        pkl.unlink()
+
+    assert cached_fetch(url, parse_nab_chunks, kind="nab", cache=cache).status == "miss"
+    assert server.requests[-1][1] is None
+
+
+def test_prune_keeps_the_directory_within_max_bytes(server, cache):
+    cached_fetch(server.url("/nab/nab.csv"), parse_nab_chunks, kind="a", cache=cache)
+    entry_bytes = sum(p.stat().st_size for p in cache.root.iterdir())
+    cache.max_bytes = entry_bytes * 2 + entry_bytes // 2
+    for query in range(4):
+        cached_fetch(server.url(f"/nab/nab.csv?v={query}"), parse_nab_chunks, kind="a", cache=cache)
+
+    assert sum(p.stat().st_size for p in cache.root.iterdir()) <= cache.max_bytes
+    assert len(list(cache.root.glob("*.pkl"))) == 2
@@ -0,0 +1,37 @@
+"""score_incrementally: previous scores are reused only for an unchanged prefix."""
+
+import numpy as np
+
+from madison.online import OnlineDetector, score_incrementally
+from madison.series import MetricSeries
+
+PARAMS = {"mode": "ewma", "k": 3.0, "warmup": 10}
+
+
+def minute_series(values) -> MetricSeries:
+    timestamps = np.datetime64("2024-01-01T00:00") + np.arange(len(values)).astype("timedelta64[m]")
+    return MetricSeries(timestamps, values)
+
+
+def full_rescore(series: MetricSeries):
+    _, scores = OnlineDetector(**PARAMS).update(series.timestamps, series.values)
+    return scores
+
+
+def test_appended_points_extend_the_previous_scores():
+    values = 50 + np.random.default_rng(3).normal(0, 2, 300)
+    previous = score_incrementally(minute_series(values[:200]), PARAMS)
+    state, scores = score_incrementally(minute_series(values), PARAMS, previous)
+    assert np.array_equal(scores.z_scores, full_rescore(minute_series(values)).z_scores)
+    assert state["count"] == 300
+
+
+def test_a_changed_prefix_forces_a_full_rescore():
+    values = 50 + np.random.default_rng(3).normal(0, 2, 300)
+    previous = score_incrementally(minute_series(values[:200]), PARAMS)
+    revised = values.copy()
+    revised[20] = 500.0  # a backfilled spike inside the already-scored range
+    _, scores = score_incrementally(minute_series(revised), PARAMS, previous)
+    expected = full_rescore(minute_series(revised))
+    assert scores.flags[20]
+    assert np.array_equal(scores.z_scores, expected.z_scores)
@@ -0,0 +1,84 @@
+"""analyze_metrics: the threshold it reports must always be a finite number."""
+
+import json
+
+import numpy as np
+
+from madison import pipeline
+from madison.online import OnlineScores
+from madison.sampling import SamplingPolicy
+from madison.seasonal import score_seasonal
+from madison.series import MetricSeries
+from madison.stats import batch_statistics, compute_statistics
+
+
+def hourly_series(hours: int = 24 * 21, seed: int = 7) -> MetricSeries:
+    rng = np.random.default_rng(seed)
+    timestamps = np.datetime64("2024-01-01T00:00") + np.arange(hours).astype("timedelta64[h]")
+    return MetricSeries(timestamps, 40 + rng.normal(0, 3, hours))
+
+
+def fake_seasonal(thresholds: np.ndarray):
+    def score(series, params, previous=None):
+        n = len(series)
+        return None, OnlineScores(np.zeros(n), thresholds, np.zeros(n, dtype=bool))
+    return score
+
+
+def analyze(series: MetricSeries):
+    return pipeline.analyze_metrics(series, 1.5, SamplingPolicy(), {"mode": "seasonal", "k": 3.0, "period": "week"})
+
+
+def test_undefined_latest_slot_falls_back_to_the_median_threshold(monkeypatch):
+    series = hourly_series()
+    thresholds = np.linspace(50.0, 60.0, len(series) - 1)
+    thresholds = np.append(thresholds, np.nan)
+    monkeypatch.setattr(pipeline, "score_seasonal", fake_seasonal(thresholds))
+
+    stats = analyze(series).stats
+
+    assert stats["anomaly_threshold"] == 55.0
+    assert "NaN" not in json.dumps(stats, default=str)
+
+
+def test_no_defined_slot_falls_back_to_the_global_threshold(monkeypatch):
+    series = hourly_series()
+    monkeypatch.setattr(pipeline, "score_seasonal", fake_seasonal(np.full(len(series), np.nan)))
+
+    stats = analyze(series).stats
+    global_stats = compute_statistics(series, 1.5)
+
+    assert stats["anomaly_threshold"] == global_stats["anomaly_threshold"]
+
+
+def test_global_mask_uses_the_exact_threshold_not_the_rounded_one():
+    series = hourly_series(hours=100_000)
+    exact = float(batch_statistics([series.values], 1.5).thresholds[0])
+    rounded = round(exact, 2)
+    between = (series.values > min(exact, rounded)) & (series.values <= max(exact, rounded))
+    assert between.any()  # the case under test: points the display rounding would misclassify
+
+    analysis = pipeline.analyze_metrics(series, 1.5, SamplingPolicy())
+
+    assert analysis.stats["anomaly_threshold"] == rounded
+    assert int(analysis.anomaly_mask.sum()) == analysis.stats["potential_anomalies_count"]
+    assert np.array_equal(analysis.anomaly_mask, series.values > exact)
+    assert int(analysis.episodes.points.sum()) == analysis.stats["potential_anomalies_count"]
+
+
+def test_real_seasonal_profile_reports_a_finite_threshold():
+    series = hourly_series(hours=30)  # far too little history for most hour-of-week slots
+    assert np.isfinite(analyze(series).stats["anomaly_threshold"])
+
+
+def test_seasonal_profile_is_rebuilt_when_the_scored_prefix_changes():
+    series = hourly_series()
+    params = {"period": "day", "k": 3.0}
+    previous = score_seasonal(MetricSeries(series.timestamps[:400], series.values[:400]), params)
+    revised = series.values.copy()
+    revised[:200] += 30.0  # history corrected upstream after the first run
+
+    _, scores = score_seasonal(MetricSeries(series.timestamps, revised), params, previous)
+    _, expected = score_seasonal(MetricSeries(series.timestamps, revised), params)
+
+    assert np.array_equal(scores.thresholds, expected.thresholds)
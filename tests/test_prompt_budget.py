@@ -0,0 +1,36 @@
+"""Detector prompt: rolled-up episodes render exactly like the full episode list."""
+
+import numpy as np
+import pytest
+
+from madison.episodes import find_episodes
+from madison.llm import build_detector_prompt
+from madison.prompt_budget import listable_episodes
+from madison.series import MetricSeries
+from madison.stats import statistics_with_mask
+
+
+@pytest.fixture(scope="module")
+def analysis():
+    rng = np.random.default_rng(5)
+    timestamps = np.datetime64("2024-01-01T00:00") + (np.arange(40_000) * 5).astype("timedelta64[m]")
+    series = MetricSeries(timestamps, 40 + rng.normal(0, 5, len(timestamps)))
+    stats, mask = statistics_with_mask(series, 1.5)
+    return series, stats, find_episodes(series.values, mask)
+
+
+@pytest.mark.parametrize("budget", [200, 1500, 6000])
+def test_prompt_records_render_the_same_prompt(analysis, budget):
+    series, stats, episodes = analysis
+    listed, unlisted = episodes.prompt_records(series, listable_episodes(budget))
+
+    assert len(listed) <= listable_episodes(budget) < len(episodes)
+    assert sum(day[0] for day in unlisted.values()) == len(episodes) - len(listed)
+    assert build_detector_prompt(stats, listed, budget, unlisted) == \
+        build_detector_prompt(stats, episodes.records(series), budget)
+
+
+def test_few_episodes_are_all_listed(analysis):
+    series, stats, episodes = analysis
+    listed, unlisted = episodes.prompt_records(series, len(episodes))
+    assert len(listed) == len(episodes) and unlisted == {}
@@ -0,0 +1,27 @@
+"""DetailLevels: zoomed windows keep enough detail without exceeding the point budget."""
+
+import numpy as np
+import pytest
+
+from madison.sampling import DetailLevels
+
+MAX_POINTS = 2000
+
+
+@pytest.fixture(scope="module")
+def levels():
+    values = 40 + np.random.default_rng(11).normal(0, 5, 100_000)
+    return DetailLevels.build(values, MAX_POINTS)
+
+
+@pytest.mark.parametrize("lo, hi", [(1000, 3500), (0, 13_000), (20_000, 60_000), (0, 100_000)])
+def test_windows_get_between_half_and_the_whole_budget(levels, lo, hi):
+    shown = levels.window(lo, hi)
+
+    assert MAX_POINTS // 2 <= len(shown) <= MAX_POINTS
+    assert shown[0] >= lo and shown[-1] < hi
+    assert np.all(np.diff(shown) > 0)
+
+
+def test_windows_within_the_budget_are_drawn_raw(levels):
+    assert np.array_equal(levels.window(500, 500 + MAX_POINTS), np.arange(500, 500 + MAX_POINTS))